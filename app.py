@@ -5,7 +5,15 @@ import streamlit as st
 import json
 from datetime import datetime
 from src.crew import create_education_crew
+from src.history import SessionHistory
 from src.config import config
+from src.metrics import metrics
+from src.export import ndjson_bytes
+from src.plan_store import open_default_store, plan_to_record
+from src.rendering import RenderCache
+from src.question_bank import open_default_question_bank
+from src.resources import open_default_resource_index
+from src.similarity import build_default_index
 
 # Page configuration
 st.set_page_config(
@@ -38,6 +46,27 @@ st.markdown("""
         margin-bottom: 1.5rem;
         border-left: 4px solid #1f77b4;
     }
+    .quiz-text {
+        font-size: 1.1rem;
+        font-weight: 500;
+    }
+    .quiz-option {
+        padding: 0.5rem;
+        border-radius: 0.3rem;
+        margin: 0.3rem 0;
+    }
+    .quiz-option.correct {
+        background-color: #d4edda;
+    }
+    .quiz-option.wrong {
+        background-color: #f8d7da;
+    }
+    .tab-info {
+        background-color: #e7f1fb;
+        padding: 0.75rem 1rem;
+        border-radius: 0.5rem;
+        margin-bottom: 1rem;
+    }
     .project-card {
         background-color: #f9f9f9;
         padding: 1.5rem;
@@ -45,6 +74,27 @@ st.markdown("""
         margin-bottom: 1.5rem;
         border: 2px solid #4CAF50;
     }
+    .project-columns {
+        display: flex;
+        gap: 2rem;
+    }
+    .project-main {
+        flex: 2;
+    }
+    .project-side {
+        flex: 1;
+    }
+    .rendered-tab ul.plain {
+        list-style: none;
+        padding-left: 0;
+    }
+    .rendered-tab details {
+        margin: 0.3rem 0 0.8rem 0;
+    }
+    .rendered-tab summary {
+        cursor: pointer;
+        font-weight: 500;
+    }
     .stButton>button {
         width: 100%;
         background-color: #1f77b4;
@@ -55,136 +105,63 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state
-if 'results' not in st.session_state:
-    st.session_state.results = []
-if 'current_result' not in st.session_state:
-    st.session_state.current_result = None
+# Expose Prometheus metrics for the long-running app process
+if config.metrics_port:
+    metrics.start_http_server(config.metrics_port)
 
 
-def display_learning_materials(materials):
-    """Display learning materials in a formatted way."""
-    st.subheader("📚 Learning Materials")
-    
-    # Summary
-    with st.expander("📝 Learning Path Summary", expanded=True):
-        st.write(materials.summary)
-    
-    # Videos
-    if materials.videos:
-        st.markdown("### 🎥 Video Resources")
-        for video in materials.videos:
-            with st.container():
-                st.markdown(f"""
-                <div class="resource-card">
-                    <h4>📹 {video.title}</h4>
-                    <p>{video.description}</p>
-                    <a href="{video.url}" target="_blank">🔗 Watch Video</a>
-                </div>
-                """, unsafe_allow_html=True)
-    
-    # Articles
-    if materials.articles:
-        st.markdown("### 📄 Article Resources")
-        for article in materials.articles:
-            with st.container():
-                st.markdown(f"""
-                <div class="resource-card">
-                    <h4>📰 {article.title}</h4>
-                    <p>{article.description}</p>
-                    <a href="{article.url}" target="_blank">🔗 Read Article</a>
-                </div>
-                """, unsafe_allow_html=True)
-    
-    # Exercises
-    if materials.exercises:
-        st.markdown("### 💪 Practice Exercises")
-        for exercise in materials.exercises:
-            with st.container():
-                st.markdown(f"""
-                <div class="resource-card">
-                    <h4>✏️ {exercise.title}</h4>
-                    <p>{exercise.description}</p>
-                    <a href="{exercise.url}" target="_blank">🔗 Try Exercise</a>
-                </div>
-                """, unsafe_allow_html=True)
+@st.cache_resource
+def get_plan_store():
+    """Shared plan store for every session in this process."""
+    return open_default_store()
 
 
-def display_quiz(quiz):
-    """Display quiz in an interactive format."""
-    st.subheader("📝 Knowledge Assessment Quiz")
-    
-    st.info(f"**Total Questions:** {quiz.total_questions} | "
-            f"**Estimated Time:** {quiz.estimated_time_minutes} minutes")
-    
-    for idx, question in enumerate(quiz.questions, 1):
-        with st.container():
-            st.markdown(f"""
-            <div class="quiz-question">
-                <h4>Question {idx}</h4>
-                <p style="font-size: 1.1rem; font-weight: 500;">{question.question}</p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Display options
-            for option in question.options:
-                is_correct = option.option == question.correct_answer
-                emoji = "✅" if is_correct else "❌"
-                color = "#d4edda" if is_correct else "#f8d7da"
-                
-                st.markdown(f"""
-                <div style="background-color: {color}; padding: 0.5rem; 
-                     border-radius: 0.3rem; margin: 0.3rem 0;">
-                    {emoji} <strong>{option.option})</strong> {option.text}
-                </div>
-                """, unsafe_allow_html=True)
-            
-            # Show explanation
-            with st.expander(f"💡 Explanation (Difficulty: {question.difficulty})"):
-                st.write(f"**Correct Answer:** {question.correct_answer}")
-                st.write(question.explanation)
-            
-            st.divider()
+@st.cache_resource
+def get_resource_index():
+    """Shared index of curated resources for every session in this process."""
+    return open_default_resource_index()
 
 
-def display_projects(projects):
-    """Display project suggestions."""
-    st.subheader("🚀 Project Ideas")
-    
-    st.info(f"**Total Projects:** {projects.total_projects}")
-    
-    for idx, project in enumerate(projects.projects, 1):
-        with st.container():
-            st.markdown(f"""
-            <div class="project-card">
-                <h3>Project {idx}: {project.title}</h3>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            col1, col2 = st.columns([2, 1])
-            
-            with col1:
-                st.markdown("**Description:**")
-                st.write(project.description)
-                
-                st.markdown("**Learning Outcomes:**")
-                for outcome in project.learning_outcomes:
-                    st.write(f"• {outcome}")
-            
-            with col2:
-                st.markdown(f"**Level:** `{project.expertise_level}`")
-                st.markdown(f"**Duration:** `{project.estimated_duration}`")
-                
-                st.markdown("**Key Concepts:**")
-                for concept in project.key_concepts:
-                    st.write(f"🔹 {concept}")
-            
-            st.markdown("**Deliverables:**")
-            for deliverable in project.deliverables:
-                with st.expander(f"📦 {deliverable.name}"):
-                    st.write(deliverable.description)
-            
-            st.divider()
+@st.cache_resource
+def get_question_bank():
+    """Shared bank of generated quiz questions for every session in this process."""
+    return open_default_question_bank()
+
+
+@st.cache_resource
+def get_render_cache():
+    """Rendered result tabs shared by every session, keyed by plan."""
+    return RenderCache()
+
+
+@st.cache_resource
+def get_topic_index():
+    """Shared similarity index over the plan store, built once per process."""
+    return build_default_index(get_plan_store())
+
+
+# Initialize session state; the history holds full results only for recent entries
+if 'history' not in st.session_state:
+    st.session_state.history = SessionHistory(get_plan_store())
+if 'current_entry' not in st.session_state:
+    st.session_state.current_entry = None
+
+
+def display_learning_materials(materials, plan_key=None):
+    """Display learning materials as one pre-rendered HTML block."""
+    st.markdown(get_render_cache().render("learning_materials", materials, plan_key),
+                unsafe_allow_html=True)
+
+
+def display_quiz(quiz, plan_key=None):
+    """Display the quiz as one pre-rendered HTML block."""
+    st.markdown(get_render_cache().render("quiz", quiz, plan_key), unsafe_allow_html=True)
+
+
+def display_projects(projects, plan_key=None):
+    """Display project suggestions as one pre-rendered HTML block."""
+    st.markdown(get_render_cache().render("projects", projects, plan_key),
+                unsafe_allow_html=True)
 
 
 def main():
@@ -249,13 +226,43 @@ def main():
         st.divider()
         
         # Session history
-        if st.session_state.results:
+        history = st.session_state.history
+        if len(history):
             st.subheader("📜 Session History")
-            st.write(f"Total generations: {len(st.session_state.results)}")
+            st.write(f"Total generations: {len(history)}")
+            entries = {
+                entry["entry_id"]: f"{entry['topic']} ({entry['expertise_level']}, "
+                                   f"{entry['timestamp']})"
+                for entry in history.entries()
+            }
+            entry_id = st.selectbox("Earlier plans", list(entries), format_func=entries.get)
+            if st.button("📂 Open From History"):
+                st.session_state.current_entry = entry_id
+                st.rerun()
             if st.button("🗑️ Clear History"):
-                st.session_state.results = []
-                st.session_state.current_result = None
+                history.clear()
+                st.session_state.current_entry = None
                 st.rerun()
+        
+        # Saved plans
+        store = get_plan_store()
+        if store is not None:
+            st.subheader("🗄️ Saved Plans")
+            search_topic = st.text_input("Filter by topic", key="saved_topic_filter")
+            saved, _ = store.query(topic=search_topic or None, limit=20)
+            if saved:
+                labels = {
+                    item["plan_id"]: f"{item['topic']} ({item['expertise_level']})"
+                    for item in saved
+                }
+                plan_id = st.selectbox("Recent plans", list(labels), format_func=labels.get)
+                if st.button("📂 Open Plan"):
+                    plan = store.get(plan_id)
+                    if plan is not None:
+                        st.session_state.current_entry = st.session_state.history.add(plan)
+                    st.rerun()
+            else:
+                st.caption("No saved plans yet.")
     
     # Main content
     col1, col2 = st.columns([2, 1])
@@ -284,7 +291,9 @@ def main():
         with st.spinner("🔍 Creating your personalized learning plan... This may take a few minutes."):
             try:
                 # Create and run crew
-                crew = create_education_crew(llm_provider)
+                crew = create_education_crew(llm_provider, get_plan_store(), get_topic_index(),
+                                             resource_index=get_resource_index(),
+                                             question_bank=get_question_bank())
                 result = crew.run(
                     topic=topic,
                     expertise_level=expertise_level,
@@ -295,11 +304,14 @@ def main():
                 
                 if result["success"]:
                     # Store result
-                    result["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    st.session_state.results.append(result)
-                    st.session_state.current_result = result
+                    result.setdefault("timestamp", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                    st.session_state.current_entry = st.session_state.history.add(result)
                     
-                    st.success("✅ Learning plan generated successfully!")
+                    if result.get("cached"):
+                        st.success(f"♻️ Reused a stored plan for \"{result['topic']}\" "
+                                   f"(similarity {result['cache_match']['score']:.2f})")
+                    else:
+                        st.success("✅ Learning plan generated successfully!")
                 else:
                     st.error(f"❌ Error: {result.get('error', 'Unknown error')}")
                     return
@@ -308,10 +320,19 @@ def main():
                 st.error(f"❌ An error occurred: {str(e)}")
                 return
     
-    # Display current result
-    if st.session_state.current_result:
-        result = st.session_state.current_result
-        
+    # Display current result (reloaded from the store or spill file if it was evicted)
+    result = None
+    if st.session_state.current_entry:
+        result = st.session_state.history.get(st.session_state.current_entry)
+        if result is None:
+            st.warning("This plan is no longer available.")
+            st.session_state.current_entry = None
+    if result:
+        # History entries get a new id whenever they change; a stored plan keeps its id
+        # when extended, so its rendered tabs are evicted then. Plans served from the
+        # plan cache are trimmed copies of a stored plan, so they are keyed by entry
+        plan_key = st.session_state.current_entry if result.get("cached") \
+            else result.get("plan_id") or st.session_state.current_entry
         st.divider()
         
         # Create tabs for different sections
@@ -323,13 +344,47 @@ def main():
         ])
         
         with tab1:
-            display_learning_materials(result["learning_materials"])
+            link_report = result.get("link_report")
+            if link_report and link_report.get("dead"):
+                action = "removed" if link_report["mode"] == "drop" else "could not be reached"
+                st.warning(
+                    f"🔗 {len(link_report['dead'])} of {link_report['checked']} links {action}:\n"
+                    + "\n".join(f"- {link['url']} ({link['status'] or link['error']})"
+                                 for link in link_report["dead"])
+                )
+            display_learning_materials(result["learning_materials"], plan_key)
         
         with tab2:
-            display_quiz(result["quiz"])
+            display_quiz(result["quiz"], plan_key)
+            
+            # Generate only extra questions instead of re-running the whole plan
+            col1, col2 = st.columns([1, 2])
+            with col1:
+                extra_questions = st.number_input(
+                    "Additional questions", min_value=1, max_value=10, value=5,
+                    key="extra_questions"
+                )
+            with col2:
+                st.write("")
+                if st.button("➕ Add More Questions"):
+                    with st.spinner("📝 Writing additional questions..."):
+                        try:
+                            crew = create_education_crew(
+                                llm_provider, get_plan_store(), get_topic_index(),
+                                resource_index=get_resource_index(),
+                                question_bank=get_question_bank()
+                            )
+                            extended = crew.extend_plan(result, extra_questions)
+                            get_render_cache().evict(plan_key)
+                            st.session_state.current_entry = st.session_state.history.replace(
+                                st.session_state.current_entry, extended
+                            )
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"❌ Could not extend the quiz: {str(e)}")
         
         with tab3:
-            display_projects(result["projects"])
+            display_projects(result["projects"], plan_key)
         
         with tab4:
             st.subheader("💾 Export Results")
@@ -353,6 +408,14 @@ def main():
                 mime="application/json"
             )
             
+            # NDJSON (one compact line, the format `main.py export` and `plans --import` use)
+            st.download_button(
+                label="📥 Download as NDJSON",
+                data=ndjson_bytes(plan_to_record(result)),
+                file_name=f"learning_plan_{result['topic'].replace(' ', '_')}.ndjson",
+                mime="application/x-ndjson"
+            )
+            
             # Display raw JSON
             with st.expander("👁️ View Raw JSON"):
                 st.json(export_data)
@@ -0,0 +1,103 @@
+"""
+Micro-benchmarks for plan serialization: encode and decode throughput of the
+fast paths in `src.serialization` versus `model_dump` + stdlib `json`.
+
+Usage: python benchmark_serialization.py [--plans N] [--questions N] [--repeat N]
+"""
+import argparse
+import json
+import time
+
+from src.fakes import fake_learning_material
+from src.models import LearningMaterial, ProjectSuggestions, Quiz
+from src.offline import template_projects, template_questions
+from src.serialization import dump_model, dumps, loads, msgpack, orjson, pack, unpack
+
+MODELS = (("learning_materials", LearningMaterial), ("quiz", Quiz), ("projects", ProjectSuggestions))
+
+
+def sample_plan(index: int, num_questions: int) -> dict:
+    """A realistic plan built from the fake/offline generators."""
+    topic = f"Benchmark Topic {index}"
+    materials = fake_learning_material(topic, "intermediate", 5)
+    questions = template_questions(materials, num_questions)
+    return {
+        "learning_materials": materials,
+        "quiz": Quiz(topic=topic, total_questions=len(questions), questions=questions,
+                     estimated_time_minutes=2 * len(questions)),
+        "projects": ProjectSuggestions(topic=topic, projects=template_projects(materials, 3),
+                                       total_projects=3),
+    }
+
+
+def timed(fn, items, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = [fn(item) for item in items]
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark plan serialization paths")
+    parser.add_argument("--plans", type=int, default=500, help="Plans per run (default: 500)")
+    parser.add_argument("--questions", type=int, default=15,
+                        help="Quiz questions per plan (default: 15)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per path; best is kept")
+    args = parser.parse_args()
+
+    plans = [sample_plan(i, args.questions) for i in range(args.plans)]
+
+    def models_of(plan):
+        return [plan[key] for key, _ in MODELS]
+
+    encoders = {
+        "model_dump + json indent=2 (file export)": lambda plan: json.dumps(
+            {key: plan[key].model_dump() for key, _ in MODELS}, indent=2).encode("utf-8"),
+        "model_dump + json compact (before)": lambda plan: json.dumps(
+            {key: plan[key].model_dump() for key, _ in MODELS}, separators=(",", ":")).encode("utf-8"),
+        "model_dump_json": lambda plan: [dump_model(model) for model in models_of(plan)],
+        "model_dump + dumps" + (" (orjson)" if orjson else " (stdlib)"): lambda plan: dumps(
+            {key: plan[key].model_dump() for key, _ in MODELS}),
+    }
+    if msgpack is not None:
+        encoders["model_dump + msgpack"] = lambda plan: pack(
+            {key: plan[key].model_dump() for key, _ in MODELS})
+
+    print(f"{args.plans} plans, {args.questions} questions each, best of {args.repeat}\n")
+    print(f"{'encode':<42} {'plans/s':>10} {'MB/s':>8} {'bytes/plan':>11}")
+    encoded = {}
+    for name, fn in encoders.items():
+        seconds, out = timed(fn, plans, args.repeat)
+        size = sum(sum(map(len, o)) if isinstance(o, list) else len(o) for o in out)
+        encoded[name] = out
+        print(f"{name:<42} {args.plans / seconds:>10.0f} {size / seconds / 2**20:>8.1f} "
+              f"{size / args.plans:>11.0f}")
+
+    json_docs = encoded["model_dump + json compact (before)"]
+    split_docs = encoded["model_dump_json"]
+    decoders = {
+        "json.loads + model_validate (before)": (json_docs, lambda doc: [
+            cls.model_validate(data) for (key, cls), data in
+            zip(MODELS, (json.loads(doc)[key] for key, _ in MODELS))]),
+        "loads + model_validate": (json_docs, lambda doc: (lambda d: [
+            cls.model_validate(d[key]) for key, cls in MODELS])(loads(doc))),
+        "model_validate_json": (split_docs, lambda docs: [
+            cls.model_validate_json(doc) for (_, cls), doc in zip(MODELS, docs)]),
+    }
+    if msgpack is not None:
+        decoders["msgpack + model_validate"] = (
+            encoded["model_dump + msgpack"], lambda doc: (lambda d: [
+                cls.model_validate(d[key]) for key, cls in MODELS])(unpack(doc)))
+
+    print(f"\n{'decode':<42} {'plans/s':>10}")
+    for name, (docs, fn) in decoders.items():
+        seconds, _ = timed(fn, docs, args.repeat)
+        print(f"{name:<42} {args.plans / seconds:>10.0f}")
+    if msgpack is None:
+        print("\n(msgpack not installed; pip install msgpack to include it)")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,30 @@
 Command-line interface for the Personalized Education Assistant.
 """
 import argparse
+import asyncio
 import json
+import os
+import sys
+import tempfile
+import time
 from datetime import datetime
+from src.cassette import active_cassette
+from src.compression import DEFAULT_DICT_SIZE
 from src.crew import create_education_crew
+from src.loadtest import DEFAULT_TOPICS, find_saturation
 from src.config import config
+from src.metrics import metrics
+from src.profiling import PROFILER_KINDS, create_profiler
+from src.grading import encode_responses, grade_cohort, retag_difficulty, simulate_responses
+from src.export import EXPORT_FORMATS, read_ndjson, write_columnar, write_ndjson
+from src.plan_store import PlanStore, open_default_store, plan_to_record, record_from_export
+from src.replay import replay_workload
+from src.review import ReviewScheduler
+from src.server import APIServer, PlanService
+from src.question_bank import QuestionBank, open_default_question_bank
+from src.resources import ResourceIndex, open_default_resource_index
+from src.similarity import build_default_index
+from src.warmup import parse_levels, read_topics, warm_cache
 
 
 def print_separator(char="=", length=80):
@@ -100,6 +120,33 @@ def print_projects(projects):
             print(f"  • {outcome}")
 
 
+def print_link_report(report):
+    """Print unreachable resource links found by the link checker."""
+    if not report:
+        return
+    if report.get("error"):
+        print(f"\n⚠️  Link check failed: {report['error']}")
+        return
+    if not report["dead"]:
+        print(f"\n🔗 All {report['checked']} resource links are reachable")
+        return
+    action = "removed" if report["mode"] == "drop" else "flagged"
+    print(f"\n🔗 {len(report['dead'])} of {report['checked']} resource links unreachable ({action}):")
+    for link in report["dead"]:
+        print(f"   ✗ {link['url']} ({link['status'] or link['error']})")
+
+
+def print_routing(routing):
+    """Print which provider and model served each stage of a run."""
+    if not routing or not routing["decisions"]:
+        return
+    print(f"\n🧭 LLM routing ({sum(routing['calls'].values())} calls):")
+    for decision in routing["decisions"]:
+        mark = "✓" if decision["outcome"] == "success" else "✗"
+        print(f"   {mark} {decision['stage']:<9} → {decision['provider']}:{decision['model']} "
+              f"({decision['reason']}, {decision['seconds']:.2f}s)")
+
+
 def save_to_file(result, filename=None):
     """Save result to a JSON file."""
     if filename is None:
@@ -107,6 +154,11 @@ def save_to_file(result, filename=None):
         topic_slug = result["topic"].replace(" ", "_").lower()
         filename = f"learning_plan_{topic_slug}_{timestamp}.json"
     
+    if filename.endswith((".ndjson", ".jsonl", ".ndjson.gz", ".jsonl.gz")):
+        write_ndjson([plan_to_record(result)], filename)
+        print(f"\n✅ Results saved to: {filename}")
+        return filename
+    
     export_data = {
         "topic": result["topic"],
         "expertise_level": result["expertise_level"],
@@ -123,11 +175,855 @@ def save_to_file(result, filename=None):
     return filename
 
 
+def dump_metrics(target):
+    """Write the current metrics snapshot to a file, or stdout for '-'."""
+    text = metrics.render()
+    if target == "-":
+        print(text)
+    else:
+        with open(target, 'w') as f:
+            f.write(text)
+        print(f"📈 Metrics written to: {target}")
+
+
+def run_crew(args):
+    """Run the crew for the parsed CLI arguments."""
+    try:
+        print("\n🎓 PERSONALIZED EDUCATION ASSISTANT")
+        print_separator()
+        print(f"📚 Topic: {args.topic}")
+        print(f"🎯 Expertise Level: {args.level.capitalize()}")
+        print(f"🤖 LLM Provider: {args.llm}")
+        print_separator()
+        
+        profiler = create_profiler(args.profile)
+        store = open_default_store()
+        topic_index = None if args.no_cache else build_default_index(store)
+        crew = create_education_crew(args.llm, store, topic_index,
+                                     resource_index=open_default_resource_index(),
+                                     question_bank=open_default_question_bank())
+        result = crew.run(
+            topic=args.topic,
+            expertise_level=args.level,
+            resources_per_category=args.resources,
+            num_questions=args.questions,
+            num_projects=args.projects,
+            profiler=profiler,
+            use_cache=not args.no_cache
+        )
+        
+        if args.profile:
+            paths = profiler.write(args.profile_dir)
+            print(f"\n🔬 Profile ({args.profile}) written to {args.profile_dir}/:")
+            for path in paths:
+                print(f"   {os.path.basename(path)}")
+        
+        if not result["success"]:
+            print(f"\n❌ Error: {result.get('error', 'Unknown error')}")
+            return 1
+        
+        # Display results
+        if not args.no_display:
+            print_learning_materials(result["learning_materials"])
+            print_quiz(result["quiz"])
+            print_projects(result["projects"])
+        print_link_report(result.get("link_report"))
+        print_routing(result.get("routing"))
+        
+        # Save to file
+        if args.output or args.no_display:
+            save_to_file(result, args.output)
+        
+        if result.get("provenance"):
+            print("\n📴 Offline plan sources:")
+            for part, source in result["provenance"].items():
+                print(f"   {part}: {source}")
+        if result.get("cached"):
+            print(f"\n♻️  Reused stored plan {result['plan_id']} "
+                  f"(similarity {result['cache_match']['score']:.2f})")
+        elif result.get("plan_id"):
+            print(f"\n🗄️  Plan stored as {result['plan_id']} in {config.plan_store_path}")
+        
+        print("\n" + "="*80)
+        print("✅ LEARNING PLAN GENERATED SUCCESSFULLY!")
+        print("="*80 + "\n")
+        
+        return 0
+        
+    except Exception as e:
+        print(f"\n❌ An error occurred: {str(e)}")
+        return 1
+
+
+def run_levels_crew(args):
+    """Generate plans for several expertise levels from one shared search pass."""
+    try:
+        levels = parse_levels(args.levels)
+        store = open_default_store()
+        crew = create_education_crew(args.llm, store, resource_index=open_default_resource_index(),
+                                     question_bank=open_default_question_bank())
+        outcome = crew.run_levels(
+            topic=args.topic,
+            levels=levels,
+            resources_per_category=args.resources,
+            num_questions=args.questions,
+            num_projects=args.projects
+        )
+        if "results" not in outcome:
+            print(f"\n❌ Error: {outcome.get('error', 'Unknown error')}")
+            return 1
+        
+        for level, result in outcome["results"].items():
+            print_separator()
+            print(f"🎯 {level.upper()}")
+            if not result["success"]:
+                print(f"❌ Error: {result.get('error', 'Unknown error')}")
+                continue
+            if not args.no_display:
+                print_learning_materials(result["learning_materials"])
+                print_quiz(result["quiz"])
+                print_projects(result["projects"])
+            if args.output or args.no_display:
+                filename = None
+                if args.output:
+                    root, ext = os.path.splitext(args.output)
+                    filename = f"{root}_{level}{ext or '.json'}"
+                save_to_file(result, filename)
+            if result.get("plan_id"):
+                print(f"\n🗄️  Plan stored as {result['plan_id']} in {config.plan_store_path}")
+        
+        print("\n" + "="*80)
+        if outcome["success"]:
+            print(f"✅ {len(levels)} LEARNING PLANS GENERATED FROM "
+                  f"{outcome['search_queries']} SHARED SEARCHES!")
+        else:
+            print("⚠️  SOME LEVELS FAILED")
+        print("="*80 + "\n")
+        return 0 if outcome["success"] else 1
+        
+    except Exception as e:
+        print(f"\n❌ An error occurred: {str(e)}")
+        return 1
+
+
+def plans_command(argv):
+    """Browse, show or import plans in the persistent plan store."""
+    parser = argparse.ArgumentParser(
+        prog="main.py plans",
+        description="Browse the persistent plan store"
+    )
+    parser.add_argument("--store", default=config.plan_store_path or "plans.db",
+                        help="Plan store database (default: PLAN_STORE_PATH)")
+    parser.add_argument("--topic", help="Only plans for this topic")
+    parser.add_argument("--level", choices=["beginner", "intermediate", "advanced"],
+                        help="Only plans for this expertise level")
+    parser.add_argument("--provider", help="Only plans generated by this LLM provider")
+    parser.add_argument("--limit", type=int, default=20, help="Page size (default: 20)")
+    parser.add_argument("--cursor", help="Page cursor printed at the end of the previous page")
+    parser.add_argument("--show", metavar="PLAN_ID", help="Print a stored plan")
+    parser.add_argument("--import", dest="import_files", nargs="+", metavar="FILE",
+                        help="Import JSON files written by --output or the app's export, "
+                             "or NDJSON files from `main.py export`")
+    args = parser.parse_args(argv)
+    
+    store = PlanStore(args.store)
+    
+    if args.import_files:
+        imported = 0
+        for path in args.import_files:
+            if path.endswith((".ndjson", ".jsonl", ".ndjson.gz", ".jsonl.gz")):
+                batch = []
+                for data in read_ndjson(path):
+                    batch.append(record_from_export(data))
+                    if len(batch) >= 500:
+                        imported += len(store.add_records(batch))
+                        batch = []
+                imported += len(store.add_records(batch))
+            else:
+                with open(path) as f:
+                    imported += len(store.add_records([record_from_export(json.load(f))]))
+        print(f"✅ Imported {imported} plan(s) into {args.store}")
+        return 0
+    
+    if args.show:
+        plan = store.get(args.show)
+        if plan is None:
+            print(f"❌ No plan with id {args.show}")
+            return 1
+        print_learning_materials(plan["learning_materials"])
+        print_quiz(plan["quiz"])
+        print_projects(plan["projects"])
+        return 0
+    
+    cursor = None
+    if args.cursor:
+        created_at, plan_id = args.cursor.split(":", 1)
+        cursor = (float(created_at), plan_id)
+    
+    items, next_cursor = store.query(
+        topic=args.topic,
+        expertise_level=args.level,
+        provider=args.provider,
+        limit=args.limit,
+        cursor=cursor
+    )
+    for item in items:
+        created = datetime.fromtimestamp(item["created_at"]).strftime("%Y-%m-%d %H:%M")
+        print(f"{item['plan_id']}  {created}  {item['expertise_level']:<12} "
+              f"{item['provider'] or '-':<10} {item['topic']}")
+    if not items:
+        print("No plans found.")
+    if next_cursor:
+        print(f"\nNext page: --cursor {next_cursor[0]}:{next_cursor[1]}")
+    return 0
+
+
+def warm_command(argv):
+    """Precompute plans (and fill the search/LLM caches) for popular topics."""
+    parser = argparse.ArgumentParser(
+        prog="main.py warm",
+        description="Warm the plan, search and LLM caches for a list of popular topics"
+    )
+    parser.add_argument("--topics", required=True, metavar="FILE",
+                        help="Text file with one topic per line")
+    parser.add_argument("--levels", default="all",
+                        help="'all' or a comma-separated list of expertise levels (default: all)")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="Concurrent crew runs (default: 2); provider RPM limits still apply")
+    parser.add_argument("-r", "--resources", type=int, default=config.default_resources_per_category,
+                        help="Number of resources per category")
+    parser.add_argument("-q", "--questions", type=int, default=config.default_quiz_questions,
+                        help="Number of quiz questions")
+    parser.add_argument("-p", "--projects", type=int, default=config.default_project_count,
+                        help="Number of project ideas")
+    parser.add_argument("--llm", choices=["openrouter", "groq", "fake"], default="openrouter",
+                        help="LLM provider to use (default: openrouter)")
+    args = parser.parse_args(argv)
+    
+    if args.llm != "fake":
+        try:
+            config.validate_api_keys()
+        except ValueError as e:
+            print(f"❌ Error: {e}")
+            return 1
+    
+    store = open_default_store()
+    if store is None:
+        print("❌ Error: warming needs a plan store; set PLAN_STORE_PATH")
+        return 1
+    
+    try:
+        topics = read_topics(args.topics)
+        levels = parse_levels(args.levels)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        return 1
+    
+    print(f"🔥 Warming {len(topics)} topic(s) x {len(levels)} level(s) "
+          f"with {args.workers} worker(s) on {args.llm}")
+    print_separator()
+    counts = warm_cache(
+        topics,
+        levels,
+        plan_store=store,
+        topic_index=build_default_index(store),
+        resource_index=open_default_resource_index(),
+        question_bank=open_default_question_bank(),
+        llm_provider=args.llm,
+        workers=args.workers,
+        resources_per_category=args.resources,
+        num_questions=args.questions,
+        num_projects=args.projects
+    )
+    print_separator()
+    print(f"✅ Generated {counts['generated']}, already fresh {counts['fresh']}, "
+          f"failed {counts['failed']}")
+    return 1 if counts["failed"] else 0
+
+
+def regenerate_command(argv):
+    """Rerun selected stages of a stored plan, reusing the stored output of the others."""
+    parser = argparse.ArgumentParser(
+        prog="main.py regenerate",
+        description="Regenerate the materials, quiz and/or projects of a stored plan"
+    )
+    parser.add_argument("plan_id", help="Stored plan to start from (see `main.py plans`)")
+    parser.add_argument("--stages", required=True,
+                        help="Comma-separated stages to rerun: materials, quiz, projects")
+    parser.add_argument("-r", "--resources", type=int,
+                        help="Number of resources per category (default: as in the plan)")
+    parser.add_argument("-q", "--questions", type=int,
+                        help="Number of quiz questions (default: as in the plan)")
+    parser.add_argument("-p", "--projects", type=int,
+                        help="Number of project ideas (default: as in the plan)")
+    parser.add_argument("--llm", choices=["openrouter", "groq", "fake"], default="openrouter",
+                        help="LLM provider to use (default: openrouter)")
+    parser.add_argument("-o", "--output", help="Output filename for JSON export")
+    parser.add_argument("--no-display", action="store_true",
+                        help="Don't display results in console (only save to file)")
+    args = parser.parse_args(argv)
+    
+    if args.llm != "fake":
+        try:
+            config.validate_api_keys()
+        except ValueError as e:
+            print(f"❌ Error: {e}")
+            return 1
+    
+    store = open_default_store()
+    plan = store.get(args.plan_id) if store is not None else None
+    if plan is None:
+        print(f"❌ No plan with id {args.plan_id}")
+        return 1
+    
+    try:
+        stages = {stage.strip().lower() for stage in args.stages.split(",") if stage.strip()}
+        crew = create_education_crew(args.llm, store, build_default_index(store),
+                                     resource_index=open_default_resource_index(),
+                                     question_bank=open_default_question_bank())
+        result = crew.regenerate(
+            plan,
+            stages,
+            resources_per_category=args.resources,
+            num_questions=args.questions,
+            num_projects=args.projects
+        )
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return 1
+    
+    if not result["success"]:
+        print(f"\n❌ Error: {result.get('error', 'Unknown error')}")
+        return 1
+    
+    if not args.no_display:
+        print_learning_materials(result["learning_materials"])
+        print_quiz(result["quiz"])
+        print_projects(result["projects"])
+    if args.output or args.no_display:
+        save_to_file(result, args.output)
+    if result.get("plan_id"):
+        print(f"\n🗄️  Updated plan stored as {result['plan_id']} "
+              f"(from {args.plan_id}, regenerated {', '.join(result['regenerated'])})")
+    return 0
+
+
+def replay_command(argv):
+    """Re-issue the requests recorded in a cassette, serving LLM and search calls from it."""
+    parser = argparse.ArgumentParser(
+        prog="main.py replay",
+        description="Replay a recorded workload against the current code and report "
+                    "throughput and latency"
+    )
+    parser.add_argument("cassette", help="Cassette recorded with --record (or CASSETTE_MODE=record)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Concurrent crew runs (default: 4)")
+    parser.add_argument("--latency-scale", type=float, default=config.cassette_latency_scale,
+                        help="Multiplier for recorded LLM/search latencies (default: 1; 0 = none)")
+    parser.add_argument("--arrival-scale", type=float, default=1.0,
+                        help="Multiplier for recorded gaps between requests "
+                             "(default: 1; 0 = submit all at once)")
+    parser.add_argument("--with-stores", action="store_true",
+                        help="Use the plan store, resource index and response caches as "
+                             "configured (default: replay against empty ones)")
+    args = parser.parse_args(argv)
+    
+    config.cassette_mode = "replay"
+    config.cassette_path = args.cassette
+    config.cassette_latency_scale = args.latency_scale
+    if not args.with_stores:
+        # Every call should reach the cassette rather than a local cache
+        config.cache_path = ""
+    try:
+        cassette = active_cassette()
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        return 1
+    
+    store = open_default_store() if args.with_stores else None
+    print(f"📼 Replaying {len(cassette.runs())} request(s) from {args.cassette} with "
+          f"{args.workers} worker(s), latency x{args.latency_scale}, arrivals x{args.arrival_scale}")
+    print_separator()
+    summary = replay_workload(
+        cassette,
+        workers=args.workers,
+        arrival_scale=args.arrival_scale,
+        plan_store=store,
+        topic_index=build_default_index(store) if store is not None else None,
+        resource_index=open_default_resource_index() if args.with_stores else None
+    )
+    print_separator()
+    latency = summary["latency_seconds"]
+    print(f"✅ {summary['requests'] - summary['failed']}/{summary['requests']} succeeded in "
+          f"{summary['wall_seconds']:.1f}s ({summary['throughput_per_minute']:.1f} requests/min)")
+    print(f"⏱️  Latency: mean {latency['mean']:.2f}s, p50 {latency['p50']:.2f}s, "
+          f"p95 {latency['p95']:.2f}s, max {latency['max']:.2f}s")
+    stats = summary["cassette"]
+    print(f"📼 Cassette: {stats['exact']} exact, {stats['route']} by route, "
+          f"{stats['missed']} missed")
+    return 1 if summary["failed"] else 0
+
+
+def loadtest_command(argv):
+    """Drive concurrent crew runs on the fake LLM and search and find the saturation point."""
+    parser = argparse.ArgumentParser(
+        prog="main.py loadtest",
+        description="Simulate concurrent learners against one process using the local fake "
+                    "LLM and search, and report throughput, latency, memory and threads"
+    )
+    parser.add_argument("--rates", default="0.5,1,2,4,8",
+                        help="Comma-separated arrival rates per second to step through "
+                             "(default: 0.5,1,2,4,8); stops at the first saturated rate")
+    parser.add_argument("--duration", type=float, default=20,
+                        help="Seconds of arrivals per rate (default: 20)")
+    parser.add_argument("--topics", metavar="FILE",
+                        help="Topic mix, one per line (repeat a topic to weight it)")
+    parser.add_argument("--levels", default="all",
+                        help="'all' or a comma-separated list of expertise levels (default: all)")
+    parser.add_argument("--llm-latency", type=float, default=0.5,
+                        help="Simulated seconds per LLM call (default: 0.5)")
+    parser.add_argument("--search-latency", type=float, default=0.2,
+                        help="Simulated seconds per search (default: 0.2)")
+    parser.add_argument("--max-concurrency", type=int, default=0,
+                        help="Cap on runs in flight (default: 0 = a thread per learner, "
+                             "as in the Streamlit app)")
+    parser.add_argument("--no-plan-cache", action="store_true",
+                        help="Generate every plan instead of reusing stored plans")
+    parser.add_argument("--slo", type=float,
+                        help="p90 latency bound in seconds (default: 3x the first step's p50)")
+    parser.add_argument("--json", metavar="FILE", help="Also write the full results as JSON")
+    args = parser.parse_args(argv)
+    
+    try:
+        rates = [float(rate) for rate in args.rates.split(",") if rate.strip()]
+        levels = parse_levels(args.levels)
+        topics = read_topics(args.topics) if args.topics else list(DEFAULT_TOPICS)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        return 1
+    
+    # Fresh, throwaway stores and caches; fake URLs are never checked
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    store = PlanStore(os.path.join(workdir, "plans.db"))
+    
+    print(f"🏋️  Load test: {len(topics)} topic(s), levels {', '.join(levels)}, "
+          f"{args.duration:g}s per rate, LLM {args.llm_latency:g}s/call, "
+          f"search {args.search_latency:g}s/call")
+    print_separator()
+    print(f"{'rate/s':>7} {'done':>5} {'err':>4} {'thru/s':>7} {'p50':>6} {'p90':>6} "
+          f"{'p99':>6} {'RSS MiB':>15} {'threads':>7}")
+    
+    def report(step):
+        latency, rss = step["latency_seconds"], step["rss_mb"]
+        print(f"{step['rate']:>7g} {step['completed']:>5} {step['errors'] + step['unfinished']:>4} "
+              f"{step['throughput_per_second']:>7.2f} {latency['p50']:>6.2f} {latency['p90']:>6.2f} "
+              f"{latency['p99']:>6.2f} {rss['before']:>6.0f}->{rss['after']:<6.0f}  "
+              f"{step['peak_threads']:>7}{'  ⚠️  saturated' if step['saturated'] else ''}")
+        for sample in step["error_samples"]:
+            print(f"        {sample}")
+    
+    result = find_saturation(
+        rates,
+        args.duration,
+        topics,
+        levels,
+        latency_slo=args.slo,
+        report=report,
+        plan_store=store,
+        topic_index=build_default_index(store),
+        resource_index=ResourceIndex(os.path.join(workdir, "resources.db")),
+        run_config=config.run_config(fake_llm_latency=args.llm_latency,
+                                     fake_search_latency=args.search_latency,
+                                     cache_path=os.path.join(workdir, "cache.db"),
+                                     link_check_mode="off"),
+        max_concurrency=args.max_concurrency,
+        use_cache=not args.no_plan_cache
+    )
+    print_separator()
+    if result["saturation_rate"] is None:
+        print(f"⚠️  Saturated at the lowest rate ({min(rates):g}/s, p90 SLO "
+              f"{result['latency_slo'] or 0:.2f}s)")
+    else:
+        print(f"✅ Sustained {result['saturation_rate']:g} learners/s within a p90 of "
+              f"{result['latency_slo']:.2f}s"
+              f"{'' if result['steps'][-1]['saturated'] else ' (highest rate tried)'}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+    return 0
+
+
+def export_command(argv):
+    """Stream stored plans to NDJSON, or flatten them into Parquet/Arrow tables."""
+    parser = argparse.ArgumentParser(
+        prog="main.py export",
+        description="Export stored plans as NDJSON (one plan per line) or as flattened "
+                    "plans/resources/questions/projects tables in Parquet or Arrow format"
+    )
+    parser.add_argument("--store", default=config.plan_store_path or "plans.db",
+                        help="Plan store database (default: PLAN_STORE_PATH)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson",
+                        help="ndjson (default), parquet or arrow (the last two need pyarrow)")
+    parser.add_argument("-o", "--output", required=True,
+                        help="NDJSON file ('-' for stdout, .gz to compress), or the output "
+                             "directory for parquet/arrow")
+    parser.add_argument("--topic", help="Only plans for this topic")
+    parser.add_argument("--level", choices=["beginner", "intermediate", "advanced"],
+                        help="Only plans for this expertise level")
+    parser.add_argument("--provider", help="Only plans generated by this LLM provider")
+    parser.add_argument("--batch-size", type=int, default=2000,
+                        help="Plans per Parquet row group / Arrow record batch (default: 2000)")
+    args = parser.parse_args(argv)
+    
+    store = PlanStore(args.store)
+    records = store.iter_records(topic=args.topic, expertise_level=args.level,
+                                 provider=args.provider)
+    start = time.perf_counter()
+    try:
+        if args.format == "ndjson":
+            count = write_ndjson(records, args.output)
+            summary = f"{count} plan(s)"
+        else:
+            counts = write_columnar(records, args.output, args.format, args.batch_size)
+            summary = ", ".join(f"{rows} {table}" for table, rows in counts.items())
+    except (ImportError, OSError) as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        return 1
+    # Keep stdout clean when the export itself goes there
+    print(f"✅ Exported {summary} to {args.output} in {time.perf_counter() - start:.1f}s",
+          file=sys.stderr if args.output == "-" else sys.stdout)
+    return 0
+
+
+def train_dict_command(argv):
+    """Train a compression dictionary on stored plans and recompress them."""
+    parser = argparse.ArgumentParser(
+        prog="main.py train-dict",
+        description="Train a compression dictionary on the plans in the store, then rewrite "
+                    "existing plans with it"
+    )
+    parser.add_argument("--store", default=config.plan_store_path or "plans.db",
+                        help="Plan store database (default: PLAN_STORE_PATH)")
+    parser.add_argument("--size", type=int, default=DEFAULT_DICT_SIZE,
+                        help=f"Dictionary size in bytes (default: {DEFAULT_DICT_SIZE}; "
+                             "zlib uses at most 32768)")
+    parser.add_argument("--samples", type=int, default=2000,
+                        help="Newest payloads to train on (default: 2000)")
+    parser.add_argument("--codec", choices=["zstd", "zlib"],
+                        help="Dictionary codec (default: zstd if the zstandard package is "
+                             "installed, otherwise zlib)")
+    parser.add_argument("--no-recompress", action="store_true",
+                        help="Only use the new dictionary for new plans")
+    args = parser.parse_args(argv)
+    
+    store = PlanStore(args.store)
+    start = time.perf_counter()
+    try:
+        dict_id = store.train_dictionary(args.size, args.samples, args.codec)
+    except (RuntimeError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        return 1
+    if dict_id is None:
+        print("⚠️  No plans stored yet, no dictionary trained")
+        return 0
+    current = store.codec.current
+    print(f"🗜️  Trained {current['codec']} dictionary {dict_id} "
+          f"({current['size'] / 1024:.0f} KiB) in {time.perf_counter() - start:.1f}s")
+    if args.no_recompress:
+        return 0
+    start = time.perf_counter()
+    stats = store.recompress()
+    if stats["rows"]:
+        print(f"   Recompressed {stats['rows']} plan(s) in {time.perf_counter() - start:.1f}s: "
+              f"{stats['before_bytes'] / 2**20:.2f} MiB -> {stats['after_bytes'] / 2**20:.2f} MiB "
+              f"({stats['raw_bytes'] / max(stats['after_bytes'], 1):.1f}x smaller than "
+              f"uncompressed, was {stats['raw_bytes'] / max(stats['before_bytes'], 1):.1f}x)")
+    return 0
+
+
+def questions_command(argv):
+    """Show the question bank, or fill it from the quizzes of stored plans."""
+    parser = argparse.ArgumentParser(
+        prog="main.py questions",
+        description="Inspect the quiz question bank that quizzes are assembled from "
+                    "without an LLM call"
+    )
+    parser.add_argument("--bank", default=config.question_bank_path or "questions.db",
+                        help="Question bank database (default: QUESTION_BANK_PATH)")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Add the questions of every plan in the plan store first")
+    parser.add_argument("--store", default=config.plan_store_path or "plans.db",
+                        help="Plan store to backfill from (default: PLAN_STORE_PATH)")
+    parser.add_argument("--limit", type=int, default=20,
+                        help="Topic/level rows to show (default: 20)")
+    args = parser.parse_args(argv)
+    
+    bank = QuestionBank(args.bank)
+    if args.backfill:
+        start = time.perf_counter()
+        added = bank.add_records(PlanStore(args.store).iter_records())
+        print(f"🏦 Banked {added} question(s) from {args.store} "
+              f"in {time.perf_counter() - start:.1f}s")
+    
+    rows = bank.summary(args.limit)
+    if not rows:
+        print("📭 The question bank is empty.")
+        return 0
+    print(f"🏦 {bank.count()} question(s) banked; quizzes are assembled once a topic/level holds "
+          f"{config.question_bank_depth_factor:g}x the requested questions")
+    print_separator("-")
+    print(f"{'Topic':<40} {'Level':<13} {'Questions':>9} {'Concepts':>8} {'Served':>6}")
+    for row in rows:
+        print(f"{row['topic'][:40]:<40} {row['expertise_level']:<13} {row['questions']:>9} "
+              f"{row['concepts']:>8} {row['served'] or 0:>6}")
+    return 0
+
+
+def grade_command(argv):
+    """Grade a cohort's answers to a stored plan's quiz and report item statistics."""
+    parser = argparse.ArgumentParser(
+        prog="main.py grade",
+        description="Grade learners' answers to a stored quiz and report per-question "
+                    "difficulty, discrimination and distractor statistics"
+    )
+    parser.add_argument("plan_id", help="Plan id (see `main.py plans`)")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--responses", metavar="FILE",
+                        help="One learner per line: 'answers' or 'learner_id,answers', one "
+                             "letter per question and any other character for a blank")
+    source.add_argument("--simulate", type=int, metavar="N",
+                        help="Grade N synthetic learners instead (Rasch model from the tags)")
+    parser.add_argument("--retag", action="store_true",
+                        help="Re-tag question difficulties from the observed results and save "
+                             "them to the plan store and question bank")
+    parser.add_argument("--min-learners", type=int, default=30,
+                        help="Cohort size needed before re-tagging (default: 30)")
+    parser.add_argument("--json", metavar="FILE", help="Also write the full report as JSON")
+    args = parser.parse_args(argv)
+    
+    store = open_default_store()
+    plan = store.get(args.plan_id) if store is not None else None
+    if plan is None:
+        print(f"❌ No plan with id {args.plan_id}")
+        return 1
+    quiz = plan["quiz"]
+    num_options = max((len(question.options) for question in quiz.questions), default=0)
+    
+    start = time.perf_counter()
+    if args.simulate:
+        responses = simulate_responses(quiz, args.simulate)
+    else:
+        try:
+            with open(args.responses) as f:
+                answers = [line.rstrip("\n").rsplit(",", 1)[-1] for line in f
+                           if line.strip() and not line.startswith("#")]
+        except OSError as e:
+            print(f"❌ Error: {e}")
+            return 1
+        responses = encode_responses(answers, len(quiz.questions), num_options)
+    loaded = time.perf_counter()
+    try:
+        report = grade_cohort(quiz, responses)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return 1
+    graded = time.perf_counter()
+    
+    print(f"📊 Graded {report['learners']} learner(s) x {report['questions']} question(s) "
+          f"({report['responses']} responses) in {graded - loaded:.2f}s "
+          f"(+{loaded - start:.2f}s loading)")
+    print(f"   Mean score {report['mean_score']:.2f}/{report['questions']} "
+          f"(sd {report['score_sd']:.2f})")
+    print_separator("-")
+    print(f"{'#':>3} {'p':>5} {'D':>6} {'r_pb':>6} {'blank':>6}  {'tag':<7} {'observed':<8} flags")
+    for item in report["items"]:
+        flags = ", ".join(f"{option['option']}: {option['flag']}"
+                          for option in item["options"] if option["flag"])
+        print(f"{item['index'] + 1:>3} {item['difficulty']:>5.2f} {item['discrimination']:>6.2f} "
+              f"{item['point_biserial']:>6.2f} {item['blank_rate']:>6.1%}  "
+              f"{item['tagged_difficulty']:<7} {item['suggested_difficulty']:<8} {flags}")
+    
+    if args.retag:
+        retagged, changes = retag_difficulty(quiz, report, args.min_learners)
+        if report["learners"] < args.min_learners:
+            print(f"\n⚠️  Only {report['learners']} learner(s); need {args.min_learners} to re-tag")
+        elif not changes:
+            print("\n✓ Difficulty tags already match the results")
+        else:
+            store.add({**plan, "quiz": retagged})
+            bank = open_default_question_bank()
+            if bank is not None:
+                bank.add_quiz(retagged, plan["expertise_level"], plan["plan_id"], plan["topic"])
+            print(f"\n🏷️  Re-tagged {len(changes)} question(s) in plan {args.plan_id}"
+                  f"{' and the question bank' if bank is not None else ''}")
+            for change in changes:
+                print(f"   Q{change['index'] + 1}: {change['from']} -> {change['to']} "
+                      f"(p={change['p']:.2f})")
+    
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({**report, "scores": report["scores"].tolist()}, f, indent=2)
+        print(f"💾 Report written to {args.json}")
+    return 0
+
+
+def review_command(argv):
+    """Spaced-repetition review of stored quiz questions."""
+    parser = argparse.ArgumentParser(
+        prog="main.py review",
+        description="Review quiz questions from stored plans with SM-2 spaced repetition"
+    )
+    parser.add_argument("--db", default=config.review_db_path or "reviews.db",
+                        help="Review database (default: REVIEW_DB_PATH)")
+    commands = parser.add_subparsers(dest="action", required=True)
+    enroll = commands.add_parser("enroll", help="Add a plan's quiz questions to a learner's cards")
+    enroll.add_argument("learner")
+    enroll.add_argument("plan_ids", nargs="+", metavar="plan_id")
+    study = commands.add_parser("study", help="Answer the learner's due cards interactively")
+    study.add_argument("learner")
+    study.add_argument("--limit", type=int, default=20, help="Cards per session (default: 20)")
+    stats = commands.add_parser("stats", help="Show a learner's card counts")
+    stats.add_argument("learner")
+    reschedule = commands.add_parser("reschedule",
+                                     help="Spread overdue backlogs over the coming days")
+    reschedule.add_argument("--max-per-day", type=int, default=50,
+                            help="Overdue cards left due per learner per day (default: 50)")
+    args = parser.parse_args(argv)
+    
+    scheduler = ReviewScheduler(args.db)
+    
+    if args.action == "enroll":
+        store = open_default_store()
+        for plan_id in args.plan_ids:
+            plan = store.get(plan_id) if store is not None else None
+            if plan is None:
+                print(f"❌ No plan with id {plan_id}")
+                return 1
+            added = scheduler.enroll(args.learner, plan)
+            print(f"🗂️  {added} new card(s) for {args.learner} from '{plan['topic']}' ({plan_id})")
+    
+    elif args.action == "study":
+        cards = scheduler.due(args.learner, args.limit)
+        if not cards:
+            print(f"🎉 Nothing due for {args.learner}")
+            return 0
+        correct = 0
+        for i, card in enumerate(cards, 1):
+            question = card["question"]
+            print_separator("-")
+            print(f"Card {i}/{len(cards)} - {card['topic']}\n\n{question.question}\n")
+            for option in question.options:
+                print(f"   {option.option}) {option.text}")
+            try:
+                choice = input("\nYour answer (blank to stop): ").strip()
+            except EOFError:
+                choice = ""
+            if not choice:
+                break
+            if scheduler.answer(args.learner, card, choice):
+                correct += 1
+                print("✅ Correct")
+            else:
+                print(f"❌ The answer is {question.correct_answer}")
+            print(f"💡 {question.explanation}")
+        print_separator("-")
+        print(f"📈 {correct} correct this session")
+    
+    elif args.action == "reschedule":
+        start = time.perf_counter()
+        moved = scheduler.reschedule_overdue(args.max_per_day)
+        print(f"📅 Moved {moved} overdue card(s) in {time.perf_counter() - start:.1f}s "
+              f"(at most {args.max_per_day} overdue per learner per day)")
+    
+    if args.action in ("enroll", "study", "stats"):
+        counts = scheduler.stats(args.learner)
+        print(f"🗂️  {args.learner}: {counts['cards']} card(s), {counts['due']} due now, "
+              f"{counts['due_today']} due within a day, {counts['new']} never reviewed")
+    return 0
+
+
+def serve_command(argv):
+    """Serve the crew over an asynchronous HTTP API."""
+    parser = argparse.ArgumentParser(
+        prog="main.py serve",
+        description="Serve learning plans over HTTP: submit, status, result and event-stream "
+                    "endpoints backed by a bounded worker pool"
+    )
+    parser.add_argument("--host", default=config.api_host, help="Address to bind (default: API_HOST)")
+    parser.add_argument("--port", type=int, default=config.api_port,
+                        help="Port to bind (default: API_PORT)")
+    parser.add_argument("--workers", type=int, default=config.api_workers,
+                        help="Concurrent crew runs (default: API_WORKERS)")
+    parser.add_argument("--max-queue", type=int, default=config.api_max_queue,
+                        help="Waiting jobs beyond which submissions get 429 (default: API_MAX_QUEUE)")
+    parser.add_argument("--llm", choices=["openrouter", "groq", "fake"], default="openrouter",
+                        help="LLM provider of requests that do not name one (default: openrouter)")
+    args = parser.parse_args(argv)
+    
+    if args.llm != "fake":
+        try:
+            config.validate_api_keys()
+        except ValueError as e:
+            print(f"❌ Error: {e}")
+            return 1
+    
+    store = open_default_store()
+    service = PlanService(
+        plan_store=store,
+        topic_index=build_default_index(store),
+        resource_index=open_default_resource_index(),
+        question_bank=open_default_question_bank(),
+        llm_provider=args.llm,
+        workers=args.workers,
+        max_queue=args.max_queue,
+        job_ttl=config.api_job_ttl_seconds
+    )
+    try:
+        asyncio.run(APIServer(service, args.host, args.port).serve_forever())
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped")
+    except OSError as e:
+        print(f"❌ Error: {e}")
+        return 1
+    return 0
+
+
+COMMANDS = {
+    "plans": plans_command,
+    "warm": warm_command,
+    "regenerate": regenerate_command,
+    "replay": replay_command,
+    "loadtest": loadtest_command,
+    "export": export_command,
+    "train-dict": train_dict_command,
+    "questions": questions_command,
+    "grade": grade_command,
+    "review": review_command,
+    "serve": serve_command,
+}
+
+
 def main():
     """Main CLI function."""
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        return COMMANDS[sys.argv[1]](sys.argv[2:])
+    
     parser = argparse.ArgumentParser(
         description="Personalized Education Assistant - Generate customized learning plans",
-        formatter_class=argparse.RawDescriptionHelpFormatter
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="Other commands:\n"
+               "  main.py plans --help    Browse the persistent plan store\n"
+               "  main.py warm --help     Precompute plans for popular topics\n"
+               "  main.py regenerate --help  Rerun selected stages of a stored plan\n"
+               "  main.py replay --help   Replay a recorded workload from a cassette\n"
+               "  main.py loadtest --help  Find how many concurrent learners one process sustains\n"
+               "  main.py export --help   Export stored plans as NDJSON, Parquet or Arrow\n"
+               "  main.py train-dict --help  Train a compression dictionary for stored plans\n"
+               "  main.py questions --help  Inspect or backfill the quiz question bank\n"
+               "  main.py grade --help    Grade a cohort's quiz answers and re-tag difficulties\n"
+               "  main.py review --help   Spaced-repetition review of stored quiz questions\n"
+               "  main.py serve --help    Serve learning plans over an HTTP API"
     )
     
     parser.add_argument(
@@ -144,6 +1040,13 @@ def main():
         help="Your expertise level (default: beginner)"
     )
     
+    parser.add_argument(
+        "--levels",
+        type=str,
+        help="Generate several levels from one shared search: 'all' or a comma-separated list "
+             "(overrides --level)"
+    )
+    
     parser.add_argument(
         "-r", "--resources",
         type=int,
@@ -168,9 +1071,22 @@ def main():
     parser.add_argument(
         "--llm",
         type=str,
-        choices=["openrouter", "groq"],
+        choices=["openrouter", "groq", "fake"],
         default="openrouter",
-        help="LLM provider to use (default: openrouter)"
+        help="LLM provider to use (default: openrouter; 'fake' runs a local stand-in)"
+    )
+    
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Never touch the network: answer from stored plans, local indexes and caches"
+    )
+    
+    parser.add_argument(
+        "--record",
+        type=str,
+        metavar="CASSETTE",
+        help="Record every LLM and search call of the run to a cassette (gzip JSON lines)"
     )
     
     parser.add_argument(
@@ -185,57 +1101,72 @@ def main():
         help="Don't display results in console (only save to file)"
     )
     
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always generate a new plan instead of reusing a stored one for a similar topic"
+    )
+    
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=config.metrics_port,
+        help="Serve Prometheus metrics on this local port while running (default: disabled)"
+    )
+    
+    parser.add_argument(
+        "--metrics-dump",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="Write Prometheus metrics to FILE (or stdout) when the run finishes"
+    )
+    
+    parser.add_argument(
+        "--profile",
+        type=str,
+        choices=PROFILER_KINDS,
+        help="Profile the run (CPU, allocations or sampled wall-clock stacks)"
+    )
+    
+    parser.add_argument(
+        "--profile-dir",
+        type=str,
+        default="profiles",
+        help="Directory for profiler output (default: profiles)"
+    )
+    
     args = parser.parse_args()
+    if args.offline:
+        config.offline = True
+    if args.record:
+        config.cassette_mode = "record"
+        config.cassette_path = args.record
     
-    # Validate API keys
-    try:
-        config.validate_api_keys()
-    except ValueError as e:
-        print(f"❌ Error: {e}")
-        print("\nPlease set your API keys in the .env file")
-        return 1
+    # Validate API keys (the local fake provider and offline runs need none)
+    if args.llm != "fake" and not config.offline:
+        try:
+            config.validate_api_keys()
+        except ValueError as e:
+            print(f"❌ Error: {e}")
+            print("\nPlease set your API keys in the .env file")
+            return 1
+    
+    if args.metrics_port:
+        metrics.start_http_server(args.metrics_port)
+        print(f"📈 Metrics available at http://127.0.0.1:{args.metrics_port}/metrics")
     
-    # Create and run crew
     try:
-        print("\n🎓 PERSONALIZED EDUCATION ASSISTANT")
-        print_separator()
-        print(f"📚 Topic: {args.topic}")
-        print(f"🎯 Expertise Level: {args.level.capitalize()}")
-        print(f"🤖 LLM Provider: {args.llm}")
-        print_separator()
-        
-        crew = create_education_crew(args.llm)
-        result = crew.run(
-            topic=args.topic,
-            expertise_level=args.level,
-            resources_per_category=args.resources,
-            num_questions=args.questions,
-            num_projects=args.projects
-        )
-        
-        if not result["success"]:
-            print(f"\n❌ Error: {result.get('error', 'Unknown error')}")
-            return 1
-        
-        # Display results
-        if not args.no_display:
-            print_learning_materials(result["learning_materials"])
-            print_quiz(result["quiz"])
-            print_projects(result["projects"])
-        
-        # Save to file
-        if args.output or args.no_display:
-            save_to_file(result, args.output)
-        
-        print("\n" + "="*80)
-        print("✅ LEARNING PLAN GENERATED SUCCESSFULLY!")
-        print("="*80 + "\n")
-        
-        return 0
-        
-    except Exception as e:
-        print(f"\n❌ An error occurred: {str(e)}")
-        return 1
+        if args.levels:
+            return run_levels_crew(args)
+        return run_crew(args)
+    finally:
+        if args.metrics_dump:
+            dump_metrics(args.metrics_dump)
+        if args.record:
+            cassette = active_cassette()
+            cassette.close()
+            print(f"📼 Recorded {cassette.stats['recorded']} call(s) to {args.record}")
 
 
 if __name__ == "__main__":
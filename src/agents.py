@@ -1,43 +1,84 @@
 """
 Agent definitions for the Personalized Education Assistant.
 """
+from typing import Optional
 from crewai import Agent, LLM
-from src.tools import search_tool, project_tool
-from src.config import config
+from src.tools import EducationTools
+from src.clients import client_pool
+from src.config import RunConfig, config
+from src.llm_proxy import LLMProxy, attribute_usage
+from src.routing import build_router
+from src.fakes import FakeLLM
 
 
-def create_llm(provider: str = None):
-    """Create LLM instance with fallback support."""
+def create_endpoint_llm(provider: str, model: str = None, run_config: Optional[RunConfig] = None):
+    """Create the CrewAI LLM for one provider and model (default: the provider's configured model)."""
+    run_config = run_config or config.run_config()
+    llm_config = run_config.get_llm_config(provider, model)
+    if llm_config["provider"] == "fake":
+        return FakeLLM(model=llm_config["model"], latency=run_config.fake_llm_latency)
+    
+    # Use CrewAI's LLM class which handles LiteLLM integration
+    # LiteLLM will automatically route based on provider prefix in model name
+    return LLM(
+        model=llm_config["model"],
+        api_key=llm_config["api_key"],
+        temperature=0.7
+    )
+
+
+def pooled_llm(run_config: RunConfig, provider: str, model: str = None):
+    """The endpoint LLM for `run_config`, shared with other runs of the same configuration."""
+    model = run_config.get_llm_config(provider, model)["model"]
+    return client_pool.get(run_config, ("llm", provider, model),
+                           lambda: attribute_usage(create_endpoint_llm(provider, model, run_config)))
+
+
+def create_llm(provider: str = None, run_config: Optional[RunConfig] = None):
+    """Create LLM instance with fallback support and, unless disabled, adaptive routing."""
+    run_config = run_config or config.run_config()
     try:
-        llm_config = config.get_llm_config(provider)
-        
-        # Use CrewAI's LLM class which handles LiteLLM integration
-        # LiteLLM will automatically route based on provider prefix in model name
-        llm = LLM(
-            model=llm_config["model"],
-            api_key=llm_config["api_key"],
-            temperature=0.7
-        )
-        return llm, llm_config["provider"]
+        llm_config = run_config.get_llm_config(provider)
+        llm = pooled_llm(run_config, llm_config["provider"])
+        router = build_router(llm_config["provider"], run_config)
+        return LLMProxy.wrap(llm, llm_config["provider"], router,
+                             lambda p, m: pooled_llm(run_config, p, m), run_config), \
+            llm_config["provider"]
     except Exception as e:
         print(f"Error creating LLM with {provider}: {e}")
         # Try fallback
         if provider != "groq":
             print("Attempting fallback to Groq...")
-            return create_llm("groq")
+            return create_llm("groq", run_config)
         raise
 
 
 class EducationAgents:
     """Factory class for creating education assistant agents."""
     
-    def __init__(self, llm_provider: str = None):
-        """Initialize agents with specified LLM provider."""
-        self.llm, self.active_provider = create_llm(llm_provider)
+    def __init__(self, llm_provider: str = None, run_config: Optional[RunConfig] = None):
+        """
+        Initialize agents with specified LLM provider.
+        
+        Args:
+            llm_provider: LLM provider (default: the run's DEFAULT_LLM)
+            run_config: Settings of the run (default: the environment's)
+        """
+        self.run_config = run_config or config.run_config()
+        self.tools = EducationTools(self.run_config)
+        self.llm, self.active_provider = create_llm(llm_provider, self.run_config)
+        # Fake LLM runs stay fully local
+        self.search_tool = self.tools.search_tool("fake" if self.active_provider == "fake" else None)
         print(f"✓ Using LLM provider: {self.active_provider}")
     
-    def learning_material_agent(self):
-        """Create the Learning Material Agent."""
+    def learning_material_agent(self, with_search: bool = True):
+        """
+        Create the Learning Material Agent.
+        
+        Args:
+            with_search: Give the agent the search tool; disable when it selects
+                from search results that were gathered up front
+        """
         return Agent(
             role="Educational Content Curator",
             goal="Find and curate the highest quality learning resources (videos, articles, exercises) "
@@ -48,7 +89,7 @@ class EducationAgents:
                      "You understand how different expertise levels require different types of content "
                      "and always prioritize authoritative sources like official documentation, "
                      "reputable educational platforms, and well-known experts in the field.",
-            tools=[search_tool],
+            tools=[self.search_tool] if with_search else [],
             llm=self.llm,
             verbose=True,
             allow_delegation=False
@@ -84,7 +125,7 @@ class EducationAgents:
                      "level and always ensure projects are achievable yet challenging. Your project "
                      "suggestions are well-structured with clear deliverables and emphasize real-world "
                      "applications that will help learners build impressive portfolios.",
-            tools=[project_tool],
+            tools=[self.tools.project_tool],
             llm=self.llm,
             verbose=True,
             allow_delegation=False
@@ -0,0 +1,193 @@
+"""
+Persistent TTL caches for web search results and LLM completions.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from src.config import RunConfig, config
+from src.metrics import record_cache_lookup
+from src.serialization import dumps, loads
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS idx_cache_expiry ON cache (expires_at);
+"""
+
+
+class OfflineCacheMiss(RuntimeError):
+    """Raised in offline mode when a network call is needed but nothing is cached."""
+
+
+def make_key(*parts: Any) -> str:
+    """Stable hash key for any JSON-serializable parts."""
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """
+    Key/value cache with per-entry expiry, backed by SQLite and fronted by a
+    small in-memory LRU. Values must be JSON-serializable. Entries are read
+    on every lookup, so they are stored with plain zlib: inflating against a
+    trained dictionary (as the plan store does) costs more than it saves here.
+    """
+
+    _connections: Dict[str, tuple] = {}
+    _connections_lock = threading.Lock()
+
+    def __init__(self, path: str, namespace: str, ttl_seconds: float, memory_items: int = 1024):
+        """
+        Args:
+            path: SQLite database file shared by all namespaces
+            namespace: Name of this cache (also its metrics label)
+            ttl_seconds: Lifetime of each entry
+            memory_items: Size of the in-memory LRU front
+        """
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.memory_items = memory_items
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._conn, self._lock = self._connect(path)
+
+    @classmethod
+    def _connect(cls, path: str) -> tuple:
+        # One connection (and lock) per database file, shared by every namespace
+        with cls._connections_lock:
+            shared = cls._connections.get(path)
+            if shared is None:
+                conn = sqlite3.connect(path, check_same_thread=False)
+                if path != ":memory:":
+                    conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(SCHEMA)
+                shared = cls._connections[path] = (conn, threading.RLock())
+            return shared
+
+    def _remember(self, key: str, value: Any, expires_at: float):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for `key`, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None and cached[1] > now:
+                self._memory.move_to_end(key)
+                record_cache_lookup(self.namespace, True)
+                return cached[0]
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                record_cache_lookup(self.namespace, False)
+                return None
+            value = loads(zlib.decompress(row[0]))
+            self._remember(key, value, row[1])
+        record_cache_lookup(self.namespace, True)
+        return value
+
+    def contains(self, key: str) -> bool:
+        """Check for a fresh entry without counting a cache lookup."""
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None and cached[1] > now:
+                return True
+            row = self._conn.execute(
+                "SELECT expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+        return row is not None and row[0] > now
+
+    def set(self, key: str, value: Any):
+        """Store `value` under `key` for the cache's TTL."""
+        expires_at = time.time() + self.ttl_seconds
+        payload = zlib.compress(dumps(value))
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, payload, expires_at)
+                )
+            self._remember(key, value, expires_at)
+
+
+    def purge_expired(self) -> int:
+        """Delete expired entries; returns how many were removed."""
+        with self._lock, self._conn:
+            self._memory.clear()
+            return self._conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND expires_at <= ?",
+                (self.namespace, time.time())
+            ).rowcount
+
+
+_caches: Dict[Tuple[str, str], Optional[TTLCache]] = {}
+_caches_lock = threading.Lock()
+
+
+def _default_cache(namespace: str, ttl_hours: float,
+                   run_config: Optional[RunConfig] = None) -> Optional[TTLCache]:
+    path = (run_config or config).cache_path
+    with _caches_lock:
+        if (namespace, path) not in _caches:
+            enabled = path and ttl_hours > 0
+            _caches[namespace, path] = TTLCache(path, namespace, ttl_hours * 3600) \
+                if enabled else None
+        return _caches[namespace, path]
+
+
+def search_cache(run_config: Optional[RunConfig] = None) -> Optional[TTLCache]:
+    """Cache of web search results at the run's cache path (None if disabled)."""
+    return _default_cache("search", config.search_cache_ttl_hours, run_config)
+
+
+def llm_cache(run_config: Optional[RunConfig] = None) -> Optional[TTLCache]:
+    """Cache of LLM completions at the run's cache path (None if disabled)."""
+    return _default_cache("llm", config.llm_cache_ttl_hours, run_config)
+
+
+_fresh_completions: ContextVar[bool] = ContextVar("fresh_completions", default=False)
+
+
+@contextmanager
+def fresh_completions(enabled: bool = True):
+    """
+    Skip LLM cache reads for the calls made inside the block (in this thread),
+    so callers asking for new output get it; completions are still cached.
+    """
+    token = _fresh_completions.set(enabled or _fresh_completions.get())
+    try:
+        yield
+    finally:
+        _fresh_completions.reset(token)
+
+
+def wants_fresh_completions() -> bool:
+    """Whether the current call is inside `fresh_completions` (never when offline)."""
+    return _fresh_completions.get() and not config.offline
+
+
+def link_cache(run_config: Optional[RunConfig] = None) -> Optional[TTLCache]:
+    """Cache of resource link check results at the run's cache path (None if disabled)."""
+    return _default_cache("links", config.link_cache_ttl_hours, run_config)
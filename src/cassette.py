@@ -0,0 +1,230 @@
+"""
+Record/replay cassettes for LLM and search traffic.
+
+A recording captures every upstream LLM completion made through `LLMProxy`,
+every web search made through the search tool, and every plan request, as
+gzip-compressed JSON lines. Replaying serves the recorded responses back with
+their original (or scaled) latencies, so a captured workload can be rerun
+against new orchestration code on a box without network access or API keys.
+"""
+import atexit
+import gzip
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from src.cache import make_key
+from src.config import config
+from src.serialization import dumps, loads
+
+
+CASSETTE_VERSION = 1
+CASSETTE_MODES = ("off", "record", "replay")
+
+
+class CassetteMiss(RuntimeError):
+    """Raised during replay when a request has no recorded response."""
+
+
+class Cassette:
+    """
+    One cassette file, either being recorded or replayed.
+
+    Entries are matched on replay by the exact request key first. LLM calls
+    whose prompt changed (for example because the orchestration changed)
+    fall back to the next unserved response recorded for the same route, i.e.
+    the same model and system prompt, in recording order.
+    """
+
+    def __init__(self, path: str, mode: str, latency_scale: float = 1.0):
+        """
+        Open a cassette.
+
+        Args:
+            path: Cassette file (gzip-compressed JSON lines)
+            mode: "record" to write a new cassette, "replay" to serve one back
+            latency_scale: Multiplier for recorded latencies on replay (0 = no delay)
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Cassette mode must be 'record' or 'replay', not '{mode}'")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.started = time.time()
+        self.stats = {"recorded": 0, "skipped": 0, "exact": 0, "route": 0, "missed": 0}
+        self._lock = threading.Lock()
+        self._file = None
+        self._exact: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._routes: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._runs: List[Dict[str, Any]] = []
+
+        if mode == "record":
+            self._file = gzip.open(path, "wt", encoding="utf-8")
+            self._write(dumps({"kind": "header", "version": CASSETTE_VERSION,
+                               "created": self.started}).decode("utf-8"))
+        else:
+            self._load()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _write(self, line: str):
+        # Calls that finish after the recording was closed are dropped
+        if self._file is not None:
+            self._file.write(line + "\n")
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            header = loads(f.readline() or "{}")
+            if header.get("kind") != "header" or header.get("version") != CASSETTE_VERSION:
+                raise ValueError(f"{self.path} is not a version {CASSETTE_VERSION} cassette")
+            for line in f:
+                entry = loads(line)
+                if entry["kind"] == "run":
+                    self._runs.append(entry)
+                    continue
+                entry["served"] = False
+                self._exact.setdefault(entry["key"], deque()).append(entry)
+                if entry.get("route"):
+                    self._routes.setdefault(entry["route"], deque()).append(entry)
+
+    def record(
+        self,
+        kind: str,
+        key: str,
+        seconds: float,
+        route: Optional[str] = None,
+        response: Any = None,
+        error: Optional[BaseException] = None
+    ):
+        """
+        Append one upstream call.
+
+        Args:
+            kind: "llm" or "search"
+            key: Exact request key (see `make_key`)
+            seconds: Upstream latency of the call
+            route: Looser key that replay falls back to when the exact key misses
+            response: JSON-serializable response (or a pydantic model)
+            error: Exception the call raised instead of responding
+        """
+        entry = {"kind": kind, "t": round(time.time() - self.started, 4), "key": key,
+                 "seconds": round(seconds, 4)}
+        if route:
+            entry["route"] = route
+        if error is not None:
+            entry["error"] = f"{type(error).__name__}: {error}"
+        elif hasattr(response, "model_dump"):
+            entry["response_json"] = response.model_dump(mode="json")
+        else:
+            entry["response"] = response
+        try:
+            line = dumps(entry).decode("utf-8")
+        except TypeError:
+            # Native tool-call objects cannot be replayed; leave them out
+            with self._lock:
+                self.stats["skipped"] += 1
+            return
+        with self._lock:
+            self._write(line)
+            self.stats["recorded"] += 1
+
+    def record_run(self, **request: Any):
+        """Append a plan request (topic, level, parameters) so it can be re-issued on replay."""
+        entry = {"kind": "run", "t": round(time.time() - self.started, 4), **request}
+        with self._lock:
+            self._write(dumps(entry).decode("utf-8"))
+
+    def replay(self, kind: str, key: str, route: Optional[str] = None,
+               response_model: Any = None) -> Any:
+        """
+        Serve the recorded response for a request, after its scaled latency.
+
+        Raises:
+            CassetteMiss: Nothing was recorded for the request
+            RuntimeError: The recorded call failed; the original error is re-raised as text
+        """
+        with self._lock:
+            entry = self._take(self._exact.get(key))
+            if entry is not None:
+                self.stats["exact"] += 1
+            elif route:
+                entry = self._take(self._routes.get(route), reuse_last=False)
+                if entry is not None:
+                    self.stats["route"] += 1
+            if entry is None:
+                self.stats["missed"] += 1
+                raise CassetteMiss(f"Cassette {self.path} has no recorded {kind} response "
+                                   f"for this request")
+            entry["served"] = True
+
+        if self.latency_scale > 0 and entry["seconds"] > 0:
+            time.sleep(entry["seconds"] * self.latency_scale)
+        if "error" in entry:
+            raise RuntimeError(f"Replayed upstream error: {entry['error']}")
+        if "response_json" in entry and response_model is not None:
+            return response_model.model_validate(entry["response_json"])
+        return entry.get("response", entry.get("response_json"))
+
+    @staticmethod
+    def _take(entries: Optional[Deque[Dict[str, Any]]], reuse_last: bool = True):
+        # Serve recorded responses in order; the last one repeats for extra identical requests
+        if not entries:
+            return None
+        while len(entries) > 1 and entries[0]["served"]:
+            entries.popleft()
+        entry = entries[0]
+        if entry["served"] and not reuse_last:
+            return None
+        if len(entries) > 1:
+            entries.popleft()
+        return entry
+
+    def runs(self) -> List[Dict[str, Any]]:
+        """Plan requests recorded in this cassette, in arrival order."""
+        return list(self._runs)
+
+    def close(self):
+        """Finish writing a recording."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def llm_request_key(model: str, messages: Any, stop: Any, response_model: Any) -> str:
+    """Exact key of an LLM request (the same key the LLM cache uses)."""
+    return make_key(model, messages, stop, response_model.__name__ if response_model else None)
+
+
+def llm_route_key(model: str, messages: Any) -> str:
+    """Replay fallback key of an LLM request: its model and system prompt."""
+    system = ""
+    if isinstance(messages, list):
+        system = next((m.get("content", "") for m in messages
+                       if isinstance(m, dict) and m.get("role") == "system"), "")
+    return make_key(model, system)
+
+
+_active: Optional[Cassette] = None
+_active_lock = threading.Lock()
+
+
+def active_cassette() -> Optional[Cassette]:
+    """The process-wide cassette from CASSETTE_MODE/CASSETTE_PATH (None when off)."""
+    global _active
+    if config.cassette_mode == "off" or not config.cassette_path:
+        return None
+    with _active_lock:
+        if _active is None:
+            _active = Cassette(config.cassette_path, config.cassette_mode,
+                               config.cassette_latency_scale)
+            if _active.recording:
+                atexit.register(_active.close)
+        return _active
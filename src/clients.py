@@ -0,0 +1,77 @@
+"""
+Process-wide pool of LLM and search clients, keyed by the `RunConfig` they
+were built from.
+
+Building a CrewAI LLM takes around a tenth of a second, so crews reuse the
+clients of earlier crews with the same configuration instead of building
+their own. Configurations are kept in LRU order and the clients of the least
+recently used one are dropped once `max_configs` are pooled. A pooled LLM's
+own token counters are shared by every crew using it, so crews count their
+runs' tokens with `src.llm_proxy.count_tokens` instead.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+from src.config import RunConfig
+
+
+class ClientPool:
+    """Clients per configuration, built on first use."""
+
+    def __init__(self, max_configs: int = 64):
+        """
+        Args:
+            max_configs: Configurations whose clients are kept
+        """
+        self.max_configs = max_configs
+        self._clients: "OrderedDict[str, Dict[Tuple, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._building: Dict[Tuple, threading.Lock] = {}
+
+    def get(self, run_config: RunConfig, name: Tuple, build: Callable[[], Any]) -> Any:
+        """
+        The client `name` (e.g. ("llm", provider, model)) for `run_config`,
+        built with `build` if the pool does not have it yet.
+        """
+        key = run_config.key
+        with self._lock:
+            clients = self._clients.get(key)
+            if clients is not None:
+                self._clients.move_to_end(key)
+                if name in clients:
+                    return clients[name]
+            # One build per client even when many requests ask for it at once
+            building = self._building.setdefault((key, name), threading.Lock())
+        with building:
+            with self._lock:
+                client = self._clients.get(key, {}).get(name)
+            if client is not None:
+                return client
+            try:
+                client = build()
+                with self._lock:
+                    self._clients.setdefault(key, {})[name] = client
+                    self._clients.move_to_end(key)
+                    while len(self._clients) > self.max_configs:
+                        self._clients.popitem(last=False)
+            finally:
+                # A failed build leaves nothing behind; the next caller tries again
+                with self._lock:
+                    self._building.pop((key, name), None)
+        return client
+
+    def stats(self) -> Dict[str, int]:
+        """Number of pooled configurations and clients."""
+        with self._lock:
+            return {"configs": len(self._clients),
+                    "clients": sum(len(clients) for clients in self._clients.values())}
+
+    def clear(self):
+        """Drop every pooled client."""
+        with self._lock:
+            self._clients.clear()
+
+
+# Global client pool
+client_pool = ClientPool()
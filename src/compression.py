@@ -0,0 +1,280 @@
+"""
+Dictionary compression for stored plan payloads.
+
+Plans are small, highly repetitive JSON documents (the same field names,
+boilerplate explanations and domains), which generic compressors handle
+poorly on their own. A dictionary trained on existing payloads primes the
+compressor with that shared content. zstd is used when the optional
+`zstandard` package is installed; otherwise zlib with a preset dictionary.
+
+Every payload starts with a small header naming its codec and dictionary id,
+and dictionaries are kept in the same SQLite file as the payloads, so old
+payloads stay readable after retraining. Payloads without a header are
+legacy plain zlib.
+"""
+import re
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional speedup
+    zstandard = None
+
+
+# First header byte; a zlib stream never starts with it (its first byte is 0x?8)
+MAGIC = 0xC5
+HEADER = struct.Struct(">BBI")
+
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODEC_NAMES = {"zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD}
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+# zlib only looks back 32 KiB, so a larger preset dictionary would be wasted
+ZLIB_MAX_DICT_SIZE = 32 * 1024
+DEFAULT_DICT_SIZE = 112 * 1024
+
+DICTIONARY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS compression_dicts (
+    dict_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    codec TEXT NOT NULL,
+    data BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def default_codec() -> str:
+    """The codec used for new dictionaries and payloads: zstd when installed, else zlib."""
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def _require_zstd():
+    if zstandard is None:
+        raise RuntimeError("This payload was compressed with zstd: pip install zstandard")
+
+
+def _dict_id(codec: str, data: bytes) -> int:
+    # Stable, non-zero id (0 means "no dictionary" in the header)
+    return zlib.crc32(codec.encode() + data) or 1
+
+
+def _zlib_dictionary(samples: List[bytes], size: int) -> bytes:
+    """
+    Build a zlib preset dictionary: the JSON fragments (keys, values and
+    punctuation runs) that recur across the most samples, weighted by length,
+    with the rest of the budget filled from the first samples themselves.
+    """
+    size = min(size, ZLIB_MAX_DICT_SIZE)
+    counts: Counter = Counter()
+    for sample in samples:
+        counts.update(set(re.findall(rb'[,{\[]?"(?:[^"\\]|\\.){1,200}"[:,\]}]?', sample)))
+    scored = sorted(((n * len(token), token) for token, n in counts.items() if n > 1),
+                    reverse=True)
+    chosen, total = [], 0
+    for _, token in scored:
+        if total + len(token) <= size:
+            chosen.append(token)
+            total += len(token)
+    filler = b"".join(samples)[:size - total] if size > total else b""
+    # zlib finds matches at short distances more cheaply, so the best fragments go last
+    return filler + b"".join(reversed(chosen))
+
+
+def train_dictionary(samples: List[bytes], size: int = DEFAULT_DICT_SIZE,
+                     codec: Optional[str] = None) -> Tuple[str, bytes]:
+    """
+    Train a compression dictionary on sample payloads.
+
+    Args:
+        samples: Uncompressed payloads representative of what will be stored
+        size: Target dictionary size in bytes (zlib caps it at 32 KiB)
+        codec: "zstd" or "zlib" (default: zstd when installed)
+
+    Returns:
+        Tuple of (codec, dictionary bytes)
+    """
+    codec = codec or default_codec()
+    if not samples:
+        raise ValueError("Need at least one sample to train a dictionary")
+    if codec == "zstd":
+        _require_zstd()
+        return codec, zstandard.train_dictionary(size, samples).as_bytes()
+    if codec == "zlib":
+        return codec, _zlib_dictionary(samples, size)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+class PayloadCodec:
+    """
+    Compresses payloads with the newest dictionary of one name and decompresses
+    payloads written with any dictionary stored in the same database.
+    """
+
+    def __init__(self, conn: Optional[sqlite3.Connection] = None, name: str = "default",
+                 lock: Optional[threading.RLock] = None):
+        """
+        Args:
+            conn: Database holding the dictionaries (None: no dictionaries)
+            name: Which dictionaries to use for compression (e.g. "plans")
+            lock: Lock guarding `conn`, if it is shared
+        """
+        self.conn = conn
+        self.name = name
+        self._conn_lock = lock or threading.RLock()
+        self._dicts: Dict[int, Tuple[str, bytes]] = {}
+        self._current: Optional[int] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        if conn is not None:
+            with self._conn_lock, conn:
+                conn.executescript(DICTIONARY_SCHEMA)
+            self.reload()
+
+    def reload(self):
+        """Re-read the dictionaries, e.g. after one was trained by another process."""
+        if self.conn is None:
+            return
+        with self._conn_lock:
+            rows = self.conn.execute(
+                "SELECT dict_id, name, codec, data FROM compression_dicts ORDER BY created_at"
+            ).fetchall()
+        with self._lock:
+            self._dicts = {row[0]: (row[2], bytes(row[3])) for row in rows}
+            usable = [row[0] for row in rows if row[1] == self.name
+                      and (row[2] == "zlib" or zstandard is not None)]
+            self._current = usable[-1] if usable else None
+            self._local = threading.local()
+
+    def add_dictionary(self, codec: str, data: bytes) -> int:
+        """Store a trained dictionary and make it the one used for new payloads."""
+        if self.conn is None:
+            raise ValueError("This codec has no database to keep dictionaries in")
+        dict_id = _dict_id(codec, data)
+        with self._conn_lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO compression_dicts (dict_id, name, codec, data, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (dict_id, self.name, codec, data, time.time())
+            )
+        self.reload()
+        return dict_id
+
+    def train(self, samples: List[bytes], size: int = DEFAULT_DICT_SIZE,
+              codec: Optional[str] = None) -> int:
+        """Train a dictionary on `samples`, store it and use it from now on; returns its id."""
+        return self.add_dictionary(*train_dictionary(samples, size, codec))
+
+    @property
+    def current(self) -> Optional[Dict[str, object]]:
+        """Id, codec and size of the dictionary used for new payloads (None if there is none)."""
+        if self._current is None:
+            return None
+        codec, data = self._dicts[self._current]
+        return {"dict_id": self._current, "codec": codec, "size": len(data)}
+
+    def _zstd_compressor(self, dict_id: int):
+        # zstandard (de)compressors are not safe to share between threads
+        compressors = getattr(self._local, "compressors", None)
+        if compressors is None:
+            compressors = self._local.compressors = {}
+        if dict_id not in compressors:
+            data = self._dicts[dict_id][1] if dict_id else None
+            compressors[dict_id] = zstandard.ZstdCompressor(
+                level=ZSTD_LEVEL,
+                dict_data=zstandard.ZstdCompressionDict(data) if data else None
+            )
+        return compressors[dict_id]
+
+    def _zstd_decompressor(self, dict_id: int):
+        decompressors = getattr(self._local, "decompressors", None)
+        if decompressors is None:
+            decompressors = self._local.decompressors = {}
+        if dict_id not in decompressors:
+            data = self._dicts[dict_id][1] if dict_id else None
+            decompressors[dict_id] = zstandard.ZstdDecompressor(
+                dict_data=zstandard.ZstdCompressionDict(data) if data else None
+            )
+        return decompressors[dict_id]
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress with the current dictionary (or none), prefixed with the header."""
+        dict_id = self._current or 0
+        codec = self._dicts[dict_id][0] if dict_id else default_codec()
+        if codec == "zstd":
+            body = self._zstd_compressor(dict_id).compress(data)
+        else:
+            compressor = zlib.compressobj(ZLIB_LEVEL, zdict=self._dicts[dict_id][1]) \
+                if dict_id else zlib.compressobj(ZLIB_LEVEL)
+            body = compressor.compress(data) + compressor.flush()
+        return HEADER.pack(MAGIC, CODEC_NAMES[codec], dict_id) + body
+
+    def decompress(self, payload: bytes) -> bytes:
+        """Decompress a payload written by `compress` with any stored dictionary, or legacy zlib."""
+        if not payload or payload[0] != MAGIC:
+            return zlib.decompress(payload)
+        _, codec, dict_id = HEADER.unpack_from(payload)
+        body = memoryview(payload)[HEADER.size:]
+        if dict_id and dict_id not in self._dicts:
+            # Trained after this codec was loaded (possibly by another process)
+            self.reload()
+            if dict_id not in self._dicts:
+                raise ValueError(f"Unknown compression dictionary {dict_id}")
+        if codec == CODEC_ZSTD:
+            _require_zstd()
+            return self._zstd_decompressor(dict_id).decompress(body)
+        if codec == CODEC_ZLIB:
+            decompressor = zlib.decompressobj(zdict=self._dicts[dict_id][1]) \
+                if dict_id else zlib.decompressobj()
+            return decompressor.decompress(body) + decompressor.flush()
+        raise ValueError(f"Unknown compression codec {codec}")
+
+
+def sample_rows(conn: sqlite3.Connection, lock: threading.RLock, codec: PayloadCodec,
+                table: str, column: str, limit: int) -> List[bytes]:
+    """Decompressed payloads of the `limit` newest rows of a table, as training samples."""
+    with lock:
+        rows = conn.execute(
+            f"SELECT {column} FROM {table} ORDER BY rowid DESC LIMIT ?", (limit,)
+        ).fetchall()
+    return [codec.decompress(row[0]) for row in rows]
+
+
+def recompress_rows(conn: sqlite3.Connection, lock: threading.RLock, codec: PayloadCodec,
+                    table: str, column: str, batch_size: int = 500) -> Dict[str, int]:
+    """
+    Rewrite every payload of a table with the codec's current dictionary.
+
+    Returns:
+        Rows rewritten and their total uncompressed, previous and new sizes in bytes
+    """
+    stats = {"rows": 0, "raw_bytes": 0, "before_bytes": 0, "after_bytes": 0}
+    last_rowid = 0
+    while True:
+        with lock:
+            rows = conn.execute(
+                f"SELECT rowid, {column} FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, batch_size)
+            ).fetchall()
+        if not rows:
+            return stats
+        updates = []
+        for rowid, payload in rows:
+            raw = codec.decompress(payload)
+            new_payload = codec.compress(raw)
+            updates.append((new_payload, rowid))
+            stats["rows"] += 1
+            stats["raw_bytes"] += len(raw)
+            stats["before_bytes"] += len(payload)
+            stats["after_bytes"] += len(new_payload)
+        with lock, conn:
+            conn.executemany(f"UPDATE {table} SET {column} = ? WHERE rowid = ?", updates)
+        last_rowid = rows[-1][0]
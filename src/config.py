@@ -1,40 +1,91 @@
 """
 Configuration management for the Personalized Education Assistant.
 """
+import dataclasses
+import hashlib
 import os
-from typing import Optional
+from functools import cached_property
+from typing import List, Optional, Tuple
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
 
-class Config:
-    """Configuration class for managing API keys and settings."""
+def _split(value: Optional[str]) -> List[str]:
+    """Items of a comma-separated setting."""
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+@dataclasses.dataclass(frozen=True)
+class RunConfig:
+    """
+    Immutable settings of one request: API keys, models, search provider, rate
+    limits, cache path and link checking. `config.run_config()` snapshots them
+    from the environment and takes per-tenant overrides; crews, agents and tools
+    built from different RunConfigs run side by side in one process. Clients
+    built from a RunConfig are pooled by its `key` (see `src.clients`).
+    """
+    openrouter_api_key: Optional[str] = None
+    groq_api_key: Optional[str] = None
+    serper_api_key: Optional[str] = None
+    default_llm: str = "openrouter"
+    openrouter_model: str = "meta-llama/llama-4-scout:free"
+    groq_model: str = "meta-llama/llama-4-scout-17b-16e-instruct"
+    openrouter_models: Tuple[str, ...] = ()
+    groq_models: Tuple[str, ...] = ()
+    fake_llm_latency: float = 0.0
+    search_provider: str = "serper"
+    fake_search_latency: float = 0.0
+    rate_limits: Tuple[Tuple[str, float], ...] = ()
+    llm_routing: str = "adaptive"
+    router_fast_stages: Tuple[str, ...] = ("quiz", "projects")
+    router_max_error_rate: float = 0.5
+    router_cooldown_seconds: float = 30.0
+    cache_path: str = "cache.db"
+    link_check_mode: str = ""
     
-    def __init__(self):
-        # API Keys
-        self.openrouter_api_key = os.getenv("OPENROUTER_API_KEY")
-        self.groq_api_key = os.getenv("GROQ_API_KEY")
-        self.serper_api_key = os.getenv("SERPER_API_KEY")
-        
-        # LLM Configuration
-        self.default_llm = os.getenv("DEFAULT_LLM", "openrouter")
-        self.openrouter_model = os.getenv("OPENROUTER_MODEL", "meta-llama/llama-4-scout:free")
-        self.groq_model = os.getenv("GROQ_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct")
-        
-        # Default Parameters
-        self.default_resources_per_category = int(os.getenv("DEFAULT_RESOURCES_PER_CATEGORY", "3"))
-        self.default_quiz_questions = int(os.getenv("DEFAULT_QUIZ_QUESTIONS", "5"))
-        self.default_project_count = int(os.getenv("DEFAULT_PROJECT_COUNT", "2"))
+    def __post_init__(self):
+        # Accept lists and dicts, but store tuples so the config stays hashable
+        if isinstance(self.rate_limits, dict):
+            object.__setattr__(self, "rate_limits", tuple(sorted(self.rate_limits.items())))
+        for name in ("openrouter_models", "groq_models", "router_fast_stages"):
+            object.__setattr__(self, name, tuple(getattr(self, name)))
+    
+    @cached_property
+    def key(self) -> str:
+        """Stable hash of every setting (API keys included), naming this configuration."""
+        return hashlib.sha256(repr(dataclasses.astuple(self)).encode("utf-8")).hexdigest()[:16]
+    
+    def replace(self, **changes) -> "RunConfig":
+        """A copy with some settings changed."""
+        return dataclasses.replace(self, **changes)
+    
+    def models(self, provider: str) -> Tuple[str, ...]:
+        """Models of `provider` that calls may be routed to (default: just its configured model)."""
+        if provider == "openrouter":
+            return self.openrouter_models or (self.openrouter_model,)
+        if provider == "groq":
+            return self.groq_models or (self.groq_model,)
+        return ()
+    
+    def rate_limit(self, provider: str) -> float:
+        """Requests per minute allowed for `provider` (0 = unlimited)."""
+        return dict(self.rate_limits).get(provider, 0.0)
     
-    def get_llm_config(self, llm_provider: Optional[str] = None):
-        """Get LLM configuration based on provider."""
+    def credential(self, provider: str) -> Optional[str]:
+        """Short hash of the API key used for `provider` (None if it needs none)."""
+        api_key = {"openrouter": self.openrouter_api_key, "groq": self.groq_api_key,
+                   "serper": self.serper_api_key}.get(provider)
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16] if api_key else None
+    
+    def get_llm_config(self, llm_provider: Optional[str] = None, model: Optional[str] = None):
+        """Get LLM configuration based on provider (and optionally another of its models)."""
         provider = llm_provider or self.default_llm
         
         if provider == "openrouter":
             # Format model name with provider prefix for LiteLLM
-            model_name = self.openrouter_model
+            model_name = model or self.openrouter_model
             if not model_name.startswith("openrouter/"):
                 model_name = f"openrouter/{model_name}"
             
@@ -46,7 +97,7 @@ class Config:
             }
         elif provider == "groq":
             # Format model name with provider prefix for LiteLLM
-            model_name = self.groq_model
+            model_name = model or self.groq_model
             if not model_name.startswith("groq/"):
                 model_name = f"groq/{model_name}"
             
@@ -56,6 +107,14 @@ class Config:
                 "base_url": "https://api.groq.com/openai/v1",
                 "provider": "groq"
             }
+        elif provider == "fake":
+            # Local deterministic LLM for profiling and load testing
+            return {
+                "api_key": None,
+                "model": "fake/education-assistant",
+                "base_url": None,
+                "provider": "fake"
+            }
         else:
             raise ValueError(f"Unknown LLM provider: {provider}")
     
@@ -76,5 +135,136 @@ class Config:
         return True
 
 
+class Config:
+    """
+    Process-wide settings from the environment. Per-request settings are
+    handed to crews as `RunConfig` snapshots (see `run_config`).
+    """
+    
+    def __init__(self):
+        # API Keys
+        self.openrouter_api_key = os.getenv("OPENROUTER_API_KEY")
+        self.groq_api_key = os.getenv("GROQ_API_KEY")
+        self.serper_api_key = os.getenv("SERPER_API_KEY")
+        
+        # LLM Configuration
+        self.default_llm = os.getenv("DEFAULT_LLM", "openrouter")
+        self.openrouter_model = os.getenv("OPENROUTER_MODEL", "meta-llama/llama-4-scout:free")
+        self.groq_model = os.getenv("GROQ_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct")
+        self.fake_llm_latency = float(os.getenv("FAKE_LLM_LATENCY", "0"))
+        
+        # Adaptive routing ("adaptive" or "off"): each LLM call goes to a provider/model
+        # chosen from observed latency, error rate and rate-limit headroom. The model
+        # lists default to the single models above; fast stages go to whichever healthy
+        # endpoint is expected to answer soonest, the rest stay on DEFAULT_LLM/--llm
+        self.llm_routing = os.getenv("LLM_ROUTING", "adaptive")
+        self.openrouter_models = _split(os.getenv("OPENROUTER_MODELS"))
+        self.groq_models = _split(os.getenv("GROQ_MODELS"))
+        self.router_fast_stages = _split(os.getenv("ROUTER_FAST_STAGES", "quiz,projects"))
+        self.router_ewma_alpha = float(os.getenv("ROUTER_EWMA_ALPHA", "0.3"))
+        self.router_max_error_rate = float(os.getenv("ROUTER_MAX_ERROR_RATE", "0.5"))
+        self.router_error_half_life_seconds = float(os.getenv("ROUTER_ERROR_HALF_LIFE_SECONDS", "120"))
+        self.router_cooldown_seconds = float(os.getenv("ROUTER_COOLDOWN_SECONDS", "30"))
+        
+        # Web search ("serper" or the local "fake"; fake LLM runs always use fake search)
+        self.search_provider = os.getenv("SEARCH_PROVIDER", "serper")
+        self.fake_search_latency = float(os.getenv("FAKE_SEARCH_LATENCY", "0"))
+        
+        # Default Parameters
+        self.default_resources_per_category = int(os.getenv("DEFAULT_RESOURCES_PER_CATEGORY", "3"))
+        self.default_quiz_questions = int(os.getenv("DEFAULT_QUIZ_QUESTIONS", "5"))
+        self.default_project_count = int(os.getenv("DEFAULT_PROJECT_COUNT", "2"))
+        
+        # Offline mode: serve only from stored plans, local indexes and caches
+        self.offline = os.getenv("OFFLINE", "false").lower() in ("1", "true", "yes")
+        
+        # Record/replay cassette of LLM and search traffic ("off", "record" or "replay");
+        # replayed latencies are multiplied by the scale (0 = no delay)
+        self.cassette_mode = os.getenv("CASSETTE_MODE", "off")
+        self.cassette_path = os.getenv("CASSETTE_PATH", "")
+        self.cassette_latency_scale = float(os.getenv("CASSETTE_LATENCY_SCALE", "1"))
+        
+        # Persistence ("" disables the plan store)
+        self.plan_store_path = os.getenv("PLAN_STORE_PATH", "plans.db")
+        
+        # Index of curated resources by canonical URL ("" disables it); curation
+        # reuses known-good resources seen within the max age instead of searching
+        self.resource_index_path = os.getenv("RESOURCE_INDEX_PATH", "resources.db")
+        self.resource_reuse_max_age_hours = float(os.getenv("RESOURCE_REUSE_MAX_AGE_HOURS", "168"))
+        
+        # Bank of generated quiz questions ("" disables it); quizzes are assembled from
+        # it without an LLM call once it holds depth factor x the requested questions
+        self.question_bank_path = os.getenv("QUESTION_BANK_PATH", "questions.db")
+        self.question_bank_depth_factor = float(os.getenv("QUESTION_BANK_DEPTH_FACTOR", "2"))
+        # Quiz questions at least this similar to another in the quiz, or to an earlier
+        # one for the topic, are regenerated (0 disables the check)
+        self.quiz_duplicate_threshold = float(os.getenv("QUIZ_DUPLICATE_THRESHOLD", "0.75"))
+        
+        # Spaced-repetition review cards built from plan quizzes ("" disables reviews)
+        self.review_db_path = os.getenv("REVIEW_DB_PATH", "reviews.db")
+        
+        # Streamlit session history: full results kept in memory per session, caps on
+        # their serialized size per session and per process, and where unsaved plans spill
+        self.history_memory_items = int(os.getenv("HISTORY_MEMORY_ITEMS", "5"))
+        self.history_session_mb = float(os.getenv("HISTORY_SESSION_MB", "16"))
+        self.history_process_mb = float(os.getenv("HISTORY_PROCESS_MB", "256"))
+        self.history_max_entries = int(os.getenv("HISTORY_MAX_ENTRIES", "100"))
+        self.history_spill_dir = os.getenv("HISTORY_SPILL_DIR", ".history")
+        
+        # Plan cache: similar topics at the same level reuse a stored plan
+        self.similarity_threshold = float(os.getenv("SIMILARITY_THRESHOLD", "0.6"))
+        self.plan_cache_ttl_hours = float(os.getenv("PLAN_CACHE_TTL_HOURS", "168"))
+        
+        # Caches for search results and LLM completions ("" disables both)
+        self.cache_path = os.getenv("CACHE_PATH", "cache.db")
+        self.search_cache_ttl_hours = float(os.getenv("SEARCH_CACHE_TTL_HOURS", "24"))
+        self.llm_cache_ttl_hours = float(os.getenv("LLM_CACHE_TTL_HOURS", "168"))
+        
+        # Link checking of curated resources ("off", "flag" or "drop" dead links;
+        # unset: "flag", or "off" when the LLM or search is fake)
+        self.link_check_mode = os.getenv("LINK_CHECK_MODE", "")
+        self.link_check_timeout = float(os.getenv("LINK_CHECK_TIMEOUT", "3"))
+        self.link_check_concurrency = int(os.getenv("LINK_CHECK_CONCURRENCY", "20"))
+        self.link_check_per_host = int(os.getenv("LINK_CHECK_PER_HOST", "4"))
+        self.link_cache_ttl_hours = float(os.getenv("LINK_CACHE_TTL_HOURS", "24"))
+        
+        # Provider rate limits in requests per minute (0 = unlimited)
+        self.rate_limits = {
+            "openrouter": float(os.getenv("OPENROUTER_RPM", "20")),
+            "groq": float(os.getenv("GROQ_RPM", "30")),
+            "serper": float(os.getenv("SERPER_RPM", "0")),
+        }
+        
+        # Observability
+        self.metrics_port = int(os.getenv("METRICS_PORT", "0"))
+        
+        # HTTP API server (`main.py serve`): worker threads, and queued jobs beyond
+        # which submissions get 429; finished jobs are forgotten after the TTL
+        self.api_host = os.getenv("API_HOST", "127.0.0.1")
+        self.api_port = int(os.getenv("API_PORT", "8000"))
+        self.api_workers = int(os.getenv("API_WORKERS", "4"))
+        self.api_max_queue = int(os.getenv("API_MAX_QUEUE", "32"))
+        self.api_job_ttl_seconds = float(os.getenv("API_JOB_TTL_SECONDS", "3600"))
+    
+    def run_config(self, **overrides) -> "RunConfig":
+        """
+        Snapshot the per-request settings as a `RunConfig`.
+        
+        Args:
+            **overrides: Fields to change, e.g. a tenant's own API key or model
+        """
+        values = {field.name: getattr(self, field.name) for field in dataclasses.fields(RunConfig)}
+        values.update(overrides)
+        return RunConfig(**values)
+    
+    def get_llm_config(self, llm_provider: Optional[str] = None, model: Optional[str] = None):
+        """Get LLM configuration based on provider (see `RunConfig.get_llm_config`)."""
+        return self.run_config().get_llm_config(llm_provider, model)
+    
+    def validate_api_keys(self):
+        """Validate that required API keys are present."""
+        return self.run_config().validate_api_keys()
+
+
 # Global config instance
 config = Config()
\ No newline at end of file
@@ -1,24 +1,94 @@
 """
 Main Crew orchestration for the Personalized Education Assistant.
 """
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from crewai import Crew, Process
 from src.agents import EducationAgents
+from src.cache import fresh_completions, llm_cache
+from src.cassette import active_cassette
 from src.tasks import EducationTasks
-from typing import Dict, Any
+from src.tools import format_search_results, run_shared_search
+from src.config import RunConfig, config
+from src.metrics import (
+    FALLBACKS, IN_FLIGHT, RUNS, STAGE_SECONDS, TOKENS, TOKENS_PER_RUN, record_cache_lookup
+)
+from src.profiling import NullProfiler, Profiler
+from src.links import (
+    LinkValidator, default_link_validator, link_check_mode, validate_materials
+)
+from src.llm_proxy import count_tokens
+from src.models import LearningMaterial, Quiz, QuizQuestion
+from src.offline import build_offline_plan
+from src.plan_store import PlanStore
+from src.question_bank import QuestionBank
+from src.quiz_dedupe import DUPLICATE_THRESHOLD, QuestionIndex, QuizDeduplicator, \
+    question_features, replace_duplicates
+from src.routing import record_routing, routing_summary
+from src.resources import RESOURCE_CATEGORIES, ResourceIndex, dedupe_materials
+from src.similarity import TopicIndex
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+# Metric stage labels for the three sequential tasks
+TASK_STAGES = ("curate_materials", "create_quiz", "suggest_projects")
+
+EXPERTISE_LEVELS = ["beginner", "intermediate", "advanced"]
+
+# Plan stages that can be regenerated independently
+PLAN_STAGES = ("materials", "quiz", "projects")
 
 
 class EducationCrew:
     """Main crew for orchestrating the education assistant workflow."""
     
-    def __init__(self, llm_provider: str = None):
+    def __init__(
+        self,
+        llm_provider: str = None,
+        plan_store: Optional[PlanStore] = None,
+        topic_index: Optional[TopicIndex] = None,
+        link_validator: Optional[LinkValidator] = None,
+        resource_index: Optional[ResourceIndex] = None,
+        question_bank: Optional[QuestionBank] = None,
+        run_config: Optional[RunConfig] = None
+    ):
         """
         Initialize the education crew.
         
         Args:
             llm_provider: LLM provider to use (openrouter or groq)
+            plan_store: Optional store that successful results are saved to
+            topic_index: Optional similarity index over `plan_store`; when set,
+                near-duplicate requests are served from stored plans
+            link_validator: Validator for curated resource links (default: configured
+                from LINK_CHECK_*; LINK_CHECK_MODE=off disables checking, and
+                it is off by default with the fake LLM or search)
+            resource_index: Optional index that curated resources are recorded in;
+                when it already knows enough good resources for a request, curation
+                selects from them instead of searching
+            question_bank: Optional bank that generated quiz questions are added to;
+                when it holds enough questions for a request, the quiz is assembled
+                from it instead of asking the quiz agent (it also supplies earlier
+                questions that new quizzes are checked for duplicates against)
+            run_config: Settings of this crew's runs: API keys, models, search
+                provider and rate limits (default: the environment's)
         """
-        self.agents_factory = EducationAgents(llm_provider)
+        self.run_config = run_config or config.run_config()
+        self.agents_factory = EducationAgents(llm_provider, self.run_config)
         self.tasks_factory = EducationTasks()
+        self.plan_store = plan_store
+        self.topic_index = topic_index
+        # Offline runs never check links over the network
+        provider = self.agents_factory.active_provider
+        self.link_validator = None if config.offline \
+            else link_validator or default_link_validator(self.run_config, provider)
+        self.link_check_mode = "drop" if link_check_mode(self.run_config, provider) == "drop" \
+            else "flag"
+        self.resource_index = resource_index
+        self.question_bank = question_bank
+        self.quiz_dedupe = QuizDeduplicator(question_bank, config.quiz_duplicate_threshold) \
+            if config.quiz_duplicate_threshold > 0 else None
     
     def run(
         self,
@@ -26,7 +96,9 @@ class EducationCrew:
         expertise_level: str,
         resources_per_category: int = 3,
         num_questions: int = 5,
-        num_projects: int = 2
+        num_projects: int = 2,
+        profiler: Optional[Profiler] = None,
+        use_cache: bool = True
     ) -> Dict[str, Any]:
         """
         Run the complete education assistant workflow.
@@ -37,6 +109,9 @@ class EducationCrew:
             resources_per_category: Number of resources per category
             num_questions: Number of quiz questions
             num_projects: Number of project ideas
+            profiler: Optional profiler whose sections bracket agent setup,
+                task construction and crew kickoff
+            use_cache: Serve the request from a similar stored plan if possible
         
         Returns:
             Dictionary containing learning materials, quiz, and project suggestions
@@ -51,53 +126,113 @@ class EducationCrew:
         print(f"{'='*80}\n")
         
         # Validate expertise level
-        valid_levels = ["beginner", "intermediate", "advanced"]
-        if expertise_level.lower() not in valid_levels:
-            raise ValueError(f"Expertise level must be one of: {', '.join(valid_levels)}")
+        if expertise_level.lower() not in EXPERTISE_LEVELS:
+            raise ValueError(f"Expertise level must be one of: {', '.join(EXPERTISE_LEVELS)}")
         
-        # Create agents
-        print("🤖 Initializing agents...")
-        learning_agent = self.agents_factory.learning_material_agent()
-        quiz_agent = self.agents_factory.quiz_creator_agent()
-        project_agent = self.agents_factory.project_idea_agent()
-        print("✓ Agents initialized\n")
-        
-        # Create tasks
-        print("📋 Creating tasks...")
-        task1 = self.tasks_factory.curate_learning_materials_task(
-            agent=learning_agent,
-            topic=topic,
-            expertise_level=expertise_level,
-            resources_per_category=resources_per_category
-        )
+        _record_request(topic=topic, expertise_level=expertise_level,
+                        resources_per_category=resources_per_category,
+                        num_questions=num_questions, num_projects=num_projects,
+                        use_cache=use_cache, provider=self.agents_factory.active_provider)
+        # A request that bypasses the plan cache wants new completions too
+        with fresh_completions(not use_cache):
+            return self._run(topic, expertise_level, resources_per_category, num_questions,
+                             num_projects, profiler, use_cache)
+    
+    def _run(self, topic: str, expertise_level: str, resources_per_category: int,
+             num_questions: int, num_projects: int, profiler: Optional[Profiler],
+             use_cache: bool) -> Dict[str, Any]:
+        # The workflow behind `run`, after the request is recorded; the fallback re-enters here
+        # Serve near-duplicate requests from previously generated plans
+        if use_cache:
+            cached = self._cached_plan(topic, expertise_level, resources_per_category,
+                                       num_questions, num_projects)
+            if cached is not None:
+                return cached
         
-        task2 = self.tasks_factory.create_quiz_task(
-            agent=quiz_agent,
-            learning_materials_task=task1,
-            num_questions=num_questions
-        )
+        # Offline without an LLM cache there is nothing the crew could replay
+        if config.offline and llm_cache(self.run_config) is None:
+            return self._offline_plan(topic, expertise_level, resources_per_category,
+                                      num_questions, num_projects)
         
-        task3 = self.tasks_factory.suggest_projects_task(
-            agent=project_agent,
-            learning_materials_task=task1,
-            topic=topic,
-            expertise_level=expertise_level,
-            num_projects=num_projects
-        )
-        print("✓ Tasks created\n")
-        
-        # Create and run crew
-        print("🚀 Starting sequential workflow...\n")
-        crew = Crew(
-            agents=[learning_agent, quiz_agent, project_agent],
-            tasks=[task1, task2, task3],
-            process=Process.sequential,
-            verbose=True
-        )
+        profiler = profiler or NullProfiler()
         
+        IN_FLIGHT.inc()
+        run_start = time.perf_counter()
         try:
+            # Known-good resources from earlier runs replace the web search
+            known = self._known_resources(topic, expertise_level, resources_per_category)
+            if known is not None:
+                print(f"♻️  Selecting from {sum(len(items) for items in known.values())} "
+                      f"known resources instead of searching\n")
+            # A deep enough question bank replaces the quiz agent
+            banked_quiz = self._banked_quiz(topic, expertise_level, num_questions) \
+                if use_cache else None
+            
+            # Create agents
+            print("🤖 Initializing agents...")
+            with STAGE_SECONDS.labels("agent_setup").time(), profiler.section("agent_setup"):
+                learning_agent = self.agents_factory.learning_material_agent(
+                    with_search=known is None
+                )
+                quiz_agent = None if banked_quiz else self.agents_factory.quiz_creator_agent()
+                project_agent = self.agents_factory.project_idea_agent()
+            print("✓ Agents initialized\n")
+            
+            # Create tasks
+            print("📋 Creating tasks...")
+            link_report: Dict[str, Any] = {}
+            with STAGE_SECONDS.labels("task_setup").time(), profiler.section("task_setup"):
+                if known is not None:
+                    task1 = self.tasks_factory.select_learning_materials_task(
+                        agent=learning_agent,
+                        topic=topic,
+                        expertise_level=expertise_level,
+                        search_results=format_search_results(known),
+                        resources_per_category=resources_per_category,
+                        callback=self._materials_callback(link_report)
+                    )
+                else:
+                    task1 = self.tasks_factory.curate_learning_materials_task(
+                        agent=learning_agent,
+                        topic=topic,
+                        expertise_level=expertise_level,
+                        resources_per_category=resources_per_category,
+                        callback=self._materials_callback(link_report)
+                    )
+                
+                task2 = None if banked_quiz else self.tasks_factory.create_quiz_task(
+                    agent=quiz_agent,
+                    learning_materials_task=task1,
+                    num_questions=num_questions
+                )
+                
+                task3 = self.tasks_factory.suggest_projects_task(
+                    agent=project_agent,
+                    learning_materials_task=task1,
+                    topic=topic,
+                    expertise_level=expertise_level,
+                    num_projects=num_projects
+                )
+            print("✓ Tasks created\n")
+            
+            # Create and run crew
+            print("🚀 Starting sequential workflow...\n")
+            crew = Crew(
+                agents=[agent for agent in (learning_agent, quiz_agent, project_agent) if agent],
+                tasks=[task for task in (task1, task2, task3) if task],
+                process=Process.sequential,
+                verbose=True
+            )
+            
+            llm = self.agents_factory.llm
+            
             # Execute the crew
-            result = crew.kickoff()
+            routing: List[Dict[str, Any]] = []
+            with STAGE_SECONDS.labels("kickoff").time(), profiler.section("kickoff"), \
+                    record_routing(routing), count_tokens() as usage:
+                result = crew.kickoff()
+            
+            self._record_run_metrics([task1, task2, task3], usage.total)
             
             print(f"\n{'='*80}")
             print("✅ WORKFLOW COMPLETED SUCCESSFULLY!")
@@ -105,39 +240,824 @@ class EducationCrew:
             
             # Extract structured outputs from tasks
             learning_materials = task1.output.pydantic
-            quiz = task2.output.pydantic
+            with record_routing(routing):
+                quiz, dedupe_report = self._dedupe_quiz(
+                    banked_quiz or task2.output.pydantic, learning_materials, topic,
+                    expertise_level, banked=banked_quiz is not None
+                )
             projects = task3.output.pydantic
             
-            return {
+            RUNS.labels("success").inc()
+            result = {
                 "success": True,
                 "topic": topic,
                 "expertise_level": expertise_level,
+                "provider": self.agents_factory.active_provider,
                 "learning_materials": learning_materials,
                 "quiz": quiz,
                 "projects": projects,
+                "materials_source": "resource_index" if known is not None else "search",
+                "quiz_source": "question_bank" if banked_quiz else "llm",
+                "quiz_dedupe": dedupe_report,
+                "routing": routing_summary(routing, llm.router),
+                "link_report": link_report or None,
                 "raw_output": result
             }
+            if config.offline:
+                # Replayed entirely from cached completions; already stored when first generated
+                result["offline"] = True
+                result["provenance"] = dict.fromkeys(("learning_materials", "quiz", "projects"),
+                                                     "llm_cache")
+                return result
+            return self._save(result)
             
         except Exception as e:
-            print(f"\n{'='*80}")
-            print(f"❌ ERROR: {str(e)}")
-            print(f"{'='*80}\n")
+            error = e
+        finally:
+            STAGE_SECONDS.labels("total").observe(time.perf_counter() - run_start)
+            IN_FLIGHT.dec()
+        
+        print(f"\n{'='*80}")
+        print(f"❌ ERROR: {str(error)}")
+        print(f"{'='*80}\n")
+        
+        # Offline runs assemble what they can from local data instead
+        if config.offline:
+            return self._offline_plan(topic, expertise_level, resources_per_category,
+                                      num_questions, num_projects)
+        
+        # Try fallback to Groq if we were using OpenRouter
+        if self.agents_factory.active_provider == "openrouter":
+            print("🔄 Attempting fallback to Groq...\n")
+            RUNS.labels("fallback").inc()
+            FALLBACKS.labels("openrouter", "groq").inc()
+            self.agents_factory = EducationAgents("groq", self.run_config)
+            return self._run(topic, expertise_level, resources_per_category,
+                             num_questions, num_projects, profiler, use_cache)
+        
+        RUNS.labels("error").inc()
+        return {
+            "success": False,
+            "error": str(error),
+            "topic": topic,
+            "expertise_level": expertise_level
+        }
+    
+    def run_levels(
+        self,
+        topic: str,
+        levels: Optional[List[str]] = None,
+        resources_per_category: int = 3,
+        num_questions: int = 5,
+        num_projects: int = 2,
+        max_workers: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate plans for several expertise levels from one shared search pass.
+        
+        The web is searched once per resource category; each level then runs
+        its own selection, quiz and project tasks concurrently, choosing from
+        the shared results instead of searching again.
+        
+        Args:
+            topic: Topic of interest
+            levels: Expertise levels to generate (default: all three)
+            resources_per_category: Number of resources per category
+            num_questions: Number of quiz questions per level
+            num_projects: Number of project ideas per level
+            max_workers: Maximum number of levels generated at once (default: all)
+        
+        Returns:
+            Dictionary with overall success and one run result per level under "results"
+        """
+        levels = [level.lower() for level in (levels or EXPERTISE_LEVELS)]
+        invalid = [level for level in levels if level not in EXPERTISE_LEVELS]
+        if invalid:
+            raise ValueError(f"Expertise level must be one of: {', '.join(EXPERTISE_LEVELS)}")
+        
+        if config.offline:
+            # No shared search offline; each level is served from local data
+            results = {
+                level: self.run(topic, level, resources_per_category, num_questions, num_projects)
+                for level in levels
+            }
+            return {
+                "success": all(result["success"] for result in results.values()),
+                "topic": topic,
+                "levels": levels,
+                "search_queries": 0,
+                "results": results
+            }
+        
+        print(f"\n{'='*80}")
+        print(f"🎓 PERSONALIZED EDUCATION ASSISTANT (multi-level)")
+        print(f"{'='*80}")
+        print(f"📚 Topic: {topic}")
+        print(f"🎯 Expertise Levels: {', '.join(level.capitalize() for level in levels)}")
+        print(f"📊 Parameters: {resources_per_category} resources/category, "
+              f"{num_questions} questions, {num_projects} projects")
+        print(f"{'='*80}\n")
+        
+        _record_request(topic=topic, levels=levels, resources_per_category=resources_per_category,
+                        num_questions=num_questions, num_projects=num_projects,
+                        max_workers=max_workers, provider=self.agents_factory.active_provider)
+        
+        run_start = time.perf_counter()
+        print("🔎 Running shared search...")
+        try:
+            with STAGE_SECONDS.labels("shared_search").time():
+                hits = run_shared_search(topic, self.agents_factory.search_tool)
+        except Exception as e:
+            print(f"❌ Shared search failed: {e}")
+            RUNS.labels("error").inc()
+            return {"success": False, "error": str(e), "topic": topic, "levels": levels}
+        search_results = format_search_results(hits)
+        print(f"✓ {sum(len(items) for items in hits.values())} candidates "
+              f"from {len(hits)} searches\n")
+        
+        print(f"🚀 Generating {len(levels)} levels concurrently...\n")
+        # Each level runs in a copy of this context, so its tokens reach `usage`
+        with count_tokens() as usage, ThreadPoolExecutor(max_workers=max_workers or len(levels),
+                                                         thread_name_prefix="levels") as pool:
+            futures = {
+                level: pool.submit(contextvars.copy_context().run, self._run_level, topic, level,
+                                   search_results, resources_per_category, num_questions,
+                                   num_projects)
+                for level in levels
+            }
+            results = {level: future.result() for level, future in futures.items()}
+        
+        if usage.total > 0:
+            TOKENS.labels(self.agents_factory.active_provider).inc(usage.total)
+        STAGE_SECONDS.labels("total_levels").observe(time.perf_counter() - run_start)
+        
+        for level, result in results.items():
+            status = "✓" if result["success"] else f"✗ {result.get('error')}"
+            print(f"   {level.capitalize()}: {status}")
+        
+        return {
+            "success": all(result["success"] for result in results.values()),
+            "topic": topic,
+            "levels": levels,
+            "search_queries": len(hits),
+            "results": results
+        }
+    
+    def _run_level(
+        self,
+        topic: str,
+        expertise_level: str,
+        search_results: str,
+        resources_per_category: int,
+        num_questions: int,
+        num_projects: int
+    ) -> Dict[str, Any]:
+        """Run selection, quiz and project tasks for one level of a multi-level run."""
+        IN_FLIGHT.inc()
+        run_start = time.perf_counter()
+        try:
+            learning_agent = self.agents_factory.learning_material_agent(with_search=False)
+            banked_quiz = self._banked_quiz(topic, expertise_level, num_questions)
+            quiz_agent = None if banked_quiz else self.agents_factory.quiz_creator_agent()
+            project_agent = self.agents_factory.project_idea_agent()
             
-            # Try fallback to Groq if we were using OpenRouter
-            if self.agents_factory.active_provider == "openrouter":
-                print("🔄 Attempting fallback to Groq...\n")
-                self.agents_factory = EducationAgents("groq")
-                return self.run(topic, expertise_level, resources_per_category, 
-                              num_questions, num_projects)
+            link_report: Dict[str, Any] = {}
+            task1 = self.tasks_factory.select_learning_materials_task(
+                agent=learning_agent,
+                topic=topic,
+                expertise_level=expertise_level,
+                search_results=search_results,
+                resources_per_category=resources_per_category,
+                callback=self._materials_callback(link_report)
+            )
+            task2 = None if banked_quiz else self.tasks_factory.create_quiz_task(
+                agent=quiz_agent,
+                learning_materials_task=task1,
+                num_questions=num_questions
+            )
+            task3 = self.tasks_factory.suggest_projects_task(
+                agent=project_agent,
+                learning_materials_task=task1,
+                topic=topic,
+                expertise_level=expertise_level,
+                num_projects=num_projects
+            )
             
+            # Crew-level logs off: concurrent levels would interleave them
+            crew = Crew(
+                agents=[agent for agent in (learning_agent, quiz_agent, project_agent) if agent],
+                tasks=[task for task in (task1, task2, task3) if task],
+                process=Process.sequential,
+                verbose=False
+            )
+            # Each level runs in its own thread, so it collects its own routing decisions
+            with STAGE_SECONDS.labels("kickoff").time(), record_routing() as routing:
+                result = crew.kickoff()
+                # Token usage is shared across levels and recorded once by run_levels
+                self._record_run_metrics([task1, task2, task3], 0)
+                quiz, dedupe_report = self._dedupe_quiz(
+                    banked_quiz or task2.output.pydantic, task1.output.pydantic, topic,
+                    expertise_level, banked=banked_quiz is not None
+                )
+            RUNS.labels("success").inc()
+            return self._save({
+                "success": True,
+                "topic": topic,
+                "expertise_level": expertise_level,
+                "provider": self.agents_factory.active_provider,
+                "learning_materials": task1.output.pydantic,
+                "quiz": quiz,
+                "projects": task3.output.pydantic,
+                "quiz_source": "question_bank" if banked_quiz else "llm",
+                "quiz_dedupe": dedupe_report,
+                "routing": routing_summary(routing, self.agents_factory.llm.router),
+                "link_report": link_report or None,
+                "raw_output": result
+            })
+        except Exception as e:
+            RUNS.labels("error").inc()
             return {
                 "success": False,
                 "error": str(e),
                 "topic": topic,
                 "expertise_level": expertise_level
             }
+        finally:
+            STAGE_SECONDS.labels("total").observe(time.perf_counter() - run_start)
+            IN_FLIGHT.dec()
+    
+    def extend_quiz(
+        self,
+        learning_materials: LearningMaterial,
+        quiz: Quiz,
+        num_questions: int = 5
+    ) -> Quiz:
+        """
+        Add questions to an existing quiz without regenerating the rest of the plan.
+        
+        Runs only the quiz agent, with a single task, so the cost is one LLM call.
+        New questions that duplicate existing ones are dropped.
+        
+        Args:
+            learning_materials: The materials the quiz is based on
+            quiz: The quiz to extend
+            num_questions: Number of additional questions to request
+        
+        Returns:
+            A new Quiz with the extra questions appended and totals updated
+        """
+        print(f"➕ Generating {num_questions} more questions for '{quiz.topic}'...")
+        new_questions = self._generate_questions(learning_materials, quiz, num_questions,
+                                                 "extend_quiz", verbose=True)
+        if self.question_bank is not None:
+            try:
+                self.question_bank.add_questions(new_questions, quiz.topic,
+                                                 learning_materials.expertise_level)
+            except Exception as e:
+                print(f"⚠️  Could not update question bank: {e}")
+        extended, dropped = merge_questions(quiz, new_questions)
+        added = len(extended.questions) - len(quiz.questions)
+        print(f"✓ Added {added} questions"
+              f"{f' ({dropped} duplicates dropped)' if dropped else ''}\n")
+        return extended
+    
+    def _generate_questions(
+        self,
+        learning_materials: LearningMaterial,
+        quiz: Quiz,
+        num_questions: int,
+        stage: str,
+        verbose: bool = False
+    ) -> List[QuizQuestion]:
+        """Ask the quiz agent alone for `num_questions` questions that `quiz` does not have yet."""
+        quiz_agent = self.agents_factory.quiz_creator_agent()
+        task = self.tasks_factory.extend_quiz_task(
+            agent=quiz_agent,
+            learning_materials=learning_materials,
+            quiz=quiz,
+            num_questions=num_questions
+        )
+        crew = Crew(agents=[quiz_agent], tasks=[task], process=Process.sequential, verbose=verbose)
+        
+        # New questions are the point, so a cached answer to the same prompt will not do
+        with STAGE_SECONDS.labels(stage).time(), fresh_completions(), count_tokens() as usage:
+            crew.kickoff()
+        if usage.total > 0:
+            TOKENS.labels(self.agents_factory.active_provider).inc(usage.total)
+        return task.output.pydantic.questions[:num_questions]
+    
+    def _dedupe_quiz(
+        self,
+        quiz: Quiz,
+        learning_materials: LearningMaterial,
+        topic: str,
+        expertise_level: str,
+        banked: bool = False
+    ) -> Tuple[Quiz, Optional[Dict[str, Any]]]:
+        """
+        Check a quiz for questions that repeat another in it or in an earlier
+        quiz for the topic, and regenerate just those slots with one quiz-agent
+        call. Slots without a fresh replacement are dropped if they repeat this
+        quiz and kept if they only repeat an earlier one.
+        
+        Args:
+            quiz: The quiz about to be returned
+            learning_materials: The materials it is based on
+            topic: Requested topic
+            expertise_level: Requested level
+            banked: The quiz was assembled from the question bank, whose questions
+                come from earlier quizzes by design; it is only checked against itself
+        
+        Returns:
+            Tuple of (quiz, report), the report None when checking is disabled
+        """
+        if self.quiz_dedupe is None:
+            return quiz, None
+        check_start = time.perf_counter()
+        history = () if banked else (topic, expertise_level)
+        duplicates = self.quiz_dedupe.find(quiz.questions, *history)
+        check_seconds = time.perf_counter() - check_start
+        STAGE_SECONDS.labels("quiz_dedupe").observe(check_seconds)
+        report = {
+            "duplicates": [duplicate._asdict() for duplicate in duplicates],
+            "check_ms": round(check_seconds * 1000, 2),
+            "replaced": 0,
+            "dropped": 0
+        }
+        if not duplicates:
+            return quiz, report
+        
+        print(f"🔁 {len(duplicates)} duplicate questions; regenerating just those slots...")
+        slots = {duplicate.index for duplicate in duplicates}
+        kept = [question for index, question in enumerate(quiz.questions) if index not in slots]
+        replacements = []
+        try:
+            candidates = self._generate_questions(learning_materials, quiz, len(duplicates),
+                                                  "dedupe_quiz")
+            replacements = self.quiz_dedupe.fresh(candidates, kept, *history)
+        except Exception as e:
+            print(f"⚠️  Could not regenerate duplicate questions: {e}")
+        quiz, report["replaced"], report["dropped"] = replace_duplicates(quiz, duplicates,
+                                                                         replacements)
+        dropped = f" ({report['dropped']} dropped)" if report["dropped"] else ""
+        print(f"✓ Replaced {report['replaced']} duplicate questions{dropped}\n")
+        return quiz, report
+    
+    def extend_plan(self, plan: Dict[str, Any], num_questions: int = 5) -> Dict[str, Any]:
+        """
+        Extend a plan's quiz (see `extend_quiz`) and persist the updated plan.
+        
+        Args:
+            plan: A successful result from `run` or the plan store
+            num_questions: Number of additional questions to request
+        
+        Returns:
+            A copy of the plan with the extended quiz
+        """
+        extended = dict(plan)
+        extended["quiz"] = self.extend_quiz(plan["learning_materials"], plan["quiz"], num_questions)
+        if extended.pop("cached", False):
+            # Served plans are trimmed copies of another plan; store the extension separately
+            for key in ("plan_id", "created_at", "cache_match"):
+                extended.pop(key, None)
+            return self._save(extended)
+        if self.plan_store is not None and extended.get("plan_id"):
+            try:
+                self.plan_store.add(extended)
+            except Exception as e:
+                print(f"⚠️  Could not save plan to store: {e}")
+        return extended
+    
+    def regenerate(
+        self,
+        plan: Dict[str, Any],
+        stages: Iterable[str],
+        resources_per_category: Optional[int] = None,
+        num_questions: Optional[int] = None,
+        num_projects: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Rerun only some stages of an existing plan, reusing the stored outputs of the others.
+        
+        Quiz and projects are built from the plan's stored learning materials
+        unless "materials" is regenerated too, in which case they use the new ones.
+        The result is saved as a new plan; the original is left untouched.
+        
+        Args:
+            plan: A successful result from `run` or the plan store
+            stages: Any of "materials", "quiz" and "projects"
+            resources_per_category: Resources per category (default: as in the plan)
+            num_questions: Number of quiz questions (default: as in the plan)
+            num_projects: Number of project ideas (default: as in the plan)
+        
+        Returns:
+            The updated plan, with the rerun stages listed under "regenerated"
+        """
+        stages = set(stages)
+        if not stages or not stages <= set(PLAN_STAGES):
+            raise ValueError(f"Stages must be a non-empty subset of: {', '.join(PLAN_STAGES)}")
+        
+        topic = plan["topic"]
+        expertise_level = plan["expertise_level"]
+        materials = plan["learning_materials"]
+        if resources_per_category is None:
+            resources_per_category = max(
+                len(materials.videos), len(materials.articles), len(materials.exercises), 1
+            )
+        if num_questions is None:
+            num_questions = len(plan["quiz"].questions) or config.default_quiz_questions
+        if num_projects is None:
+            num_projects = len(plan["projects"].projects) or config.default_project_count
+        
+        ordered = [stage for stage in PLAN_STAGES if stage in stages]
+        print(f"🔁 Regenerating {', '.join(ordered)} for '{topic}' ({expertise_level})\n")
+        
+        IN_FLIGHT.inc()
+        run_start = time.perf_counter()
+        try:
+            agents, tasks = [], {}
+            materials_task = None
+            link_report: Dict[str, Any] = {}
+            if "materials" in stages:
+                agent = self.agents_factory.learning_material_agent()
+                materials_task = tasks["materials"] = self.tasks_factory.curate_learning_materials_task(
+                    agent=agent,
+                    topic=topic,
+                    expertise_level=expertise_level,
+                    resources_per_category=resources_per_category,
+                    callback=self._materials_callback(link_report)
+                )
+                agents.append(agent)
+            # Downstream stages read the fresh materials task, or the stored materials
+            stored_materials = None if materials_task is not None else materials
+            if "quiz" in stages:
+                agent = self.agents_factory.quiz_creator_agent()
+                tasks["quiz"] = self.tasks_factory.create_quiz_task(
+                    agent=agent,
+                    learning_materials_task=materials_task,
+                    num_questions=num_questions,
+                    learning_materials=stored_materials
+                )
+                agents.append(agent)
+            if "projects" in stages:
+                agent = self.agents_factory.project_idea_agent()
+                tasks["projects"] = self.tasks_factory.suggest_projects_task(
+                    agent=agent,
+                    learning_materials_task=materials_task,
+                    topic=topic,
+                    expertise_level=expertise_level,
+                    num_projects=num_projects,
+                    learning_materials=stored_materials
+                )
+                agents.append(agent)
+            
+            crew = Crew(
+                agents=agents,
+                tasks=list(tasks.values()),
+                process=Process.sequential,
+                verbose=True
+            )
+            
+            routing: List[Dict[str, Any]] = []
+            with STAGE_SECONDS.labels("regenerate").time(), record_routing(routing), \
+                    fresh_completions(), count_tokens() as usage:
+                crew.kickoff()
+            if usage.total > 0:
+                TOKENS.labels(self.agents_factory.active_provider).inc(usage.total)
+            for stage, task in tasks.items():
+                if task.execution_duration is not None:
+                    STAGE_SECONDS.labels(TASK_STAGES[PLAN_STAGES.index(stage)]).observe(
+                        task.execution_duration
+                    )
+        except Exception as e:
+            print(f"❌ Regeneration failed: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "topic": topic,
+                "expertise_level": expertise_level
+            }
+        finally:
+            STAGE_SECONDS.labels("total").observe(time.perf_counter() - run_start)
+            IN_FLIGHT.dec()
+        
+        result = {
+            key: value for key, value in plan.items()
+            if key not in ("plan_id", "created_at", "timestamp", "cached", "cache_match")
+        }
+        result.update({
+            "success": True,
+            "provider": self.agents_factory.active_provider,
+            "source_plan_id": plan.get("plan_id"),
+            "regenerated": ordered
+        })
+        if "materials" in tasks:
+            result["learning_materials"] = tasks["materials"].output.pydantic
+            result["link_report"] = link_report or None
+        if "quiz" in tasks:
+            # The plan's old questions are in the topic's history, so repeats of them are replaced too
+            with record_routing(routing):
+                result["quiz"], result["quiz_dedupe"] = self._dedupe_quiz(
+                    tasks["quiz"].output.pydantic, result["learning_materials"], topic,
+                    expertise_level
+                )
+            result["quiz_source"] = "llm"
+        if "projects" in tasks:
+            result["projects"] = tasks["projects"].output.pydantic
+        result["routing"] = routing_summary(routing, self.agents_factory.llm.router)
+        print(f"✓ Regenerated {', '.join(ordered)}\n")
+        return self._save(result)
+    
+    def _cached_plan(
+        self,
+        topic: str,
+        expertise_level: str,
+        resources_per_category: int,
+        num_questions: int,
+        num_projects: int
+    ) -> Optional[Dict[str, Any]]:
+        """Return a stored plan for a similar topic at the same level, trimmed to size."""
+        if self.plan_store is None or self.topic_index is None:
+            return None
+        
+        with STAGE_SECONDS.labels("plan_cache").time():
+            # Offline, any stored plan beats none
+            max_age = None if config.offline else config.plan_cache_ttl_hours * 3600
+            match = self.topic_index.lookup(topic, expertise_level, max_age=max_age)
+            plan = self.plan_store.get(match.plan_id) if match else None
+        
+        if (plan is None
+                or len(plan["quiz"].questions) < num_questions
+                or len(plan["projects"].projects) < num_projects):
+            record_cache_lookup("plan", False)
+            return None
+        
+        record_cache_lookup("plan", True)
+        print(f"♻️  Serving stored plan for '{match.topic}' (similarity {match.score:.2f})\n")
+        plan = trim_plan(plan, resources_per_category, num_questions, num_projects)
+        plan["cached"] = True
+        plan["cache_match"] = match._asdict()
+        plan["requested_topic"] = topic
+        if config.offline:
+            plan["offline"] = True
+            plan["provenance"] = dict.fromkeys(("learning_materials", "quiz", "projects"),
+                                               "stored_plan")
+        return plan
+    
+    def _banked_quiz(self, topic: str, expertise_level: str, num_questions: int) -> Optional[Quiz]:
+        """A quiz assembled from the question bank, or None if it is too thin for the request."""
+        if self.question_bank is None:
+            return None
+        with STAGE_SECONDS.labels("question_bank").time():
+            try:
+                quiz = self.question_bank.assemble(topic, expertise_level, num_questions)
+            except Exception as e:
+                print(f"⚠️  Question bank lookup failed: {e}")
+                quiz = None
+        record_cache_lookup("question_bank", quiz is not None)
+        if quiz is not None:
+            print(f"🏦 Assembled the quiz from the question bank; skipping the quiz agent\n")
+        return quiz
+    
+    def _offline_plan(
+        self,
+        topic: str,
+        expertise_level: str,
+        resources_per_category: int,
+        num_questions: int,
+        num_projects: int
+    ) -> Dict[str, Any]:
+        """Assemble a plan from local data only (see `src.offline`)."""
+        print("📴 Offline: assembling the plan from stored plans, indexes and caches...")
+        with STAGE_SECONDS.labels("offline_assembly").time():
+            result = build_offline_plan(
+                topic,
+                expertise_level,
+                resources_per_category,
+                num_questions,
+                num_projects,
+                plan_store=self.plan_store,
+                topic_index=self.topic_index,
+                resource_index=self.resource_index,
+                run_config=self.run_config
+            )
+        if result["success"]:
+            RUNS.labels("offline").inc()
+            sources = ", ".join(f"{part}: {source}" for part, source in result["provenance"].items())
+            print(f"✓ Offline plan assembled ({sources})\n")
+        else:
+            RUNS.labels("error").inc()
+            print(f"❌ {result['error']}\n")
+        return result
+    
+    def _known_resources(
+        self,
+        topic: str,
+        expertise_level: str,
+        resources_per_category: int
+    ) -> Optional[Dict[str, List[Dict[str, str]]]]:
+        """
+        Candidates from the resource index, shaped like shared search hits, or
+        None unless every category has at least `resources_per_category`.
+        """
+        if self.resource_index is None:
+            return None
+        found = self.resource_index.candidates(
+            topic,
+            expertise_level,
+            limit=2 * resources_per_category,
+            max_age=config.resource_reuse_max_age_hours * 3600,
+            require_validated=self.link_validator is not None
+        )
+        covered = all(len(found[category]) >= resources_per_category for category in RESOURCE_CATEGORIES)
+        record_cache_lookup("resource_reuse", covered)
+        if not covered:
+            return None
+        return {
+            category[:-1]: [
+                {"title": resource.title, "link": resource.url, "snippet": resource.description}
+                for resource in found[category]
+            ]
+            for category in RESOURCE_CATEGORIES
+        }
+    
+    def _materials_callback(self, link_report: Dict[str, Any]):
+        """
+        Task callback for curated materials: drops duplicate resources (by
+        canonical URL), checks links into `link_report` and records the result
+        in the resource index. The task output is replaced, so later tasks see
+        the cleaned materials.
+        """
+        def callback(output):
+            materials = output.pydantic
+            if not isinstance(materials, LearningMaterial):
+                return
+            materials = dedupe_materials(materials)
+            statuses = None
+            
+            if self.link_validator is not None:
+                urls = [resource.url for category in RESOURCE_CATEGORIES
+                        for resource in getattr(materials, category)]
+                try:
+                    materials, report = validate_materials(
+                        materials, self.link_validator, self.link_check_mode
+                    )
+                except Exception as e:
+                    report = {"mode": self.link_check_mode, "error": str(e)}
+                    print(f"⚠️  Link check failed: {e}")
+                link_report.update(report)
+                if report.get("dead"):
+                    print(f"🔗 {len(report['dead'])} of {report['checked']} links unreachable "
+                          f"({'dropped' if self.link_check_mode == 'drop' else 'flagged'})")
+                if "error" not in report:
+                    dead = {link["url"] for link in report["dead"]}
+                    statuses = {url: url not in dead for url in urls}
+            
+            if self.resource_index is not None:
+                try:
+                    self.resource_index.add_materials(materials, statuses)
+                except Exception as e:
+                    print(f"⚠️  Could not update resource index: {e}")
+            
+            output.pydantic = materials
+            output.raw = materials.model_dump_json()
+        
+        return callback
+    
+    def _save(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Persist a successful result to the plan store, if one is configured, bank
+        its quiz questions unless they came from the bank, and remember them for
+        duplicate checks of later quizzes on the topic.
+        """
+        if self.plan_store is not None:
+            result["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            try:
+                result["plan_id"] = self.plan_store.add(result)
+            except Exception as e:
+                print(f"⚠️  Could not save plan to store: {e}")
+                return result
+            
+            if self.topic_index is not None:
+                self.topic_index.add(
+                    result["plan_id"],
+                    result["topic"],
+                    result["expertise_level"],
+                    result["learning_materials"].summary
+                )
+        if self.question_bank is not None and result.get("quiz_source") != "question_bank":
+            try:
+                self.question_bank.add_quiz(result["quiz"], result["expertise_level"],
+                                            result.get("plan_id"), result["topic"])
+            except Exception as e:
+                print(f"⚠️  Could not update question bank: {e}")
+        if self.quiz_dedupe is not None:
+            self.quiz_dedupe.remember(result["quiz"], result["topic"], result["expertise_level"])
+        return result
+    
+    def _record_run_metrics(self, tasks, tokens: int):
+        """Record per-task latency and token usage for a finished run."""
+        for stage, task in zip(TASK_STAGES, tasks):
+            if task is None:
+                continue
+            duration = task.execution_duration
+            if duration is not None:
+                STAGE_SECONDS.labels(stage).observe(duration)
+        
+        if tokens > 0:
+            TOKENS.labels(self.agents_factory.active_provider).inc(tokens)
+            TOKENS_PER_RUN.observe(tokens)
+
+
+def _record_request(**request):
+    # A recording cassette keeps the request so the workload can be re-issued on replay
+    cassette = active_cassette()
+    if cassette is not None and cassette.recording:
+        cassette.record_run(**request)
+
+
+def trim_plan(
+    plan: Dict[str, Any],
+    resources_per_category: int,
+    num_questions: int,
+    num_projects: int
+) -> Dict[str, Any]:
+    """Cut a stored plan down to the requested number of resources, questions and projects."""
+    materials = plan["learning_materials"]
+    quiz = plan["quiz"]
+    projects = plan["projects"]
+    
+    questions = quiz.questions[:num_questions]
+    minutes = quiz.estimated_time_minutes
+    if quiz.questions and len(questions) < len(quiz.questions):
+        minutes = max(1, round(minutes * len(questions) / len(quiz.questions)))
+    
+    trimmed = dict(plan)
+    trimmed["learning_materials"] = materials.model_copy(update={
+        "videos": materials.videos[:resources_per_category],
+        "articles": materials.articles[:resources_per_category],
+        "exercises": materials.exercises[:resources_per_category]
+    })
+    trimmed["quiz"] = quiz.model_copy(update={
+        "questions": questions,
+        "total_questions": len(questions),
+        "estimated_time_minutes": minutes
+    })
+    trimmed["projects"] = projects.model_copy(update={
+        "projects": projects.projects[:num_projects],
+        "total_projects": len(projects.projects[:num_projects])
+    })
+    return trimmed
+
+
+def merge_questions(
+    quiz: Quiz,
+    new_questions: List[QuizQuestion],
+    threshold: float = DUPLICATE_THRESHOLD
+) -> Tuple[Quiz, int]:
+    """
+    Append questions to a quiz, skipping near-duplicates of questions already in it.
+    
+    Args:
+        quiz: The quiz to extend
+        new_questions: Candidate questions to append
+        threshold: Similarity (wording, or wording and options) at which two
+            questions count as duplicates; see `src.quiz_dedupe`
+    
+    Returns:
+        Tuple of (extended quiz, number of duplicates dropped)
+    """
+    index = QuestionIndex(threshold)
+    for question in quiz.questions:
+        index.add(question)
+    kept = []
+    for question in new_questions:
+        features = question_features(question)
+        keys = index.keys(features)
+        if index.match(features, keys) is not None:
+            continue
+        index.add(question, features, keys)
+        kept.append(question)
+    
+    questions = quiz.questions + kept
+    # Keep the quiz's own minutes-per-question pace for the added questions
+    per_question = quiz.estimated_time_minutes / len(quiz.questions) if quiz.questions else 2
+    return quiz.model_copy(update={
+        "questions": questions,
+        "total_questions": len(questions),
+        "estimated_time_minutes": max(1, round(per_question * len(questions)))
+    }), len(new_questions) - len(kept)
 
 
-def create_education_crew(llm_provider: str = None) -> EducationCrew:
+def create_education_crew(
+    llm_provider: str = None,
+    plan_store: Optional[PlanStore] = None,
+    topic_index: Optional[TopicIndex] = None,
+    link_validator: Optional[LinkValidator] = None,
+    resource_index: Optional[ResourceIndex] = None,
+    question_bank: Optional[QuestionBank] = None,
+    run_config: Optional[RunConfig] = None
+) -> EducationCrew:
     """Factory function to create an EducationCrew instance."""
-    return EducationCrew(llm_provider)
+    return EducationCrew(llm_provider, plan_store, topic_index, link_validator, resource_index,
+                         question_bank, run_config)
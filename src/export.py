@@ -0,0 +1,238 @@
+"""
+Streaming exports of stored plans: NDJSON (one plan per line) for interchange,
+and flattened Arrow/Parquet tables for analytics. Both write plan by plan or
+batch by batch, so memory stays flat however many plans are exported.
+
+The columnar formats need the optional `pyarrow` package.
+"""
+import gzip
+import io
+import os
+import sys
+from contextlib import contextmanager
+from typing import Any, Dict, IO, Iterable, Iterator, List
+
+from src.resources import RESOURCE_CATEGORIES, canonical_url
+from src.serialization import dumps, loads
+
+
+COLUMNAR_FORMATS = ("parquet", "arrow")
+EXPORT_FORMATS = ("ndjson",) + COLUMNAR_FORMATS
+
+# One output table per flattened entity
+TABLES = ("plans", "resources", "questions", "projects")
+
+
+@contextmanager
+def _open_text(path: str) -> Iterator[IO[str]]:
+    # "-" is stdout; a .gz suffix compresses
+    if path == "-":
+        yield sys.stdout
+    elif path.endswith(".gz"):
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            yield f
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            yield f
+
+
+def ndjson_lines(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """Yield each record as one compact JSON line (with its trailing newline)."""
+    for record in records:
+        yield dumps(record).decode("utf-8") + "\n"
+
+
+def write_ndjson(records: Iterable[Dict[str, Any]], path: str) -> int:
+    """
+    Stream records to an NDJSON file, one plan per line.
+
+    Args:
+        records: Plan records (see `plan_to_record` / `PlanStore.iter_records`)
+        path: Output file ("-" for stdout, ".gz" suffix to compress)
+
+    Returns:
+        Number of plans written
+    """
+    count = 0
+    with _open_text(path) as f:
+        for line in ndjson_lines(records):
+            f.write(line)
+            count += 1
+    return count
+
+
+def read_ndjson(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield the records of an NDJSON export (plain or .gz), skipping blank lines."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
+
+
+def ndjson_bytes(record: Dict[str, Any]) -> bytes:
+    """One record as an NDJSON document, e.g. for a download button."""
+    buffer = io.StringIO()
+    buffer.writelines(ndjson_lines([record]))
+    return buffer.getvalue().encode("utf-8")
+
+
+def flatten_record(record: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Split one plan record into rows for the plans, resources, questions and
+    projects tables, each row carrying the plan id.
+    """
+    plan_id = record["plan_id"]
+    materials, quiz, projects = record["learning_materials"], record["quiz"], record["projects"]
+    rows = {table: [] for table in TABLES}
+    rows["plans"].append({
+        "plan_id": plan_id,
+        "created_at": record.get("created_at"),
+        "topic": record["topic"],
+        "expertise_level": record["expertise_level"],
+        "provider": record.get("provider"),
+        "summary": materials.get("summary", ""),
+        "num_resources": sum(len(materials.get(c, [])) for c in RESOURCE_CATEGORIES),
+        "num_questions": len(quiz.get("questions", [])),
+        "quiz_minutes": quiz.get("estimated_time_minutes"),
+        "num_projects": len(projects.get("projects", [])),
+    })
+    for category in RESOURCE_CATEGORIES:
+        for position, resource in enumerate(materials.get(category, [])):
+            rows["resources"].append({
+                "plan_id": plan_id,
+                "category": category,
+                "position": position,
+                "title": resource["title"],
+                "url": resource["url"],
+                "canonical_url": canonical_url(resource["url"]),
+                "description": resource["description"],
+                "resource_type": resource["resource_type"],
+            })
+    for position, question in enumerate(quiz.get("questions", [])):
+        options = question.get("options", [])
+        rows["questions"].append({
+            "plan_id": plan_id,
+            "position": position,
+            "question": question["question"],
+            "option_letters": [option["option"] for option in options],
+            "option_texts": [option["text"] for option in options],
+            "correct_answer": question["correct_answer"],
+            "explanation": question["explanation"],
+            "difficulty": question["difficulty"],
+        })
+    for position, project in enumerate(projects.get("projects", [])):
+        rows["projects"].append({
+            "plan_id": plan_id,
+            "position": position,
+            "title": project["title"],
+            "description": project["description"],
+            "expertise_level": project["expertise_level"],
+            "estimated_duration": project["estimated_duration"],
+            "key_concepts": project["key_concepts"],
+            "deliverable_names": [d["name"] for d in project["deliverables"]],
+            "deliverable_descriptions": [d["description"] for d in project["deliverables"]],
+            "learning_outcomes": project["learning_outcomes"],
+        })
+    return rows
+
+
+def _schemas(pa) -> Dict[str, Any]:
+    strings = pa.list_(pa.string())
+    return {
+        "plans": pa.schema([
+            ("plan_id", pa.string()), ("created_at", pa.float64()), ("topic", pa.string()),
+            ("expertise_level", pa.string()), ("provider", pa.string()), ("summary", pa.string()),
+            ("num_resources", pa.int32()), ("num_questions", pa.int32()),
+            ("quiz_minutes", pa.int32()), ("num_projects", pa.int32()),
+        ]),
+        "resources": pa.schema([
+            ("plan_id", pa.string()), ("category", pa.string()), ("position", pa.int32()),
+            ("title", pa.string()), ("url", pa.string()), ("canonical_url", pa.string()),
+            ("description", pa.string()), ("resource_type", pa.string()),
+        ]),
+        "questions": pa.schema([
+            ("plan_id", pa.string()), ("position", pa.int32()), ("question", pa.string()),
+            ("option_letters", strings), ("option_texts", strings),
+            ("correct_answer", pa.string()), ("explanation", pa.string()),
+            ("difficulty", pa.string()),
+        ]),
+        "projects": pa.schema([
+            ("plan_id", pa.string()), ("position", pa.int32()), ("title", pa.string()),
+            ("description", pa.string()), ("expertise_level", pa.string()),
+            ("estimated_duration", pa.string()), ("key_concepts", strings),
+            ("deliverable_names", strings), ("deliverable_descriptions", strings),
+            ("learning_outcomes", strings),
+        ]),
+    }
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise ImportError("Parquet/Arrow export needs pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def write_columnar(
+    records: Iterable[Dict[str, Any]],
+    output_dir: str,
+    fmt: str = "parquet",
+    batch_size: int = 2000
+) -> Dict[str, int]:
+    """
+    Stream records into flattened plans/resources/questions/projects tables.
+
+    Rows are buffered for `batch_size` plans at a time and written as one
+    row group (Parquet) or record batch (Arrow IPC file) per table.
+
+    Args:
+        records: Plan records (see `PlanStore.iter_records`)
+        output_dir: Directory receiving `<table>.parquet` or `<table>.arrow`
+        fmt: "parquet" or "arrow"
+        batch_size: Plans per row group / record batch
+
+    Returns:
+        Rows written per table
+    """
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f"Columnar format must be one of: {', '.join(COLUMNAR_FORMATS)}")
+    pa = _import_pyarrow()
+    schemas = _schemas(pa)
+    os.makedirs(output_dir, exist_ok=True)
+
+    writers = {}
+    for table in TABLES:
+        path = os.path.join(output_dir, f"{table}.{fmt}")
+        if fmt == "parquet":
+            writers[table] = pa.parquet.ParquetWriter(path, schemas[table], compression="zstd")
+        else:
+            writers[table] = pa.ipc.new_file(path, schemas[table])
+    counts = {table: 0 for table in TABLES}
+    buffers: Dict[str, List[Dict[str, Any]]] = {table: [] for table in TABLES}
+
+    def flush():
+        for table in TABLES:
+            if buffers[table]:
+                batch = pa.Table.from_pylist(buffers[table], schema=schemas[table])
+                writers[table].write_table(batch)
+                counts[table] += len(buffers[table])
+                buffers[table] = []
+
+    try:
+        pending = 0
+        for record in records:
+            for table, rows in flatten_record(record).items():
+                buffers[table].extend(rows)
+            pending += 1
+            if pending >= batch_size:
+                flush()
+                pending = 0
+        flush()
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return counts
@@ -0,0 +1,222 @@
+"""
+Local stand-ins for the LLM provider, used for profiling and offline testing.
+"""
+import json
+import re
+import time
+from typing import Any, Dict, Optional, Type
+
+from crewai.llms.base_llm import BaseLLM
+from crewai.tools import BaseTool
+from pydantic import BaseModel, Field
+
+from src.metrics import SEARCH_CALLS, SEARCH_SECONDS
+
+from src.models import (
+    Deliverable,
+    LearningMaterial,
+    ProjectIdea,
+    ProjectSuggestions,
+    Quiz,
+    QuizExtension,
+    QuizOption,
+    QuizQuestion,
+    Resource,
+)
+
+
+def _prompt_text(messages) -> str:
+    """Flatten chat messages into a single string."""
+    if isinstance(messages, str):
+        return messages
+    parts = []
+    for message in messages:
+        content = message.get("content", "") if isinstance(message, dict) else message
+        parts.append(content if isinstance(content, str) else json.dumps(content, default=str))
+    return "\n".join(parts)
+
+
+def _find(pattern: str, text: str, default: str) -> str:
+    match = re.search(pattern, text, re.IGNORECASE)
+    return match.group(1).strip() if match else default
+
+
+def fake_learning_material(topic: str, expertise_level: str, count: int = 3) -> LearningMaterial:
+    """Build a deterministic LearningMaterial for `topic`."""
+    slug = re.sub(r"[^a-z0-9]+", "-", topic.lower()).strip("-") or "topic"
+
+    def resources(kind: str, host: str):
+        return [
+            Resource(
+                title=f"{topic} {kind.capitalize()} {i}",
+                url=f"https://{host}/{slug}/{kind}-{i}",
+                description=f"A {expertise_level} {kind} about {topic}, part {i}.",
+                resource_type=kind
+            )
+            for i in range(1, count + 1)
+        ]
+
+    return LearningMaterial(
+        topic=topic,
+        expertise_level=expertise_level,
+        videos=resources("video", "videos.example.com"),
+        articles=resources("article", "articles.example.com"),
+        exercises=resources("exercise", "exercises.example.com"),
+        summary=f"Start with the {topic} videos, deepen with the articles, "
+                f"then practise with the exercises."
+    )
+
+
+# Question stems and aspects with coprime lengths, so numbered questions differ in wording
+_QUESTION_STEMS = [
+    "Which statement about {aspect} in {topic} is correct?",
+    "What is the main purpose of {aspect} when working with {topic}?",
+    "When should a learner focus on {aspect} in {topic}?",
+    "Which example best illustrates {aspect} for {topic}?",
+]
+_QUESTION_ASPECTS = [
+    "core terminology", "the typical workflow", "common pitfalls", "performance trade-offs",
+    "tooling choices", "testing strategies", "best practices", "historical background",
+    "real-world applications", "debugging techniques", "data representation",
+]
+
+
+def fake_question_text(topic: str, i: int) -> str:
+    """Deterministic, distinctly worded question text for question number `i`."""
+    stem = _QUESTION_STEMS[i % len(_QUESTION_STEMS)]
+    return stem.format(topic=topic, aspect=_QUESTION_ASPECTS[i % len(_QUESTION_ASPECTS)])
+
+
+def fake_quiz(topic: str, num_questions: int = 5, start: int = 1) -> Quiz:
+    """Build a deterministic Quiz with `num_questions` questions."""
+    difficulties = ["easy", "medium", "hard"]
+    questions = [
+        QuizQuestion(
+            question=fake_question_text(topic, i),
+            options=[
+                QuizOption(option=letter, text=f"Statement {letter} about concept {i}")
+                for letter in "ABCD"
+            ],
+            correct_answer="ABCD"[i % 4],
+            explanation=f"Statement {'ABCD'[i % 4]} describes concept {i} of {topic}.",
+            difficulty=difficulties[i % 3]
+        )
+        for i in range(start, start + num_questions)
+    ]
+    return Quiz(
+        topic=topic,
+        total_questions=len(questions),
+        questions=questions,
+        estimated_time_minutes=2 * len(questions)
+    )
+
+
+def fake_projects(topic: str, expertise_level: str, num_projects: int = 2) -> ProjectSuggestions:
+    """Build deterministic ProjectSuggestions with `num_projects` ideas."""
+    projects = [
+        ProjectIdea(
+            title=f"{topic} Project {i}",
+            description=f"Build a small {expertise_level} application that applies {topic}.",
+            expertise_level=expertise_level,
+            estimated_duration=f"{i + 1} days",
+            key_concepts=[f"{topic} concept {j}" for j in range(1, 4)],
+            deliverables=[
+                Deliverable(name=f"Deliverable {j}", description=f"Working artefact {j}")
+                for j in range(1, 4)
+            ],
+            learning_outcomes=[f"Apply {topic} skill {j}" for j in range(1, 4)]
+        )
+        for i in range(1, num_projects + 1)
+    ]
+    return ProjectSuggestions(topic=topic, projects=projects, total_projects=len(projects))
+
+
+class FakeLLM(BaseLLM):
+    """
+    Deterministic LLM that answers every task instantly (or after `latency`
+    seconds) with a schema-valid final answer, without touching the network.
+    """
+
+    llm_type: str = "fake"
+    provider: str = "fake"
+    latency: float = 0.0
+
+    def call(
+        self,
+        messages,
+        tools=None,
+        callbacks=None,
+        available_functions=None,
+        from_task=None,
+        from_agent=None,
+        response_model=None
+    ):
+        """Return a ReAct-style final answer for the task found in `messages`."""
+        if self.latency:
+            time.sleep(self.latency)
+
+        text = _prompt_text(messages)
+        payload = self._answer(text, response_model)
+        return f"Thought: I now know the final answer\nFinal Answer: {payload.model_dump_json()}"
+
+    def _answer(self, text: str, response_model: Optional[type]):
+        topic = _find(r'topic: "([^"]+)"', text, _find(r'"topic":\s*"([^"]+)"', text, "General Topic"))
+        level = _find(r"expertise level:\s*(\w+)", text, "beginner").lower()
+
+        if response_model is ProjectSuggestions or "project ideas" in text:
+            count = int(_find(r"suggest (\d+)", text, "2"))
+            return fake_projects(topic, level, count)
+        if response_model is QuizExtension or "additional multiple-choice" in text:
+            count = int(_find(r"create (\d+) additional", text, "5"))
+            start = int(_find(r"already has (\d+) questions", text, "0")) + 1
+            return QuizExtension(questions=fake_quiz(topic, count, start).questions)
+        if response_model is Quiz or "multiple-choice" in text:
+            count = int(_find(r"with (\d+) questions", text, "5"))
+            return fake_quiz(topic, count)
+        count = int(_find(r"(?:Find|Choose) (\d+) high-quality videos", text, "3"))
+        return fake_learning_material(topic, level, count)
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return True
+
+    def get_context_window_size(self) -> int:
+        return 128000
+
+
+class FakeSearchInput(BaseModel):
+    """Input schema for FakeSearchTool."""
+    search_query: str = Field(..., description="Query to search the internet for")
+
+
+class FakeSearchTool(BaseTool):
+    """
+    Local stand-in for the Serper search tool. Returns Serper-shaped results
+    derived from the query, so multi-level runs work without network access.
+    """
+
+    name: str = "Search the internet with Serper"
+    description: str = "Search the internet for a query and return the top results."
+    args_schema: Type[BaseModel] = FakeSearchInput
+    n_results: int = 10
+    latency: float = 0.0
+
+    def _run(self, search_query: str, **kwargs) -> Dict[str, Any]:
+        start = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        slug = re.sub(r"[^a-z0-9]+", "-", search_query.lower()).strip("-") or "query"
+        organic = [
+            {
+                "title": f"{search_query.title()} - Result {i}",
+                "link": f"https://search.example.com/{slug}/{i}",
+                "snippet": f"Result {i} for {search_query}.",
+                "position": i
+            }
+            for i in range(1, self.n_results + 1)
+        ]
+        SEARCH_CALLS.labels("fake", "success").inc()
+        SEARCH_SECONDS.labels("fake").observe(time.perf_counter() - start)
+        return {"searchParameters": {"q": search_query, "type": "search"}, "organic": organic}
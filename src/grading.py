@@ -0,0 +1,216 @@
+"""
+Vectorized grading of quiz submissions and classical item statistics.
+
+A cohort's answers are encoded as an (learners x questions) int8 matrix of
+option indexes (A=0, B=1, ..., -1 for blank) and graded against the quiz's
+answer key in one pass. Per question it reports difficulty (share correct),
+discrimination (upper minus lower group, plus the item-rest point-biserial
+correlation) and how often each option was chosen, which is what
+`retag_difficulty` uses to correct `QuizQuestion.difficulty`.
+"""
+import string
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.models import Quiz
+
+
+LETTERS = string.ascii_uppercase
+
+# Share of learners answering correctly at or above which a question is easy,
+# and below which it is hard
+EASY_P = 0.8
+HARD_P = 0.5
+
+# Distractors chosen by fewer learners than this are not doing their job
+MIN_DISTRACTOR_SHARE = 0.05
+
+# Rasch item difficulty used by `simulate_responses` for each tag
+SIMULATED_DIFFICULTY = {"easy": -1.5, "medium": 0.0, "hard": 1.5}
+
+
+def answer_key(quiz: Quiz) -> Tuple[np.ndarray, int]:
+    """
+    Encode a quiz's correct answers.
+
+    Returns:
+        Tuple of (option index of each correct answer, options per question)
+    """
+    key = np.array([LETTERS.find(question.correct_answer.strip().upper()[:1])
+                    for question in quiz.questions], dtype=np.int8)
+    num_options = max((len(question.options) for question in quiz.questions), default=0)
+    return key, num_options
+
+
+def encode_responses(answers: Iterable[str], num_questions: int, num_options: int) -> np.ndarray:
+    """
+    Encode answer strings (one per learner, one letter per question, anything
+    else for a blank, e.g. "AC-DB") as an int8 matrix of option indexes.
+
+    Args:
+        answers: Answer strings; shorter ones are padded with blanks
+        num_questions: Questions in the quiz
+        num_options: Options per question; letters beyond them count as blank
+
+    Returns:
+        (learners x questions) matrix, -1 for blank
+    """
+    buffer = "".join(answer[:num_questions].ljust(num_questions) for answer in answers)
+    raw = np.frombuffer(buffer.encode("ascii", "replace"), dtype=np.uint8)
+    table = np.full(256, -1, dtype=np.int8)
+    table[[ord(letter) for letter in LETTERS[:num_options]]] = np.arange(num_options)
+    table[[ord(letter.lower()) for letter in LETTERS[:num_options]]] = np.arange(num_options)
+    return table[raw].reshape(-1, num_questions)
+
+
+def _option_counts(responses: np.ndarray, num_options: int) -> np.ndarray:
+    # (questions x options + 1) choice counts; column 0 is blank
+    num_questions = responses.shape[1]
+    flat = responses.astype(np.int64) + 1 + np.arange(num_questions) * (num_options + 1)
+    return np.bincount(flat.ravel(), minlength=num_questions * (num_options + 1)) \
+        .reshape(num_questions, num_options + 1)
+
+
+def _suggest_difficulty(p: float) -> str:
+    return "easy" if p >= EASY_P else "hard" if p < HARD_P else "medium"
+
+
+def grade_cohort(quiz: Quiz, responses: np.ndarray, group_fraction: float = 0.27) -> Dict[str, Any]:
+    """
+    Grade every learner and compute item statistics in one vectorized pass.
+
+    Args:
+        quiz: The quiz that was answered
+        responses: (learners x questions) option indexes from `encode_responses`
+        group_fraction: Share of learners in each of the upper and lower groups
+            for the discrimination index (0.27 is the classical choice)
+
+    Returns:
+        Per-learner scores (as an array), cohort summary, and one entry per
+        question with difficulty, discrimination, point-biserial, blank rate,
+        suggested difficulty and per-option statistics
+    """
+    key, num_options = answer_key(quiz)
+    num_learners, num_questions = responses.shape
+    if num_questions != len(quiz.questions):
+        raise ValueError(f"Responses have {num_questions} answers per learner, "
+                         f"the quiz has {len(quiz.questions)} questions")
+    if num_learners == 0:
+        raise ValueError("No responses to grade")
+
+    correct = responses == key
+    scores = correct.sum(axis=1, dtype=np.int32)
+    p = correct.mean(axis=0)
+
+    group = max(1, int(round(num_learners * group_fraction)))
+    order = np.argsort(scores, kind="stable")
+    lower, upper = order[:group], order[-group:]
+    discrimination = correct[upper].mean(axis=0) - correct[lower].mean(axis=0)
+
+    # Item-rest point-biserial: correlation of each item with the score on the other items
+    item = correct.astype(np.float64)
+    rest = scores[:, None] - item
+    item_centered = item - item.mean(axis=0)
+    rest_centered = rest - rest.mean(axis=0)
+    denominator = np.sqrt((item_centered ** 2).sum(axis=0) * (rest_centered ** 2).sum(axis=0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        point_biserial = np.where(denominator > 0,
+                                  (item_centered * rest_centered).sum(axis=0) / denominator, 0.0)
+
+    counts = _option_counts(responses, num_options)
+    upper_share = _option_counts(responses[upper], num_options) / len(upper)
+    lower_share = _option_counts(responses[lower], num_options) / len(lower)
+    shares = counts / num_learners
+
+    items = []
+    for q, question in enumerate(quiz.questions):
+        options = []
+        for o, option in enumerate(question.options):
+            is_correct = o == key[q]
+            share = float(shares[q, o + 1])
+            option_discrimination = float(upper_share[q, o + 1] - lower_share[q, o + 1])
+            flag = None
+            if not is_correct and share < MIN_DISTRACTOR_SHARE:
+                flag = "non-functional"
+            elif not is_correct and option_discrimination > 0:
+                # Stronger learners prefer this distractor: ambiguous question or wrong key
+                flag = "attracts upper group"
+            options.append({
+                "option": option.option,
+                "text": option.text,
+                "correct": bool(is_correct),
+                "count": int(counts[q, o + 1]),
+                "share": share,
+                "discrimination": option_discrimination,
+                "flag": flag,
+            })
+        items.append({
+            "index": q,
+            "question": question.question,
+            "tagged_difficulty": question.difficulty,
+            "suggested_difficulty": _suggest_difficulty(float(p[q])),
+            "difficulty": float(p[q]),
+            "discrimination": float(discrimination[q]),
+            "point_biserial": float(point_biserial[q]),
+            "blank_rate": float(shares[q, 0]),
+            "options": options,
+        })
+
+    return {
+        "learners": num_learners,
+        "questions": num_questions,
+        "responses": num_learners * num_questions,
+        "scores": scores,
+        "mean_score": float(scores.mean()),
+        "score_sd": float(scores.std()),
+        "items": items,
+    }
+
+
+def retag_difficulty(quiz: Quiz, report: Dict[str, Any],
+                     min_learners: int = 30) -> Tuple[Quiz, List[Dict[str, Any]]]:
+    """
+    Re-tag each question's difficulty from its observed share of correct answers.
+
+    Args:
+        quiz: The graded quiz
+        report: Result of `grade_cohort` for it
+        min_learners: Cohort size below which tags are left alone
+
+    Returns:
+        Tuple of (quiz with updated tags, list of changes made)
+    """
+    if report["learners"] < min_learners:
+        return quiz, []
+    questions, changes = [], []
+    for question, item in zip(quiz.questions, report["items"]):
+        suggested = item["suggested_difficulty"]
+        if suggested != question.difficulty.strip().lower():
+            changes.append({"index": item["index"], "question": question.question,
+                            "from": question.difficulty, "to": suggested,
+                            "p": item["difficulty"]})
+            question = question.model_copy(update={"difficulty": suggested})
+        questions.append(question)
+    return quiz.model_copy(update={"questions": questions}), changes
+
+
+def simulate_responses(quiz: Quiz, num_learners: int, seed: Optional[int] = None,
+                       blank_rate: float = 0.02) -> np.ndarray:
+    """
+    Synthetic cohort answers from a Rasch model, for trying out and benchmarking grading.
+
+    Each learner's ability is standard normal and each question's difficulty
+    follows its tag; wrong answers pick a distractor at random.
+    """
+    rng = np.random.default_rng(seed)
+    key, num_options = answer_key(quiz)
+    b = np.array([SIMULATED_DIFFICULTY.get(question.difficulty.strip().lower(), 0.0)
+                  for question in quiz.questions])
+    ability = rng.standard_normal(num_learners)[:, None]
+    right = rng.random((num_learners, len(key))) < 1 / (1 + np.exp(b - ability))
+    # A random offset of 1..K-1 from the key is always a distractor
+    wrong = (key + rng.integers(1, max(num_options, 2), size=right.shape)) % max(num_options, 1)
+    responses = np.where(right, key, wrong).astype(np.int8)
+    responses[rng.random(responses.shape) < blank_rate] = -1
+    return responses
@@ -0,0 +1,274 @@
+"""
+Bounded per-session history of generated plans for the Streamlit app.
+
+Each session keeps lightweight metadata for every entry and the full results
+only for the most recent ones, within a per-session and a per-process memory
+cap. Evicted results are reloaded on demand: from the plan store when the
+plan was saved there, otherwise from a spill file written when it was added.
+"""
+import os
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import config
+from src.plan_store import (
+    PlanStore, decode_payload, encode_payload, plan_to_record, record_to_plan
+)
+from src.serialization import dumps
+
+
+# Keys of a run result that hold the plan itself; everything else is kept as small extras
+PLAN_KEYS = ("learning_materials", "quiz", "projects", "raw_output")
+
+
+class MemoryBudget:
+    """
+    Process-wide cap on the results held in memory by all session histories.
+    When the total goes over the cap, the least recently used results of any
+    session are dropped (they stay reloadable).
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total = 0
+        self._lru: "OrderedDict[Tuple[int, str], Tuple[weakref.ref, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def charge(self, history: "SessionHistory", entry_id: str, size: int):
+        """Account for a result now held by `history`, evicting others if over the cap."""
+        with self._lock:
+            key = (id(history), entry_id)
+            if key in self._lru:
+                self.total -= self._lru.pop(key)[1]
+            self._lru[key] = (weakref.ref(history), size)
+            self.total += size
+            victims = []
+            while self.total > self.max_bytes and len(self._lru) > 1:
+                (_, victim_id), (ref, victim_size) = self._lru.popitem(last=False)
+                self.total -= victim_size
+                victims.append((ref, victim_id))
+        # Drop outside our lock; histories take their own lock
+        for ref, victim_id in victims:
+            owner = ref()
+            if owner is not None:
+                owner._drop(victim_id, from_budget=True)
+
+    def touch(self, history: "SessionHistory", entry_id: str):
+        with self._lock:
+            key = (id(history), entry_id)
+            if key in self._lru:
+                self._lru.move_to_end(key)
+
+    def release(self, history_id: int, entry_id: Optional[str] = None):
+        """Stop accounting for one result of a history, or all of them."""
+        with self._lock:
+            for key in [k for k in self._lru if k[0] == history_id
+                        and (entry_id is None or k[1] == entry_id)]:
+                self.total -= self._lru.pop(key)[1]
+
+
+_budget: Optional[MemoryBudget] = None
+_budget_lock = threading.Lock()
+
+
+def process_budget() -> MemoryBudget:
+    """The memory budget shared by every session in this process (HISTORY_PROCESS_MB)."""
+    global _budget
+    with _budget_lock:
+        if _budget is None:
+            _budget = MemoryBudget(int(config.history_process_mb * 2**20))
+        return _budget
+
+
+class SessionHistory:
+    """
+    History of one session's plans with an in-memory LRU of full results.
+
+    Results that were saved to the plan store are reloaded from it by plan id;
+    others, including trimmed copies served from the plan cache, are written
+    to a compressed spill file under `spill_dir` when added.
+    """
+
+    def __init__(
+        self,
+        plan_store: Optional[PlanStore] = None,
+        spill_dir: Optional[str] = None,
+        memory_items: Optional[int] = None,
+        memory_mb: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        budget: Optional[MemoryBudget] = None
+    ):
+        """
+        Args:
+            plan_store: Store that saved plans are reloaded from
+            spill_dir: Directory for results that are not in the store
+                (default: HISTORY_SPILL_DIR)
+            memory_items: Full results kept in memory for this session
+                (default: HISTORY_MEMORY_ITEMS)
+            memory_mb: Cap on this session's in-memory results, by serialized size
+                (default: HISTORY_SESSION_MB)
+            max_entries: Entries kept at all; older ones are forgotten
+                (default: HISTORY_MAX_ENTRIES)
+            budget: Process-wide cap shared with other sessions (default: `process_budget()`)
+        """
+        self.plan_store = plan_store
+        self.session_id = uuid.uuid4().hex
+        self.spill_dir = os.path.join(spill_dir or config.history_spill_dir, self.session_id)
+        self.memory_items = memory_items if memory_items is not None else config.history_memory_items
+        self.memory_bytes = int((memory_mb if memory_mb is not None
+                                 else config.history_session_mb) * 2**20)
+        self.max_entries = max_entries if max_entries is not None else config.history_max_entries
+        self.budget = budget or process_budget()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.RLock()
+        # Release this session's share of the budget and its spill files when it goes away
+        weakref.finalize(self, _cleanup, self.budget, id(self), self.spill_dir)
+
+    def add(self, result: Dict[str, Any]) -> str:
+        """
+        Record a successful result and return its entry id.
+
+        The raw crew output is not kept.
+        """
+        result = {key: value for key, value in result.items() if key != "raw_output"}
+        record = plan_to_record(result)
+        payload = dumps(record)
+        entry_id = uuid.uuid4().hex
+        # A plan served from the plan cache is trimmed to the request, so the
+        # stored plan it came from is not what was shown; spill it instead
+        reload_id = None if result.get("cached") or self.plan_store is None \
+            else result.get("plan_id")
+        entry = {
+            "entry_id": entry_id,
+            "topic": result["topic"],
+            "expertise_level": result["expertise_level"],
+            "timestamp": record["timestamp"],
+            "plan_id": reload_id,
+            "size": len(payload),
+            "extras": {key: value for key, value in result.items() if key not in PLAN_KEYS},
+            "spill_path": None,
+        }
+        if not entry["plan_id"]:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            entry["spill_path"] = os.path.join(self.spill_dir, f"{entry_id}.plan")
+            with open(entry["spill_path"], "wb") as f:
+                f.write(encode_payload(record))
+
+        with self._lock:
+            self._entries[entry_id] = entry
+            while len(self._entries) > self.max_entries:
+                self._forget(next(iter(self._entries)))
+        self._hold(entry_id, result, entry["size"])
+        return entry_id
+
+    def get(self, entry_id: str) -> Optional[Dict[str, Any]]:
+        """Return the full result of an entry, reloading it if it was evicted."""
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                return None
+            result = self._memory.get(entry_id)
+            if result is not None:
+                self._memory.move_to_end(entry_id)
+        if result is not None:
+            self.budget.touch(self, entry_id)
+            return result
+
+        result = self._reload(entry)
+        if result is not None:
+            self._hold(entry_id, result, entry["size"])
+        return result
+
+    def replace(self, entry_id: str, result: Dict[str, Any]) -> str:
+        """Replace an entry with an updated result (e.g. an extended quiz); returns the new id."""
+        with self._lock:
+            if entry_id in self._entries:
+                self._forget(entry_id)
+        return self.add(result)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Metadata of every entry, newest first, with whether it is held in memory."""
+        with self._lock:
+            return [
+                {key: entry[key] for key in ("entry_id", "topic", "expertise_level", "timestamp",
+                                             "plan_id", "size")}
+                | {"in_memory": entry["entry_id"] in self._memory}
+                for entry in reversed(self._entries.values())
+            ]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def memory_used(self) -> int:
+        """Serialized size of the results currently held in memory."""
+        return self._memory_used
+
+    def clear(self):
+        """Forget every entry and delete the spill files."""
+        with self._lock:
+            for entry_id in list(self._entries):
+                self._forget(entry_id)
+
+    def _reload(self, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if entry["plan_id"] is not None:
+            result = self.plan_store.get(entry["plan_id"])
+        else:
+            try:
+                with open(entry["spill_path"], "rb") as f:
+                    result = record_to_plan(decode_payload(f.read()))
+            except OSError:
+                return None
+        if result is None:
+            return None
+        return {**result, **entry["extras"]}
+
+    def _hold(self, entry_id: str, result: Dict[str, Any], size: int):
+        with self._lock:
+            if entry_id not in self._entries:
+                return
+            if entry_id not in self._memory:
+                self._memory_used += size
+            self._memory[entry_id] = result
+            self._memory.move_to_end(entry_id)
+            # Keep at least the newest result even if it alone exceeds the cap
+            while len(self._memory) > 1 and (len(self._memory) > self.memory_items
+                                             or self._memory_used > self.memory_bytes):
+                self._drop(next(iter(self._memory)))
+        self.budget.charge(self, entry_id, size)
+
+    def _drop(self, entry_id: str, from_budget: bool = False):
+        # Evict a result from memory; the entry stays and can be reloaded
+        with self._lock:
+            if self._memory.pop(entry_id, None) is not None:
+                self._memory_used -= self._entries[entry_id]["size"]
+        if not from_budget:
+            self.budget.release(id(self), entry_id)
+
+    def _forget(self, entry_id: str):
+        self._drop(entry_id)
+        entry = self._entries.pop(entry_id)
+        if entry["spill_path"]:
+            try:
+                os.remove(entry["spill_path"])
+            except OSError:
+                pass
+
+
+def _cleanup(budget: MemoryBudget, history_id: int, spill_dir: str):
+    budget.release(history_id)
+    if os.path.isdir(spill_dir):
+        for name in os.listdir(spill_dir):
+            try:
+                os.remove(os.path.join(spill_dir, name))
+            except OSError:
+                pass
+        try:
+            os.rmdir(spill_dir)
+        except OSError:
+            pass
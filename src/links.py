@@ -0,0 +1,230 @@
+"""
+Concurrent link validation for curated learning resources.
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from src.cache import TTLCache, link_cache
+from src.config import RunConfig, config
+from src.metrics import LINK_CHECK_SECONDS, LINK_CHECKS
+from src.models import LearningMaterial
+from src.resources import RESOURCE_CATEGORIES, canonical_url
+
+
+LINK_CHECK_MODES = ("off", "flag", "drop")
+
+# Servers that refuse HEAD usually answer one of these; retry those with GET
+RETRY_WITH_GET = frozenset({403, 405, 501})
+
+
+class LinkValidator:
+    """
+    Checks URLs concurrently with HEAD requests (falling back to GET), using a
+    pooled async client with global and per-host concurrency caps. The client
+    lives on the validator's own event loop thread and is reused by every
+    `check()`, so connections stay open across plans. Responses are cached per
+    canonical URL; network errors are not cached, so they are retried.
+    """
+    
+    def __init__(
+        self,
+        timeout: float = 3.0,
+        concurrency: int = 20,
+        per_host: int = 4,
+        cache: Optional[TTLCache] = None
+    ):
+        """
+        Args:
+            timeout: Per-request timeout in seconds
+            concurrency: Maximum requests in flight overall
+            per_host: Maximum requests in flight to any one host
+            cache: Optional cache of check results keyed by URL
+        """
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.cache = cache
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        # Created on the loop thread and only used there
+        self._client: Optional[httpx.AsyncClient] = None
+        self._overall: Optional[asyncio.Semaphore] = None
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+    
+    def check(self, urls: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Check every URL, serving known results from the cache.
+        
+        Returns:
+            Mapping of URL to {"ok", "status", "error"}
+        """
+        results, pending = {}, []
+        for url in dict.fromkeys(urls):
+            # Cached by canonical URL, so other spellings of a checked page are hits too
+            cached = self.cache.get(canonical_url(url)) if self.cache is not None else None
+            if cached is not None:
+                results[url] = cached
+            else:
+                pending.append(url)
+        
+        if pending:
+            checked = asyncio.run_coroutine_threadsafe(self._check_all(pending), self._start())
+            for url, status in checked.result().items():
+                results[url] = status
+                if self.cache is not None and status["status"] is not None:
+                    self.cache.set(canonical_url(url), status)
+        return results
+    
+    def close(self):
+        """Close the pooled client and stop the event loop thread."""
+        with self._loop_lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result()
+            self._client = None
+        loop.call_soon_threadsafe(loop.stop)
+    
+    def _start(self) -> asyncio.AbstractEventLoop:
+        # One event loop per validator, so its client's connections can be reused
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="link-check",
+                                 daemon=True).start()
+            return self._loop
+    
+    async def _check_all(self, urls) -> Dict[str, Dict[str, Any]]:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.concurrency,
+                                    max_keepalive_connections=self.concurrency),
+                follow_redirects=True,
+                headers={"User-Agent": "Mozilla/5.0 (compatible; EducationAssistant link check)"}
+            )
+            self._overall = asyncio.Semaphore(self.concurrency)
+        
+        async def check_one(url: str) -> Tuple[str, Dict[str, Any]]:
+            host = self._hosts.setdefault(urlsplit(url).netloc.lower(),
+                                          asyncio.Semaphore(self.per_host))
+            async with self._overall, host:
+                return url, await self._request(self._client, url)
+        
+        return dict(await asyncio.gather(*(check_one(url) for url in urls)))
+    
+    async def _request(self, client: httpx.AsyncClient, url: str) -> Dict[str, Any]:
+        if urlsplit(url).scheme not in ("http", "https"):
+            LINK_CHECKS.labels("error").inc()
+            return {"ok": False, "status": None, "error": "unsupported URL"}
+        
+        start = time.perf_counter()
+        try:
+            response = await client.head(url)
+            if response.status_code in RETRY_WITH_GET:
+                # Stream so only the headers are read
+                async with client.stream("GET", url) as response:
+                    pass
+            result = {"ok": response.status_code < 400, "status": response.status_code, "error": None}
+        except (httpx.HTTPError, httpx.InvalidURL) as e:
+            result = {"ok": False, "status": None, "error": type(e).__name__}
+        finally:
+            LINK_CHECK_SECONDS.observe(time.perf_counter() - start)
+        
+        LINK_CHECKS.labels("ok" if result["ok"] else "dead" if result["status"] else "error").inc()
+        return result
+
+
+def validate_materials(
+    materials: LearningMaterial,
+    validator: LinkValidator,
+    mode: str = "flag"
+) -> Tuple[LearningMaterial, Dict[str, Any]]:
+    """
+    Check every resource link in `materials`.
+    
+    Args:
+        materials: Curated learning materials
+        validator: Link validator to use
+        mode: "flag" keeps dead links and reports them; "drop" also removes them
+    
+    Returns:
+        Tuple of (materials, report); the report lists dead links under "dead"
+    """
+    start = time.perf_counter()
+    resources = [resource for category in RESOURCE_CATEGORIES for resource in getattr(materials, category)]
+    statuses = validator.check(resource.url for resource in resources)
+    
+    dead = [
+        {
+            "title": resource.title,
+            "url": resource.url,
+            "resource_type": resource.resource_type,
+            "status": statuses[resource.url]["status"],
+            "error": statuses[resource.url]["error"]
+        }
+        for resource in resources if not statuses[resource.url]["ok"]
+    ]
+    if mode == "drop" and dead:
+        materials = materials.model_copy(update={
+            category: [resource for resource in getattr(materials, category)
+                       if statuses[resource.url]["ok"]]
+            for category in RESOURCE_CATEGORIES
+        })
+    
+    return materials, {
+        "mode": mode,
+        "checked": len(statuses),
+        "dead": dead,
+        "seconds": round(time.perf_counter() - start, 3)
+    }
+
+
+_validators: Dict[Tuple[float, int, int, str], LinkValidator] = {}
+_validators_lock = threading.Lock()
+
+
+def link_check_mode(
+    run_config: Optional[RunConfig] = None,
+    llm_provider: Optional[str] = None
+) -> str:
+    """
+    The run's LINK_CHECK_MODE; unset, it is "flag", or "off" when the LLM or
+    search is fake, since their URLs are made up.
+    """
+    settings = run_config or config
+    mode = settings.link_check_mode or \
+        ("off" if "fake" in (llm_provider, settings.search_provider) else "flag")
+    if mode not in LINK_CHECK_MODES:
+        raise ValueError(f"LINK_CHECK_MODE must be one of: {', '.join(LINK_CHECK_MODES)}")
+    return mode
+
+
+def default_link_validator(
+    run_config: Optional[RunConfig] = None,
+    llm_provider: Optional[str] = None
+) -> Optional[LinkValidator]:
+    """
+    Process-wide validator configured from the run's settings, shared by every
+    crew with the same settings, or None if link checking is off.
+    """
+    if link_check_mode(run_config, llm_provider) == "off":
+        return None
+    cache_path = (run_config or config).cache_path
+    key = (config.link_check_timeout, config.link_check_concurrency,
+           config.link_check_per_host, cache_path)
+    with _validators_lock:
+        if key not in _validators:
+            _validators[key] = LinkValidator(
+                timeout=config.link_check_timeout,
+                concurrency=config.link_check_concurrency,
+                per_host=config.link_check_per_host,
+                cache=link_cache(run_config)
+            )
+        return _validators[key]
@@ -0,0 +1,246 @@
+"""
+LLM wrapper used by the agents so every model call passes through one place.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from crewai.llms.base_llm import BaseLLM
+from crewai.types.usage_metrics import UsageMetrics
+from pydantic import Field
+
+from src.cache import OfflineCacheMiss, llm_cache, wants_fresh_completions
+from src.cassette import active_cassette, llm_request_key, llm_route_key
+from src.config import RunConfig, config
+from src.metrics import LLM_CALLS, LLM_SECONDS
+from src.rate_limit import limiter_for
+from src.routing import AdaptiveRouter, Endpoint, log_decision, stage_of
+
+
+class TokenCount:
+    """Tokens used by the LLM calls made inside a `count_tokens` block (and its enclosing ones)."""
+
+    def __init__(self, parent: Optional["TokenCount"] = None):
+        self.total = 0
+        self.parent = parent
+        self._lock = threading.Lock()
+
+    def add(self, tokens: int):
+        with self._lock:
+            self.total += tokens
+        if self.parent is not None:
+            self.parent.add(tokens)
+
+
+_token_count: ContextVar[Optional[TokenCount]] = ContextVar("token_count", default=None)
+
+
+@contextmanager
+def count_tokens():
+    """
+    Count the tokens of the LLM calls made inside the block, in this thread or
+    in threads running a copy of its context. Pooled LLMs are shared by
+    concurrent runs, so their own cumulative counters cannot tell runs apart.
+    """
+    counter = TokenCount(_token_count.get())
+    token = _token_count.set(counter)
+    try:
+        yield counter
+    finally:
+        _token_count.reset(token)
+
+
+def attribute_usage(llm: BaseLLM) -> BaseLLM:
+    """Make `llm` also report each call's token usage to the active `count_tokens` block."""
+    track = getattr(llm, "_track_token_usage_internal", None)
+    if track is None:
+        return llm
+
+    def tracked(usage_data):
+        track(usage_data)
+        counter = _token_count.get()
+        usage = UsageMetrics.from_provider_dict(usage_data) if counter is not None else None
+        if usage is not None:
+            counter.add(usage.total_tokens)
+
+    # Usage is reported synchronously from inside the call, in the caller's context
+    object.__setattr__(llm, "_track_token_usage_internal", tracked)
+    return llm
+
+
+class LLMProxy(BaseLLM):
+    """
+    Delegates to a concrete CrewAI LLM while recording per-call metrics,
+    serving repeated prompts from the LLM cache and applying the provider's
+    rate limit to real calls. In offline mode only cached completions are served;
+    a cassette (see `src.cassette`) can record upstream calls or replay them.
+    With a router (see `src.routing`), each call goes to the provider and model
+    it picks, and a failed call is retried once on the next best endpoint.
+    """
+
+    llm_type: str = "proxy"
+    inner: Any = Field(..., exclude=True, description="The wrapped CrewAI LLM")
+    router: Any = Field(None, exclude=True,
+                        description="AdaptiveRouter choosing each call's endpoint")
+    llm_factory: Any = Field(None, exclude=True,
+                             description="Builds the LLM for an endpoint: (provider, model) -> LLM")
+    endpoint_llms: Dict[Any, Any] = Field(default_factory=dict, exclude=True)
+    endpoints_lock: Any = Field(default_factory=threading.Lock, exclude=True)
+    run_config: Any = Field(None, exclude=True,
+                            description="RunConfig whose rate limits apply to the calls")
+
+    @classmethod
+    def wrap(cls, inner: BaseLLM, provider: str, router: Optional[AdaptiveRouter] = None,
+             llm_factory: Any = None, run_config: Optional[RunConfig] = None) -> "LLMProxy":
+        """
+        Wrap `inner`, labelling its calls with `provider`.
+
+        Args:
+            inner: LLM of the primary endpoint
+            provider: Its provider
+            router: Optional router choosing an endpoint per call
+            llm_factory: Builds the LLMs of the router's other endpoints on first use
+            run_config: Settings of the run (default: the environment's)
+        """
+        proxy = cls(
+            model=inner.model,
+            temperature=getattr(inner, "temperature", None),
+            provider=provider,
+            inner=inner,
+            router=router,
+            llm_factory=llm_factory,
+            run_config=run_config or config.run_config()
+        )
+        if router is not None:
+            proxy.endpoint_llms[router.primary] = inner
+        return proxy
+
+    def _llm_for(self, endpoint: Endpoint):
+        with self.endpoints_lock:
+            llm = self.endpoint_llms.get(endpoint)
+            if llm is None:
+                llm = self.endpoint_llms[endpoint] = self.llm_factory(endpoint.provider,
+                                                                      endpoint.model)
+            return llm
+
+    def _upstream(self, llm, provider: str, model: str, messages, **kwargs):
+        # One rate-limited, metered call to a concrete LLM
+        llm.stop = self.stop
+        limiter_for(provider, self.run_config).acquire()
+        start = time.perf_counter()
+        outcome = "success"
+        try:
+            return llm.call(messages, **kwargs)
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            LLM_CALLS.labels(provider, model, outcome).inc()
+            LLM_SECONDS.labels(provider).observe(time.perf_counter() - start)
+
+    def _routed(self, messages, stage: str, **kwargs):
+        # Route the call, retrying once on the next best endpoint if it fails
+        tried = []
+        while True:
+            endpoint, reason = self.router.choose(stage, exclude=tried)
+            if tried:
+                reason = "retry"
+            start = time.perf_counter()
+            try:
+                response = self._upstream(self._llm_for(endpoint), endpoint.provider,
+                                          endpoint.model, messages, **kwargs)
+            except Exception as e:
+                seconds = time.perf_counter() - start
+                self.router.record(endpoint, stage, seconds, e)
+                log_decision(stage, endpoint, reason, seconds, "error")
+                tried.append(endpoint)
+                if len(tried) > 1 or len(tried) == len(self.router.endpoints):
+                    raise
+                continue
+            seconds = time.perf_counter() - start
+            self.router.record(endpoint, stage, seconds)
+            log_decision(stage, endpoint, reason, seconds, "success")
+            return response
+
+    def call(
+        self,
+        messages,
+        tools=None,
+        callbacks=None,
+        available_functions=None,
+        from_task=None,
+        from_agent=None,
+        response_model=None
+    ):
+        """Forward the call to the wrapped LLM, or the endpoint the router picks."""
+        cache = llm_cache(self.run_config)
+        key = None
+        if cache is not None:
+            key = llm_request_key(self.model, messages, self.stop, response_model)
+            # Callers asking for fresh output skip the read but still refresh the entry
+            cached = None if wants_fresh_completions() else cache.get(key)
+            if cached is not None:
+                return cached
+
+        # A replayed cassette stands in for the provider; a recording one captures it
+        cassette = active_cassette()
+        replaying = cassette is not None and cassette.replaying
+        recording = cassette is not None and cassette.recording
+        if cassette is not None:
+            request_key = key or llm_request_key(self.model, messages, self.stop, response_model)
+            route = llm_route_key(self.model, messages)
+        if config.offline and not replaying:
+            raise OfflineCacheMiss(f"Offline: no cached completion for this {self.model} prompt")
+
+        kwargs = dict(tools=tools, callbacks=callbacks, available_functions=available_functions,
+                      from_task=from_task, from_agent=from_agent, response_model=response_model)
+        start = time.perf_counter()
+        try:
+            if replaying:
+                response = cassette.replay("llm", request_key, route=route,
+                                           response_model=response_model)
+            elif self.router is not None:
+                response = self._routed(messages, stage_of(from_task, response_model), **kwargs)
+            else:
+                response = self._upstream(self.inner, self.provider, self.model, messages, **kwargs)
+        except Exception as e:
+            if recording:
+                cassette.record("llm", request_key, time.perf_counter() - start,
+                                route=route, error=e)
+            raise
+
+        if recording:
+            cassette.record("llm", request_key, time.perf_counter() - start,
+                            route=route, response=response)
+
+        # Only plain-text completions are cached; tool calls and objects are not
+        if key is not None and isinstance(response, str) and response:
+            cache.set(key, response)
+        return response
+
+    def supports_function_calling(self) -> bool:
+        supports = getattr(self.inner, "supports_function_calling", None)
+        return bool(supports and supports())
+
+    def supports_stop_words(self) -> bool:
+        return self.inner.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self.inner.get_context_window_size()
+
+    def get_token_usage_summary(self):
+        llms = list({id(llm): llm for llm in [self.inner, *self.endpoint_llms.values()]}.values())
+        if len(llms) == 1:
+            return self.inner.get_token_usage_summary()
+        # Usage of every endpoint the router has called, field by field
+        summaries = [llm.get_token_usage_summary() for llm in llms]
+        totals = {field: sum(getattr(summary, field, 0) or 0 for summary in summaries)
+                  for field in type(summaries[0]).model_fields}
+        return type(summaries[0])(**totals)
+
+    def total_tokens(self) -> int:
+        """Cumulative tokens consumed by the wrapped LLM."""
+        summary = self.get_token_usage_summary()
+        return getattr(summary, "total_tokens", 0) or 0
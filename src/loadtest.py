@@ -0,0 +1,228 @@
+"""
+Load generator for the crew entry point: simulated learners arrive at a
+configurable rate, each running `create_education_crew(...).run` on its own
+thread the way a Streamlit session does, against the local fake LLM and search.
+"""
+import contextlib
+import os
+import random
+import resource
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from src.config import RunConfig
+from src.crew import create_education_crew
+from src.plan_store import PlanStore
+from src.resources import ResourceIndex
+from src.similarity import TopicIndex
+
+
+DEFAULT_TOPICS = [
+    "Python Programming", "Machine Learning", "Graph Theory", "Web Development",
+    "Data Structures", "Linear Algebra", "SQL Databases", "Docker Containers",
+]
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MiB."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        # No procfs: fall back to the peak RSS (KiB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if peak > 2**32 else peak / 2**10
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class _Sampler:
+    """Background thread tracking peak thread count and RSS while a step runs."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_threads = threading.active_count()
+        self.peak_rss_mb = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="loadtest-sampler", daemon=True)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            self.peak_rss_mb = max(self.peak_rss_mb, rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_load_step(
+    rate: float,
+    duration: float,
+    topics: List[str],
+    levels: List[str],
+    plan_store: Optional[PlanStore] = None,
+    topic_index: Optional[TopicIndex] = None,
+    resource_index: Optional[ResourceIndex] = None,
+    run_config: Optional[RunConfig] = None,
+    max_concurrency: int = 0,
+    use_cache: bool = True,
+    seed: int = 0,
+    timeout: float = 300.0
+) -> Dict[str, Any]:
+    """
+    Offer Poisson arrivals at `rate` per second for `duration` seconds and
+    wait for every request to finish.
+
+    Args:
+        rate: Mean arrivals per second
+        duration: Seconds during which new requests arrive
+        topics: Topic mix; each request picks one uniformly (repeat a topic to weight it)
+        levels: Expertise level mix, picked the same way
+        plan_store: Store shared by all requests, as in the app
+        topic_index: Similarity index shared by all requests
+        resource_index: Resource index shared by all requests
+        run_config: Settings of every request (e.g. the fake LLM and search latency)
+        max_concurrency: Cap on requests in flight (0 = a thread per request, like Streamlit)
+        use_cache: Let requests be served from similar stored plans
+        seed: Seed for arrival times and the topic/level picks
+        timeout: Seconds to wait for stragglers after the last arrival
+
+    Returns:
+        Offered and achieved rates, latency percentiles, error count, RSS growth
+        and peak thread count for the step
+    """
+    rng = random.Random(seed)
+    gate = threading.BoundedSemaphore(max_concurrency) if max_concurrency > 0 else None
+    lock = threading.Lock()
+    latencies: List[float] = []
+    errors: List[str] = []
+    threads: List[threading.Thread] = []
+
+    def learner(topic: str, level: str, arrived: float):
+        try:
+            if gate is not None:
+                gate.acquire()
+            try:
+                crew = create_education_crew("fake", plan_store, topic_index,
+                                             resource_index=resource_index,
+                                             run_config=run_config)
+                result = crew.run(topic, level, use_cache=use_cache)
+            finally:
+                if gate is not None:
+                    gate.release()
+            ok = result["success"]
+            error = None if ok else result.get("error", "unknown error")
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        with lock:
+            if error is None:
+                latencies.append(time.monotonic() - arrived)
+            else:
+                errors.append(error)
+
+    rss_before = rss_mb()
+    # Crew runs print their progress; keep it out of the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), \
+            _Sampler() as sampler:
+        started = time.monotonic()
+        next_arrival = rng.expovariate(rate) if rate > 0 else duration
+        while next_arrival < duration:
+            delay = started + next_arrival - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            thread = threading.Thread(
+                target=learner,
+                args=(rng.choice(topics), rng.choice(levels), time.monotonic()),
+                name=f"learner-{len(threads)}",
+                daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+            next_arrival += rng.expovariate(rate)
+        deadline = time.monotonic() + timeout
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        elapsed = time.monotonic() - started
+
+    unfinished = sum(thread.is_alive() for thread in threads)
+    completed = len(latencies)
+    return {
+        "rate": rate,
+        "arrivals": len(threads),
+        "completed": completed,
+        "errors": len(errors),
+        "unfinished": unfinished,
+        "error_samples": errors[:3],
+        "offered_per_second": len(threads) / duration if duration else 0.0,
+        "throughput_per_second": completed / elapsed if elapsed else 0.0,
+        "elapsed_seconds": elapsed,
+        "latency_seconds": {
+            "p50": _percentile(latencies, 0.5),
+            "p90": _percentile(latencies, 0.9),
+            "p99": _percentile(latencies, 0.99),
+            "max": max(latencies, default=0.0),
+        },
+        "rss_mb": {"before": rss_before, "after": rss_mb(), "peak": sampler.peak_rss_mb},
+        "peak_threads": sampler.peak_threads,
+    }
+
+
+def find_saturation(
+    rates: List[float],
+    duration: float,
+    topics: List[str],
+    levels: List[str],
+    latency_slo: Optional[float] = None,
+    report: Callable[[Dict[str, Any]], None] = lambda step: None,
+    **step_kwargs: Any
+) -> Dict[str, Any]:
+    """
+    Run load steps at increasing rates until the process saturates.
+
+    A step is saturated when it has errors or unfinished requests, its p90
+    latency exceeds the SLO (default: three times the p50 of the first step),
+    or the backlog left when arrivals stop takes longer than the SLO to drain.
+
+    Args:
+        rates: Arrival rates to try, per second, in increasing order
+        duration: Seconds of arrivals per step
+        topics: Topic mix
+        levels: Expertise level mix
+        latency_slo: p90 latency bound in seconds
+        report: Callback receiving each finished step
+        **step_kwargs: Passed to `run_load_step` (stores, max_concurrency, ...)
+
+    Returns:
+        The steps run and `saturation_rate`, the highest rate that was not
+        saturated (None if even the first one was)
+    """
+    steps, saturation_rate = [], None
+    for i, rate in enumerate(sorted(rates)):
+        step = run_load_step(rate, duration, topics, levels, seed=i, **step_kwargs)
+        if latency_slo is None and step["completed"]:
+            latency_slo = 3 * step["latency_seconds"]["p50"]
+        step["saturated"] = (
+            step["errors"] > 0
+            or step["unfinished"] > 0
+            or (latency_slo is not None and (
+                step["latency_seconds"]["p90"] > latency_slo
+                or step["elapsed_seconds"] - duration > latency_slo
+            ))
+        )
+        steps.append(step)
+        report(step)
+        if step["saturated"]:
+            break
+        saturation_rate = rate
+    return {"steps": steps, "saturation_rate": saturation_rate, "latency_slo": latency_slo}
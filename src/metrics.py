@@ -0,0 +1,414 @@
+"""
+Lightweight in-process metrics registry with Prometheus text exposition.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# Latency buckets (seconds) sized for LLM/search calls and full crew runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape_label(value: str) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Render a label set as `{a="x",b="y"}`."""
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value, keeping integers free of a trailing `.0`."""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class for labelled metrics."""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._default = self._new_child()
+            self._children[()] = self._default
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Return the child metric for the given label values."""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(
+                    f"{self.name} expects labels {self.labelnames}, got {values}"
+                )
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """Return (suffix, labels, value) tuples for exposition."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Render this metric in the Prometheus text format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    metric_type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def samples(self):
+        return [
+            ("_total", _format_labels(self.labelnames, key), child.value)
+            for key, child in list(self._children.items())
+        ]
+
+
+class _GaugeChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    @contextmanager
+    def track_inprogress(self):
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    metric_type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default.dec(amount)
+
+    def track_inprogress(self):
+        return self._default.track_inprogress()
+
+    def samples(self):
+        return [
+            ("", _format_labels(self.labelnames, key), child.value)
+            for key, child in list(self._children.items())
+        ]
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if index < len(self.counts):
+                self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values."""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def samples(self):
+        samples = []
+        for key, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, child.counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                samples.append(("_bucket", _format_labels(self.labelnames, key, le), cumulative))
+            samples.append(("_bucket", _format_labels(self.labelnames, key, 'le="+Inf"'), child.count))
+            samples.append(("_sum", _format_labels(self.labelnames, key), child.sum))
+            samples.append(("_count", _format_labels(self.labelnames, key), child.count))
+        return samples
+
+
+class MetricsRegistry:
+    """Registry holding all metrics exposed by the application."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Create (or return the existing) counter called `name`."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Create (or return the existing) gauge called `name`."""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Create (or return the existing) histogram called `name`."""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        """Look up a registered metric by name."""
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render every registered metric in the Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+    def start_http_server(self, port: int, addr: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serve `/metrics` on a background thread.
+
+        Calling this again while a server is running returns the existing
+        server, so Streamlit reruns do not try to bind the port twice.
+        """
+        if self._server is not None:
+            return self._server
+
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((addr, port), MetricsHandler)
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+        thread.start()
+        self._server = server
+        return server
+
+    def stop_http_server(self):
+        """Shut down the background metrics server, if running."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
+
+STAGE_SECONDS = metrics.histogram(
+    "education_stage_duration_seconds",
+    "Wall time spent in each stage of a crew run",
+    ["stage"],
+)
+RUNS = metrics.counter(
+    "education_runs",
+    "Completed crew runs by outcome",
+    ["outcome"],
+)
+IN_FLIGHT = metrics.gauge(
+    "education_runs_in_flight",
+    "Crew runs currently executing",
+)
+FALLBACKS = metrics.counter(
+    "education_fallbacks",
+    "Provider fallback activations",
+    ["from_provider", "to_provider"],
+)
+LLM_CALLS = metrics.counter(
+    "education_llm_calls",
+    "LLM calls by provider, model and outcome",
+    ["provider", "model", "outcome"],
+)
+LLM_SECONDS = metrics.histogram(
+    "education_llm_call_duration_seconds",
+    "LLM call latency by provider",
+    ["provider"],
+)
+ROUTED_CALLS = metrics.counter(
+    "education_routed_llm_calls",
+    "Routed LLM calls by plan stage, chosen provider and reason",
+    ["stage", "provider", "reason"],
+)
+SEARCH_CALLS = metrics.counter(
+    "education_search_calls",
+    "Web search calls by provider and outcome",
+    ["provider", "outcome"],
+)
+SEARCH_SECONDS = metrics.histogram(
+    "education_search_call_duration_seconds",
+    "Web search call latency by provider",
+    ["provider"],
+)
+LINK_CHECKS = metrics.counter(
+    "education_link_checks",
+    "Resource link checks by outcome (ok, dead or error)",
+    ["outcome"],
+)
+LINK_CHECK_SECONDS = metrics.histogram(
+    "education_link_check_duration_seconds",
+    "Latency of a single resource link check",
+)
+CACHE_REQUESTS = metrics.counter(
+    "education_cache_requests",
+    "Cache lookups by cache name and result (hit or miss)",
+    ["cache", "result"],
+)
+TOKENS = metrics.counter(
+    "education_llm_tokens",
+    "LLM tokens consumed by provider",
+    ["provider"],
+)
+TOKENS_PER_RUN = metrics.histogram(
+    "education_tokens_per_run",
+    "Total LLM tokens consumed by a single crew run",
+    buckets=(500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000),
+)
+
+API_REQUESTS = metrics.counter(
+    "education_api_requests",
+    "HTTP API requests by route and status code",
+    ["route", "status"],
+)
+API_JOBS = metrics.counter(
+    "education_api_jobs",
+    "HTTP API plan jobs by outcome (accepted, coalesced, rejected, succeeded or failed)",
+    ["outcome"],
+)
+API_QUEUE_DEPTH = metrics.gauge(
+    "education_api_queue_depth",
+    "HTTP API plan jobs waiting for a worker",
+)
+API_QUEUE_SECONDS = metrics.histogram(
+    "education_api_queue_wait_seconds",
+    "Time HTTP API plan jobs wait for a worker",
+)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    """Record a cache lookup result for hit-ratio reporting."""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def cache_hit_ratio(cache: str) -> Optional[float]:
+    """Return the hit ratio observed so far for `cache`, or None if unused."""
+    hits = CACHE_REQUESTS.labels(cache, "hit").value
+    misses = CACHE_REQUESTS.labels(cache, "miss").value
+    total = hits + misses
+    return hits / total if total else None
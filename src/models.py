@@ -46,6 +46,11 @@ class Quiz(BaseModel):
     estimated_time_minutes: int = Field(..., description="Estimated time to complete in minutes")
 
 
+class QuizExtension(BaseModel):
+    """Additional questions generated for an existing quiz."""
+    questions: List[QuizQuestion] = Field(..., description="List of new quiz questions")
+
+
 class Deliverable(BaseModel):
     """Individual project deliverable."""
     name: str = Field(..., description="Deliverable name")
@@ -0,0 +1,268 @@
+"""
+Offline plan assembly: build a plan from stored plans, the resource index and
+cached search results, synthesizing the quiz and projects from templates
+when no stored ones fit. Nothing here touches the network.
+"""
+from typing import Any, Dict, List, Optional
+
+from src.cache import make_key, search_cache
+from src.config import RunConfig
+from src.models import (
+    Deliverable,
+    LearningMaterial,
+    ProjectIdea,
+    ProjectSuggestions,
+    Quiz,
+    QuizOption,
+    QuizQuestion,
+    Resource,
+)
+from src.plan_store import PlanStore
+from src.resources import RESOURCE_CATEGORIES, ResourceIndex, canonical_url
+from src.similarity import TopicIndex
+from src.tools import search_queries_for
+
+
+# Search-result category for each materials list
+SEARCH_CATEGORIES = {"videos": "video", "articles": "article", "exercises": "exercise"}
+
+PROJECT_DURATIONS = {"beginner": "1-3 days", "intermediate": "3-7 days", "advanced": "1-2 weeks"}
+
+RESOURCE_KINDS = {
+    "videos": "A video tutorial",
+    "articles": "An article or guide",
+    "exercises": "A practice exercise",
+}
+KIND_DISTRACTOR = "A glossary of terms"
+
+
+def _resources(materials: LearningMaterial) -> List[tuple]:
+    return [(category, resource) for category in RESOURCE_CATEGORIES
+            for resource in getattr(materials, category)]
+
+
+def _summary(topic: str, materials: Dict[str, List[Resource]]) -> str:
+    counts = ", ".join(f"{len(materials[c])} {c}" for c in RESOURCE_CATEGORIES if materials[c])
+    return (f"Previously curated resources for {topic} ({counts}). Start with the videos for an "
+            f"overview, read the articles for depth, then practise with the exercises.")
+
+
+def materials_from_search_cache(
+    topic: str,
+    expertise_level: str,
+    resources_per_category: int,
+    n_results: int = 10,
+    run_config: Optional[RunConfig] = None
+) -> Optional[LearningMaterial]:
+    """Build materials from cached results of the shared per-category searches, if any."""
+    cache = search_cache(run_config)
+    if cache is None:
+        return None
+    found = {}
+    for category, search_category in SEARCH_CATEGORIES.items():
+        query = search_queries_for(topic)[search_category]
+        results = cache.get(make_key("serper", query, "search", n_results)) or {}
+        found[category] = [
+            Resource(title=item.get("title", item["link"]), url=item["link"],
+                     description=item.get("snippet", ""), resource_type=search_category)
+            for item in results.get("organic", []) if item.get("link")
+        ][:resources_per_category]
+    if not any(found.values()):
+        return None
+    return LearningMaterial(topic=topic, expertise_level=expertise_level,
+                            summary=_summary(topic, found), **found)
+
+
+def materials_from_index(
+    index: ResourceIndex,
+    topic: str,
+    expertise_level: str,
+    resources_per_category: int
+) -> Optional[LearningMaterial]:
+    """Build materials from previously curated resources in the index, if any."""
+    found = index.candidates(topic, expertise_level, limit=resources_per_category,
+                             require_validated=False)
+    if not any(found.values()):
+        return None
+    return LearningMaterial(topic=topic, expertise_level=expertise_level,
+                            summary=_summary(topic, found), **found)
+
+
+def _question(text: str, correct: str, distractors: List[str], position: int,
+              explanation: str, difficulty: str) -> QuizQuestion:
+    options = distractors[:3]
+    options.insert(position % (len(options) + 1), correct)
+    letters = "ABCD"[:len(options)]
+    return QuizQuestion(
+        question=text,
+        options=[QuizOption(option=letter, text=option) for letter, option in zip(letters, options)],
+        correct_answer=letters[options.index(correct)],
+        explanation=explanation,
+        difficulty=difficulty
+    )
+
+
+def template_questions(materials: LearningMaterial, num_questions: int,
+                       exclude: Optional[List[str]] = None) -> List[QuizQuestion]:
+    """
+    Build up to `num_questions` multiple-choice questions from the materials:
+    which resource matches a description, and what kind of resource a title is.
+    """
+    resources = _resources(materials)
+    titles = [resource.title for _, resource in resources]
+    seen = set(exclude or ())
+    questions = []
+    for i in range(2 * len(resources)):
+        if len(questions) >= num_questions:
+            break
+        category, resource = resources[i % len(resources)]
+        if i < len(resources) and len(set(titles)) >= 2 and resource.description:
+            others = [title for title in dict.fromkeys(titles) if title != resource.title]
+            question = _question(
+                f'Which resource covers the following: "{resource.description}"?',
+                resource.title,
+                others[i % len(others):] + others[:i % len(others)],
+                i,
+                f'"{resource.title}" is described as: {resource.description}',
+                "easy"
+            )
+        else:
+            kinds = list(RESOURCE_KINDS.values()) + [KIND_DISTRACTOR]
+            correct = RESOURCE_KINDS[category]
+            question = _question(
+                f'In this learning path, what kind of resource is "{resource.title}"?',
+                correct,
+                [kind for kind in kinds if kind != correct],
+                i,
+                f'"{resource.title}" is listed among the {category} ({canonical_url(resource.url)}).',
+                "easy"
+            )
+        if question.question not in seen:
+            seen.add(question.question)
+            questions.append(question)
+    return questions
+
+
+def template_projects(materials: LearningMaterial, num_projects: int) -> List[ProjectIdea]:
+    """Build project ideas around the exercises (or other resources) in the materials."""
+    level = materials.expertise_level.lower()
+    anchors = materials.exercises + materials.articles + materials.videos
+    concepts = [resource.title for _, resource in _resources(materials)][:5]
+    projects = []
+    for i, resource in enumerate(anchors[:num_projects], 1):
+        projects.append(ProjectIdea(
+            title=f"{materials.topic} Project {i}: {resource.title}",
+            description=f"Work through \"{resource.title}\" and build a small {level} project "
+                        f"that applies what it covers. {resource.description}".strip(),
+            expertise_level=level,
+            estimated_duration=PROJECT_DURATIONS.get(level, "3-7 days"),
+            key_concepts=concepts[:3] or [materials.topic],
+            deliverables=[
+                Deliverable(name="Working implementation",
+                            description=f"Code or artefact applying {resource.title}"),
+                Deliverable(name="Write-up",
+                            description="A short explanation of the approach and what was learned"),
+                Deliverable(name="Reference notes",
+                            description=f"Notes linking the work back to {resource.url}"),
+            ],
+            learning_outcomes=[
+                f"Apply the material from {resource.title}",
+                f"Explain core {materials.topic} ideas in your own words",
+                "Document and present a finished piece of work",
+            ]
+        ))
+    return projects
+
+
+def build_offline_plan(
+    topic: str,
+    expertise_level: str,
+    resources_per_category: int,
+    num_questions: int,
+    num_projects: int,
+    plan_store: Optional[PlanStore] = None,
+    topic_index: Optional[TopicIndex] = None,
+    resource_index: Optional[ResourceIndex] = None,
+    run_config: Optional[RunConfig] = None
+) -> Dict[str, Any]:
+    """
+    Assemble a plan from local data only.
+
+    Learning materials come from the closest stored plan (any age), else the
+    resource index, else cached search results. Quiz questions and projects
+    come from the stored plan where it has them and are synthesized from
+    templates over the materials otherwise.
+
+    Returns:
+        A run result whose "provenance" maps each part to where it came from
+        (stored_plan, resource_index, search_cache, template, or
+        "stored_plan+template" for a stored part topped up from templates)
+    """
+    provenance = {}
+    stored = None
+    if plan_store is not None and topic_index is not None:
+        match = topic_index.lookup(topic, expertise_level)
+        stored = plan_store.get(match.plan_id) if match else None
+
+    materials = None
+    if stored is not None:
+        stored_materials = stored["learning_materials"]
+        materials = stored_materials.model_copy(update={
+            category: getattr(stored_materials, category)[:resources_per_category]
+            for category in RESOURCE_CATEGORIES
+        })
+        provenance["learning_materials"] = "stored_plan"
+    if materials is None and resource_index is not None:
+        materials = materials_from_index(resource_index, topic, expertise_level,
+                                         resources_per_category)
+        provenance["learning_materials"] = "resource_index"
+    if materials is None:
+        materials = materials_from_search_cache(topic, expertise_level, resources_per_category,
+                                                run_config=run_config)
+        provenance["learning_materials"] = "search_cache"
+    if materials is None or not _resources(materials):
+        return {
+            "success": False,
+            "error": f"Offline: no stored plan, indexed resources or cached searches for '{topic}'",
+            "topic": topic,
+            "expertise_level": expertise_level
+        }
+
+    questions = list(stored["quiz"].questions[:num_questions]) if stored else []
+    if len(questions) < num_questions:
+        questions += template_questions(materials, num_questions - len(questions),
+                                        exclude=[q.question for q in questions])
+    stored_questions = min(len(stored["quiz"].questions), num_questions) if stored else 0
+    provenance["quiz"] = _source(stored_questions, len(questions))
+    per_question = 2.0
+    if stored and stored["quiz"].questions:
+        per_question = stored["quiz"].estimated_time_minutes / len(stored["quiz"].questions)
+
+    projects = list(stored["projects"].projects[:num_projects]) if stored else []
+    if len(projects) < num_projects:
+        projects += template_projects(materials, num_projects - len(projects))
+    stored_projects = min(len(stored["projects"].projects), num_projects) if stored else 0
+    provenance["projects"] = _source(stored_projects, len(projects))
+
+    result = {
+        "success": True,
+        "topic": topic,
+        "expertise_level": expertise_level,
+        "provider": "offline",
+        "learning_materials": materials,
+        "quiz": Quiz(topic=topic, total_questions=len(questions), questions=questions,
+                     estimated_time_minutes=max(1, round(per_question * len(questions)))),
+        "projects": ProjectSuggestions(topic=topic, projects=projects,
+                                       total_projects=len(projects)),
+        "offline": True,
+        "provenance": provenance
+    }
+    if stored is not None:
+        result["source_plan_id"] = stored["plan_id"]
+    return result
+
+
+def _source(from_store: int, total: int) -> str:
+    if from_store and from_store < total:
+        return "stored_plan+template"
+    return "stored_plan" if from_store else "template"
@@ -0,0 +1,311 @@
+"""
+SQLite-backed persistent store for generated learning plans.
+"""
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.compression import DEFAULT_DICT_SIZE, PayloadCodec, recompress_rows, sample_rows
+from src.config import config
+from src.models import LearningMaterial, ProjectSuggestions, Quiz
+from src.serialization import dumps, loads
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    plan_id TEXT PRIMARY KEY,
+    topic TEXT NOT NULL,
+    topic_norm TEXT NOT NULL,
+    expertise_level TEXT NOT NULL,
+    provider TEXT,
+    created_at REAL NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_plans_topic_level_time
+    ON plans (topic_norm, expertise_level, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_plans_level_time ON plans (expertise_level, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_plans_provider_time ON plans (provider, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_plans_time ON plans (created_at DESC);
+"""
+
+SUMMARY_COLUMNS = "plan_id, topic, expertise_level, provider, created_at"
+
+
+def normalize_topic(topic: str) -> str:
+    """Lower-case a topic and collapse punctuation/whitespace to single spaces."""
+    return " ".join(re.sub(r"[^a-z0-9+#]+", " ", topic.lower()).split())
+
+
+def plan_to_record(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a successful crew result into a JSON-serializable record."""
+    return {
+        "plan_id": result.get("plan_id") or uuid.uuid4().hex,
+        "created_at": result.get("created_at") or time.time(),
+        "topic": result["topic"],
+        "expertise_level": result["expertise_level"],
+        "provider": result.get("provider"),
+        "timestamp": result.get("timestamp") or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "learning_materials": result["learning_materials"].model_dump(),
+        "quiz": result["quiz"].model_dump(),
+        "projects": result["projects"].model_dump()
+    }
+
+
+def record_from_export(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a record from a JSON export (`save_to_file`, the app) or an NDJSON export line."""
+    created_at = data.get("created_at") or time.time()
+    if not data.get("created_at") and data.get("timestamp"):
+        try:
+            created_at = datetime.strptime(data["timestamp"], "%Y-%m-%d %H:%M:%S").timestamp()
+        except ValueError:
+            pass
+    return {
+        "plan_id": data.get("plan_id") or uuid.uuid4().hex,
+        "created_at": created_at,
+        "topic": data["topic"],
+        "expertise_level": data["expertise_level"],
+        "provider": data.get("provider"),
+        "timestamp": data.get("timestamp"),
+        "learning_materials": data["learning_materials"],
+        "quiz": data["quiz"],
+        "projects": data["projects"]
+    }
+
+
+def record_to_plan(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Rehydrate a stored record into the result shape returned by `EducationCrew.run`."""
+    return {
+        "success": True,
+        "plan_id": record["plan_id"],
+        "topic": record["topic"],
+        "expertise_level": record["expertise_level"],
+        "provider": record.get("provider"),
+        "timestamp": record.get("timestamp"),
+        "created_at": record.get("created_at"),
+        "learning_materials": LearningMaterial.model_validate(record["learning_materials"]),
+        "quiz": Quiz.model_validate(record["quiz"]),
+        "projects": ProjectSuggestions.model_validate(record["projects"])
+    }
+
+
+# Codec for payloads kept outside a store (no dictionaries); still reads legacy zlib
+_plain_codec = PayloadCodec()
+
+
+def encode_payload(record: Dict[str, Any], codec: Optional[PayloadCodec] = None) -> bytes:
+    """Serialize and compress a record for storage (with `codec`'s dictionary, if any)."""
+    return (codec or _plain_codec).compress(dumps(record))
+
+
+def decode_payload(payload: bytes, codec: Optional[PayloadCodec] = None) -> Dict[str, Any]:
+    """Decompress and deserialize a stored record, whichever codec and dictionary wrote it."""
+    return loads((codec or _plain_codec).decompress(payload))
+
+
+class PlanStore:
+    """
+    Persistent plan store with indexed lookups by normalized topic, level,
+    provider and creation time. Payloads are stored compressed, with a
+    dictionary trained on earlier plans once `train_dictionary` has been run.
+    """
+
+    def __init__(self, path: str = "plans.db"):
+        """
+        Open (or create) the store.
+
+        Args:
+            path: SQLite database file, or ":memory:" for a throwaway store
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self.codec = PayloadCodec(self._conn, "plans", self._lock)
+
+    def _row(self, record: Dict[str, Any]) -> Tuple:
+        return (
+            record["plan_id"],
+            record["topic"],
+            normalize_topic(record["topic"]),
+            record["expertise_level"].lower(),
+            record.get("provider"),
+            record["created_at"],
+            encode_payload(record, self.codec)
+        )
+
+    def add(self, result: Dict[str, Any]) -> str:
+        """Store a crew result and return its plan id."""
+        return self.add_many([result])[0]
+
+    def add_many(self, results: Iterable[Dict[str, Any]]) -> List[str]:
+        """Store many crew results in a single transaction."""
+        return self.add_records(plan_to_record(result) for result in results)
+
+    def add_records(self, records: Iterable[Dict[str, Any]]) -> List[str]:
+        """Bulk-insert already serialized records (see `plan_to_record`)."""
+        rows = [self._row(record) for record in records]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO plans "
+                "(plan_id, topic, topic_norm, expertise_level, provider, created_at, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return [row[0] for row in rows]
+
+    def get_record(self, plan_id: str) -> Optional[Dict[str, Any]]:
+        """Return the raw stored record for `plan_id`, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM plans WHERE plan_id = ?", (plan_id,)
+            ).fetchone()
+        return decode_payload(row["payload"], self.codec) if row else None
+
+    def get(self, plan_id: str) -> Optional[Dict[str, Any]]:
+        """Return the plan for `plan_id` as a crew result dict, or None."""
+        record = self.get_record(plan_id)
+        return record_to_plan(record) if record else None
+
+    def _where(self, topic, expertise_level, provider, since, until) -> Tuple[str, List]:
+        clauses, params = [], []
+        if topic:
+            clauses.append("topic_norm = ?")
+            params.append(normalize_topic(topic))
+        if expertise_level:
+            clauses.append("expertise_level = ?")
+            params.append(expertise_level.lower())
+        if provider:
+            clauses.append("provider = ?")
+            params.append(provider)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(
+        self,
+        topic: Optional[str] = None,
+        expertise_level: Optional[str] = None,
+        provider: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+        cursor: Optional[Tuple[float, str]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[Tuple[float, str]]]:
+        """
+        List plan summaries, newest first, one page at a time.
+
+        Args:
+            topic: Match plans whose normalized topic equals this one
+            expertise_level: Filter by expertise level
+            provider: Filter by LLM provider
+            since: Only plans created at or after this epoch time
+            until: Only plans created before this epoch time
+            limit: Page size
+            cursor: `next_cursor` from the previous page (keyset pagination)
+
+        Returns:
+            Tuple of (summaries, next_cursor); next_cursor is None on the last page
+        """
+        where, params = self._where(topic, expertise_level, provider, since, until)
+        if cursor is not None:
+            where += (" AND " if where else " WHERE ") + "(created_at, plan_id) < (?, ?)"
+            params.extend(cursor)
+        sql = (f"SELECT {SUMMARY_COLUMNS} FROM plans{where} "
+               "ORDER BY created_at DESC, plan_id DESC LIMIT ?")
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit]).fetchall()
+        items = [dict(row) for row in rows]
+        next_cursor = None
+        if len(items) == limit:
+            next_cursor = (items[-1]["created_at"], items[-1]["plan_id"])
+        return items, next_cursor
+
+    def latest(self, topic: str, expertise_level: str,
+               max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Return the newest stored plan for a topic/level, optionally no older than `max_age` seconds."""
+        since = time.time() - max_age if max_age is not None else None
+        items, _ = self.query(topic=topic, expertise_level=expertise_level, since=since, limit=1)
+        return self.get(items[0]["plan_id"]) if items else None
+
+    def count(self, **filters) -> int:
+        """Count plans matching the same filters as `query`."""
+        where, params = self._where(
+            filters.get("topic"), filters.get("expertise_level"), filters.get("provider"),
+            filters.get("since"), filters.get("until")
+        )
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM plans{where}", params).fetchone()[0]
+
+    def iter_records(self, batch_size: int = 500, **filters) -> Iterator[Dict[str, Any]]:
+        """Yield full stored records matching `filters`, newest first, in batches."""
+        cursor = None
+        while True:
+            items, cursor = self.query(limit=batch_size, cursor=cursor, **filters)
+            ids = [item["plan_id"] for item in items]
+            if ids:
+                placeholders = ",".join("?" * len(ids))
+                with self._lock:
+                    rows = self._conn.execute(
+                        f"SELECT plan_id, payload FROM plans WHERE plan_id IN ({placeholders})", ids
+                    ).fetchall()
+                payloads = {row["plan_id"]: row["payload"] for row in rows}
+                for plan_id in ids:
+                    if plan_id in payloads:
+                        yield decode_payload(payloads[plan_id], self.codec)
+            if cursor is None:
+                return
+
+    def train_dictionary(self, size: int = DEFAULT_DICT_SIZE, max_samples: int = 2000,
+                         codec: Optional[str] = None) -> Optional[int]:
+        """
+        Train a compression dictionary on the newest stored plans and use it for
+        new payloads. Existing payloads keep theirs until `recompress` is run.
+
+        Args:
+            size: Target dictionary size in bytes
+            max_samples: Plans sampled for training
+            codec: "zstd" or "zlib" (default: zstd when installed)
+
+        Returns:
+            The new dictionary id, or None if the store is empty
+        """
+        samples = sample_rows(self._conn, self._lock, self.codec, "plans", "payload", max_samples)
+        return self.codec.train(samples, size, codec) if samples else None
+
+    def recompress(self, batch_size: int = 500) -> Dict[str, int]:
+        """Rewrite every payload with the current dictionary; returns row and byte counts."""
+        return recompress_rows(self._conn, self._lock, self.codec, "plans", "payload", batch_size)
+
+    def payload_bytes(self) -> int:
+        """Total size of the stored (compressed) payloads."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(payload)), 0) FROM plans"
+            ).fetchone()[0]
+
+    def delete(self, plan_id: str) -> bool:
+        """Delete a plan; returns True if it existed."""
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM plans WHERE plan_id = ?", (plan_id,)).rowcount > 0
+
+    def close(self):
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def open_default_store() -> Optional[PlanStore]:
+    """Open the store at `PLAN_STORE_PATH`, or return None if persistence is disabled."""
+    return PlanStore(config.plan_store_path) if config.plan_store_path else None
@@ -0,0 +1,239 @@
+"""
+Profiling hooks for crew runs: CPU profiles, allocation snapshots and
+sampled wall-clock stacks in collapsed (flamegraph) format.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+PROFILER_KINDS = ("cprofile", "tracemalloc", "wall")
+
+_SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+_IO_MODULES = ("socket.py", "ssl.py", "selectors.py", "connection.py")
+
+
+def classify_frame(filename: str) -> str:
+    """Attribute a source file to our code, a framework, network I/O, or other."""
+    if filename.startswith(_SRC_DIR):
+        return "own"
+    if os.path.basename(filename) in _IO_MODULES:
+        return "io"
+    for package in ("crewai", "litellm", "pydantic", "openai", "httpx"):
+        if f"{os.sep}{package}{os.sep}" in filename or f"{os.sep}{package}_" in filename:
+            return package
+    return "other"
+
+
+class Profiler:
+    """Base profiler; `section()` brackets each profiled stage of a run."""
+
+    kind = "none"
+
+    def __init__(self):
+        self.timings: Dict[str, float] = defaultdict(float)
+
+    @contextmanager
+    def section(self, name: str):
+        """Profile the enclosed block under the label `name`."""
+        self._enter(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - start
+            self._exit(name)
+
+    def _enter(self, name: str):
+        pass
+
+    def _exit(self, name: str):
+        pass
+
+    def write(self, output_dir: str) -> List[str]:
+        """Write collected profiles to `output_dir` and return the file paths."""
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, "timings.txt")
+        with open(path, 'w') as f:
+            for name, seconds in self.timings.items():
+                f.write(f"{name}\t{seconds:.6f}\n")
+        return [path] + self._write(output_dir)
+
+    def _write(self, output_dir: str) -> List[str]:
+        return []
+
+
+class NullProfiler(Profiler):
+    """Profiler that records nothing; the default for normal runs."""
+
+    @contextmanager
+    def section(self, name: str):
+        yield
+
+    def write(self, output_dir: str) -> List[str]:
+        return []
+
+
+class CProfileProfiler(Profiler):
+    """Deterministic CPU profile per section (one `.prof` file each)."""
+
+    kind = "cprofile"
+
+    def __init__(self):
+        super().__init__()
+        self.profiles: Dict[str, cProfile.Profile] = {}
+
+    def _enter(self, name: str):
+        profile = self.profiles.setdefault(name, cProfile.Profile())
+        profile.enable()
+
+    def _exit(self, name: str):
+        self.profiles[name].disable()
+
+    def _write(self, output_dir: str) -> List[str]:
+        paths = []
+        for name, profile in self.profiles.items():
+            prof_path = os.path.join(output_dir, f"cprofile_{name}.prof")
+            profile.dump_stats(prof_path)
+            stream = io.StringIO()
+            pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(40)
+            txt_path = os.path.join(output_dir, f"cprofile_{name}.txt")
+            with open(txt_path, 'w') as f:
+                f.write(stream.getvalue())
+            paths.extend([prof_path, txt_path])
+        return paths
+
+
+class TracemallocProfiler(Profiler):
+    """Allocation snapshot diff per section, grouped by source line."""
+
+    kind = "tracemalloc"
+
+    def __init__(self, frames: int = 25):
+        super().__init__()
+        self.frames = frames
+        self._started_here = False
+        self._before: Dict[str, tracemalloc.Snapshot] = {}
+        self.diffs: Dict[str, List[tracemalloc.StatisticDiff]] = {}
+        self.snapshots: Dict[str, tracemalloc.Snapshot] = {}
+
+    def _enter(self, name: str):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_here = True
+        self._before[name] = tracemalloc.take_snapshot()
+
+    def _exit(self, name: str):
+        after = tracemalloc.take_snapshot()
+        self.snapshots[name] = after
+        self.diffs[name] = after.compare_to(self._before.pop(name), "lineno")
+
+    def _write(self, output_dir: str) -> List[str]:
+        paths = []
+        for name, diffs in self.diffs.items():
+            txt_path = os.path.join(output_dir, f"tracemalloc_{name}.txt")
+            with open(txt_path, 'w') as f:
+                for stat in diffs[:50]:
+                    f.write(f"{stat}\n")
+            snap_path = os.path.join(output_dir, f"tracemalloc_{name}.snapshot")
+            self.snapshots[name].dump(snap_path)
+            paths.extend([txt_path, snap_path])
+        if self._started_here:
+            tracemalloc.stop()
+            self._started_here = False
+        return paths
+
+
+class WallProfiler(Profiler):
+    """
+    Sampling wall-clock profiler. A background thread samples the stack of
+    the thread running the active section and aggregates collapsed stacks
+    (`section;frame;frame count`) for flamegraph.pl or speedscope.
+    """
+
+    kind = "wall"
+
+    def __init__(self, interval: float = 0.005):
+        super().__init__()
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.categories: Counter = Counter()
+        self._active: List[tuple] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _enter(self, name: str):
+        with self._lock:
+            self._active.append((name, threading.get_ident()))
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sample, name="wall-profiler", daemon=True)
+            self._thread.start()
+
+    def _exit(self, name: str):
+        with self._lock:
+            self._active.remove((name, threading.get_ident()))
+            idle = not self._active
+        if idle and self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                active = list(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for section, thread_id in active:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                names = []
+                leaf_category = None
+                while frame is not None:
+                    code = frame.f_code
+                    if leaf_category is None:
+                        leaf_category = classify_frame(code.co_filename)
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                names.reverse()
+                self.stacks[";".join([section] + names)] += 1
+                self.categories[leaf_category] += 1
+
+    def _write(self, output_dir: str) -> List[str]:
+        collapsed_path = os.path.join(output_dir, "wall.collapsed")
+        with open(collapsed_path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        summary_path = os.path.join(output_dir, "wall_summary.txt")
+        total = sum(self.categories.values()) or 1
+        with open(summary_path, 'w') as f:
+            f.write("Samples by leaf-frame owner:\n")
+            for category, count in self.categories.most_common():
+                f.write(f"  {category:<10} {count:>8}  {100.0 * count / total:5.1f}%\n")
+        return [collapsed_path, summary_path]
+
+
+def create_profiler(kind: Optional[str]) -> Profiler:
+    """Create a profiler by name; `None` returns a no-op profiler."""
+    if kind is None:
+        return NullProfiler()
+    if kind == "cprofile":
+        return CProfileProfiler()
+    if kind == "tracemalloc":
+        return TracemallocProfiler()
+    if kind == "wall":
+        return WallProfiler()
+    raise ValueError(f"Unknown profiler: {kind}. Choose from: {', '.join(PROFILER_KINDS)}")
@@ -0,0 +1,304 @@
+"""
+Persistent bank of validated quiz questions, indexed by topic, expertise
+level, difficulty and concept, from which new quizzes are assembled without
+an LLM call once a topic has been quizzed often enough.
+"""
+import hashlib
+import random
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.config import config
+from src.models import Quiz, QuizQuestion
+from src.plan_store import normalize_topic
+from src.serialization import dumps
+from src.similarity import FILLER_WORDS, canonical_topic, jaccard, shingles
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    question_id TEXT PRIMARY KEY,
+    topic TEXT NOT NULL,
+    expertise_level TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    concept TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    plan_id TEXT,
+    created_at REAL NOT NULL,
+    served INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_questions_topic_level
+    ON questions (topic, expertise_level, difficulty, concept);
+"""
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+# Share of each difficulty in an assembled quiz, per expertise level
+DIFFICULTY_MIX = {
+    "beginner": {"easy": 0.5, "medium": 0.4, "hard": 0.1},
+    "intermediate": {"easy": 0.3, "medium": 0.5, "hard": 0.2},
+    "advanced": {"easy": 0.1, "medium": 0.5, "hard": 0.4},
+}
+
+# Words that say what a question asks rather than what it is about
+QUESTION_WORDS = frozenset({
+    "what", "which", "why", "how", "when", "where", "who", "does", "do", "is", "are",
+    "following", "best", "most", "describes", "main", "purpose", "primary", "used",
+    "use", "true", "statement", "correct", "example", "difference", "between",
+    "would", "should", "can", "you", "your", "this", "that", "these",
+})
+
+# Minutes per question for assembled quizzes
+MINUTES_PER_QUESTION = 2
+
+
+def question_concept(question: QuizQuestion, topic: str) -> str:
+    """
+    The concept a question is about: the longest content word of its text
+    that is not part of the topic itself (the topic if there is none).
+    """
+    topic_words = set(canonical_topic(topic).split())
+    words = [
+        word for word in normalize_topic(question.question).split()
+        if len(word) > 2 and word not in FILLER_WORDS and word not in QUESTION_WORDS
+        and word not in topic_words
+    ]
+    return max(words, key=len) if words else canonical_topic(topic)
+
+
+def validate_question(question: QuizQuestion) -> Optional[QuizQuestion]:
+    """
+    Normalize a generated question, or return None if it cannot be banked:
+    it needs text, at least two options with distinct letters, and a correct
+    answer that is one of them.
+    """
+    letters = [option.option.strip().upper().rstrip(")") for option in question.options]
+    answer = question.correct_answer.strip().upper().rstrip(")")[:1]
+    if (not question.question.strip() or len(letters) < 2
+            or len(set(letters)) != len(letters) or answer not in letters):
+        return None
+    difficulty = question.difficulty.strip().lower()
+    return question.model_copy(update={
+        "options": [option.model_copy(update={"option": letter})
+                    for option, letter in zip(question.options, letters)],
+        "correct_answer": answer,
+        "difficulty": difficulty if difficulty in DIFFICULTIES else "medium",
+    })
+
+
+def _question_id(topic: str, expertise_level: str, question: QuizQuestion) -> str:
+    key = f"{topic}|{expertise_level}|{normalize_topic(question.question)}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+class QuestionBank:
+    """
+    SQLite-backed bank of quiz questions. Questions from every generated quiz
+    are added once validated; `assemble` builds a new quiz from them, spread
+    over concepts and difficulties and favoring the least served questions.
+    """
+
+    def __init__(self, path: str = "questions.db"):
+        """
+        Open (or create) the bank.
+
+        Args:
+            path: SQLite database file, or ":memory:" for a throwaway bank
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def add_questions(
+        self,
+        questions: Iterable[QuizQuestion],
+        topic: str,
+        expertise_level: str,
+        plan_id: Optional[str] = None
+    ) -> int:
+        """
+        Bank the valid questions among `questions` (re-adding one replaces it).
+
+        Args:
+            questions: Generated quiz questions
+            topic: Topic they were written for (matched by its canonical form)
+            expertise_level: Level they were written for
+            plan_id: Plan they came from, if stored
+
+        Returns:
+            Number of questions banked
+        """
+        canonical, level, now = canonical_topic(topic), expertise_level.lower(), time.time()
+        rows = []
+        for question in questions:
+            question = validate_question(question)
+            if question is None:
+                continue
+            rows.append((
+                _question_id(canonical, level, question), canonical, level, question.difficulty,
+                question_concept(question, topic), dumps(question).decode("utf-8"), plan_id, now
+            ))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO questions "
+                "(question_id, topic, expertise_level, difficulty, concept, payload, plan_id, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (question_id) DO UPDATE SET payload = excluded.payload, "
+                "difficulty = excluded.difficulty, concept = excluded.concept",
+                rows
+            )
+        return len(rows)
+
+    def add_quiz(self, quiz: Quiz, expertise_level: str, plan_id: Optional[str] = None,
+                 topic: Optional[str] = None) -> int:
+        """Bank the questions of a generated quiz (see `add_questions`)."""
+        return self.add_questions(quiz.questions, topic or quiz.topic, expertise_level, plan_id)
+
+    def add_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Bank the quizzes of stored plan records (e.g. `PlanStore.iter_records`)."""
+        total = 0
+        for record in records:
+            quiz = Quiz.model_validate(record["quiz"])
+            total += self.add_quiz(quiz, record["expertise_level"], record.get("plan_id"),
+                                   record["topic"])
+        return total
+
+    def depth(self, topic: str, expertise_level: str) -> int:
+        """Number of banked questions for a topic and level."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM questions WHERE topic = ? AND expertise_level = ?",
+                (canonical_topic(topic), expertise_level.lower())
+            ).fetchone()[0]
+
+    def questions(self, topic: str, expertise_level: str, limit: int = 500) -> List[QuizQuestion]:
+        """The newest `limit` banked questions for a topic and level."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM questions WHERE topic = ? AND expertise_level = ? "
+                "ORDER BY created_at DESC LIMIT ?",
+                (canonical_topic(topic), expertise_level.lower(), limit)
+            ).fetchall()
+        return [QuizQuestion.model_validate_json(row["payload"]) for row in rows]
+
+    def assemble(
+        self,
+        topic: str,
+        expertise_level: str,
+        num_questions: int,
+        min_depth: Optional[int] = None,
+        seed: Optional[int] = None,
+        duplicate_threshold: float = 0.8
+    ) -> Optional[Quiz]:
+        """
+        Build a quiz from banked questions, or return None if the bank is too thin.
+
+        Questions are picked to match the level's difficulty mix, one per
+        concept before any concept repeats, skipping near-duplicate wording
+        and preferring questions that were served least often.
+
+        Args:
+            topic: Topic in any phrasing (matched by its canonical form)
+            expertise_level: Expertise level
+            num_questions: Questions in the quiz
+            min_depth: Banked questions needed before assembling (default:
+                QUESTION_BANK_DEPTH_FACTOR times `num_questions`)
+            seed: Seed for the tie-breaking shuffle
+            duplicate_threshold: Character n-gram similarity at which two questions
+                count as duplicates
+
+        Returns:
+            The quiz, or None
+        """
+        level = expertise_level.lower()
+        if min_depth is None:
+            min_depth = max(num_questions, int(num_questions * config.question_bank_depth_factor))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question_id, difficulty, concept, payload, served FROM questions "
+                "WHERE topic = ? AND expertise_level = ?",
+                (canonical_topic(topic), level)
+            ).fetchall()
+        if num_questions <= 0 or len(rows) < min_depth:
+            return None
+
+        rng = random.Random(seed)
+        rows = list(rows)
+        rng.shuffle(rows)
+        rows.sort(key=lambda row: row["served"])
+
+        mix = DIFFICULTY_MIX.get(level, DIFFICULTY_MIX["intermediate"])
+        quota = {difficulty: round(share * num_questions) for difficulty, share in mix.items()}
+        concepts: Counter = Counter()
+        taken: Counter = Counter()
+        chosen, seen, parsed = [], [], {}
+        # Pass 1 honors the difficulty quota and one question per concept; later passes relax them
+        for strict_difficulty, max_per_concept in ((True, 1), (False, 1), (False, num_questions)):
+            for row in rows:
+                if len(chosen) == num_questions:
+                    break
+                question_id = row["question_id"]
+                if question_id in parsed or concepts[row["concept"]] >= max_per_concept:
+                    continue
+                if strict_difficulty and taken[row["difficulty"]] >= quota.get(row["difficulty"], 0):
+                    continue
+                question = QuizQuestion.model_validate_json(row["payload"])
+                candidate = shingles(normalize_topic(question.question))
+                if any(jaccard(candidate, other) >= duplicate_threshold for other in seen):
+                    continue
+                chosen.append(row)
+                parsed[question_id] = question
+                seen.append(candidate)
+                concepts[row["concept"]] += 1
+                taken[row["difficulty"]] += 1
+        if len(chosen) < num_questions:
+            return None
+
+        # Easy questions first, as generated quizzes tend to do
+        chosen.sort(key=lambda row: DIFFICULTIES.index(row["difficulty"]))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE questions SET served = served + 1 WHERE question_id = ?",
+                [(row["question_id"],) for row in chosen]
+            )
+        questions = [parsed[row["question_id"]] for row in chosen]
+        return Quiz(
+            topic=topic,
+            total_questions=len(questions),
+            questions=questions,
+            estimated_time_minutes=MINUTES_PER_QUESTION * len(questions)
+        )
+
+    def summary(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Question counts per topic and level, deepest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT topic, expertise_level, COUNT(*) AS questions, "
+                "COUNT(DISTINCT concept) AS concepts, SUM(served) AS served FROM questions "
+                "GROUP BY topic, expertise_level ORDER BY questions DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self) -> int:
+        """Number of banked questions."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+
+    def close(self):
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def open_default_question_bank() -> Optional[QuestionBank]:
+    """Open the bank at `QUESTION_BANK_PATH`, or return None if it is disabled."""
+    return QuestionBank(config.question_bank_path) if config.question_bank_path else None
@@ -0,0 +1,268 @@
+"""
+Near-duplicate detection for quiz questions.
+
+Each question is reduced to two sets, the character shingles of its text and
+the words of its options, and each set to a MinHash signature. LSH band
+buckets over both signatures find the candidate pairs, which are verified
+with exact Jaccard similarity, so checking a quiz stays linear in its size
+however many earlier questions for the topic are remembered. A question
+counts as a duplicate when its wording is close to another's, or when its
+wording is fairly close and it offers much the same options.
+"""
+import threading
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from src.models import Quiz, QuizQuestion
+from src.plan_store import normalize_topic
+from src.similarity import MinHasher, canonical_topic, jaccard, shingles
+
+
+# Similarity at which two questions count as duplicates
+DUPLICATE_THRESHOLD = 0.75
+
+# Earlier questions remembered per topic and level
+MAX_HISTORY = 200
+
+
+class QuestionFeatures(NamedTuple):
+    """The sets a question is compared by."""
+    text: FrozenSet[str]
+    options: FrozenSet[str]
+
+
+class Duplicate(NamedTuple):
+    """A question slot that repeats another question."""
+    index: int
+    question: str
+    duplicate_of: str
+    source: str
+    score: float
+
+
+def question_features(question: QuizQuestion) -> QuestionFeatures:
+    """Character shingles of the question text and the words of its options."""
+    words = " ".join(normalize_topic(option.text) for option in question.options).split()
+    return QuestionFeatures(
+        shingles(normalize_topic(question.question)),
+        frozenset(word for word in words if len(word) > 1 or word.isdigit())
+    )
+
+
+def similarity(a: QuestionFeatures, b: QuestionFeatures) -> float:
+    """
+    Similarity of two questions: their wording's, or its average with their
+    options' if that is higher (a reworded question with the same options).
+    """
+    text = jaccard(a.text, b.text)
+    return max(text, (text + jaccard(a.options, b.options)) / 2)
+
+
+def _overlap(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    # Jaccard without building the union
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+class QuestionIndex:
+    """MinHash LSH index over questions, for finding near-duplicates of new ones."""
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD, num_perm: int = 64,
+                 bands: int = 16, hasher: Optional[MinHasher] = None):
+        """
+        Args:
+            threshold: Similarity at which two questions count as duplicates
+            num_perm: MinHash signature length
+            bands: Number of LSH bands (num_perm must be divisible by bands)
+            hasher: MinHasher to share with other indexes (its rows are memoized)
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = hasher or MinHasher(num_perm)
+        self._questions: List[str] = []
+        self._features: List[QuestionFeatures] = []
+        self._buckets: Dict[Tuple, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._questions)
+
+    def keys(self, features: QuestionFeatures) -> List[Tuple]:
+        """
+        LSH band keys of a question's wording, plus its option set as a key of
+        its own, so a reworded question with the same options is still a
+        candidate (pass them back to `match` and `add`).
+        """
+        signature = self.hasher.signature(features.text)
+        keys = [(band,) + signature[band * self.rows:(band + 1) * self.rows]
+                for band in range(self.bands)]
+        if features.options:
+            keys.append(features.options)
+        return keys
+
+    def match(self, features: QuestionFeatures,
+              keys: Optional[List[Tuple]] = None) -> Optional[Tuple[str, float]]:
+        """
+        Find the indexed question most similar to one with `features`.
+
+        Returns:
+            (its text, similarity) at or above the threshold, or None
+        """
+        candidates = set()
+        for key in self.keys(features) if keys is None else keys:
+            candidates.update(self._buckets.get(key, ()))
+        # Below this wording similarity even identical options cannot reach the threshold
+        min_text = 2 * self.threshold - 1
+        size = len(features.text)
+        best = None
+        for position in candidates:
+            other = self._features[position]
+            if min(size, len(other.text)) < min_text * max(size, len(other.text)):
+                continue
+            score = _overlap(features.text, other.text)
+            if score < self.threshold and score >= min_text:
+                score = max(score, (score + _overlap(features.options, other.options)) / 2)
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (self._questions[position], score)
+        return best
+
+    def add(self, question: QuizQuestion, features: Optional[QuestionFeatures] = None,
+            keys: Optional[List[Tuple]] = None):
+        """Index a question."""
+        features = features or question_features(question)
+        position = len(self._questions)
+        self._questions.append(question.question)
+        self._features.append(features)
+        for key in self.keys(features) if keys is None else keys:
+            self._buckets.setdefault(key, []).append(position)
+
+
+class QuizDeduplicator:
+    """
+    Finds the questions of a quiz that repeat another question in the same
+    quiz or one from an earlier quiz for the same topic and level. Earlier
+    questions are loaded once per topic from the question bank, if there is
+    one, and every checked quiz is remembered.
+    """
+
+    def __init__(self, question_bank=None, threshold: float = DUPLICATE_THRESHOLD,
+                 max_history: int = MAX_HISTORY):
+        """
+        Args:
+            question_bank: Optional `QuestionBank` holding earlier questions
+            threshold: Similarity at which two questions count as duplicates
+            max_history: Earlier questions loaded from the bank per topic and level
+        """
+        self.question_bank = question_bank
+        self.threshold = threshold
+        self.max_history = max_history
+        self.hasher = MinHasher()
+        self._history: Dict[Tuple[str, str], QuestionIndex] = {}
+        self._lock = threading.Lock()
+
+    def _new_index(self) -> QuestionIndex:
+        return QuestionIndex(self.threshold, hasher=self.hasher)
+
+    def _topic_history(self, topic: str, expertise_level: str) -> QuestionIndex:
+        key = (canonical_topic(topic), expertise_level.lower())
+        history = self._history.get(key)
+        if history is None:
+            history = self._history[key] = self._new_index()
+            if self.question_bank is not None:
+                try:
+                    earlier = self.question_bank.questions(topic, expertise_level, self.max_history)
+                except Exception as e:
+                    print(f"⚠️  Could not load earlier questions: {e}")
+                    earlier = []
+                for question in earlier:
+                    history.add(question)
+        return history
+
+    def find(self, questions: Iterable[QuizQuestion], topic: Optional[str] = None,
+             expertise_level: Optional[str] = None) -> List[Duplicate]:
+        """
+        Find the duplicate slots among `questions`; the first of a group of
+        near-duplicates is kept. With a topic and level, questions that repeat
+        one from an earlier quiz are reported too (source "history").
+        """
+        with self._lock:
+            history = self._topic_history(topic, expertise_level) \
+                if topic and expertise_level else None
+            seen = self._new_index()
+            duplicates = []
+            for index, question in enumerate(questions):
+                features = question_features(question)
+                keys = seen.keys(features)
+                best, source = seen.match(features, keys), "quiz"
+                if best is None:
+                    seen.add(question, features, keys)
+                    if history is not None:
+                        best, source = history.match(features, keys), "history"
+                if best is not None:
+                    duplicates.append(Duplicate(index, question.question, best[0], source,
+                                                round(best[1], 3)))
+            return duplicates
+
+    def fresh(self, candidates: List[QuizQuestion], existing: List[QuizQuestion],
+              topic: Optional[str] = None, expertise_level: Optional[str] = None) -> List[QuizQuestion]:
+        """The candidates that repeat neither `existing`, each other nor an earlier quiz."""
+        taken = {duplicate.index for duplicate in
+                 self.find(existing + candidates, topic, expertise_level)}
+        return [question for index, question in enumerate(candidates, len(existing))
+                if index not in taken]
+
+    def remember(self, quiz: Quiz, topic: str, expertise_level: str):
+        """Add a finished quiz's new questions to the topic's history."""
+        key = (canonical_topic(topic), expertise_level.lower())
+        with self._lock:
+            history = self._topic_history(topic, expertise_level)
+            for question in quiz.questions:
+                if len(history) >= self.max_history:
+                    # Start over rather than grow without bound
+                    history = self._history[key] = self._new_index()
+                features = question_features(question)
+                keys = history.keys(features)
+                if history.match(features, keys) is None:
+                    history.add(question, features, keys)
+
+
+def replace_duplicates(
+    quiz: Quiz,
+    duplicates: List[Duplicate],
+    replacements: List[QuizQuestion]
+) -> Tuple[Quiz, int, int]:
+    """
+    Put replacement questions into a quiz's duplicate slots, in order. Slots
+    left without a replacement are dropped if they repeat a question of the
+    same quiz and kept if they only repeat an earlier quiz's.
+
+    Returns:
+        Tuple of (quiz, slots replaced, slots dropped)
+    """
+    replacements = iter(replacements)
+    slots = {duplicate.index: duplicate for duplicate in duplicates}
+    questions, replaced, dropped = [], 0, 0
+    for index, question in enumerate(quiz.questions):
+        duplicate = slots.get(index)
+        if duplicate is None:
+            questions.append(question)
+            continue
+        replacement = next(replacements, None)
+        if replacement is not None:
+            questions.append(replacement)
+            replaced += 1
+        elif duplicate.source == "history":
+            questions.append(question)
+        else:
+            dropped += 1
+    if not dropped:
+        return quiz.model_copy(update={"questions": questions}), replaced, dropped
+    per_question = quiz.estimated_time_minutes / len(quiz.questions)
+    return quiz.model_copy(update={
+        "questions": questions,
+        "total_questions": len(questions),
+        "estimated_time_minutes": max(1, round(per_question * len(questions)))
+    }), replaced, dropped
@@ -0,0 +1,77 @@
+"""
+Per-provider rate limiting for LLM and search calls.
+"""
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from src.config import RunConfig, config
+
+
+class RateLimiter:
+    """Token bucket allowing `rate_per_minute` calls per minute (0 disables limiting)."""
+
+    def __init__(self, rate_per_minute: float, burst: Optional[int] = None):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = float(burst if burst is not None else max(1, int(rate_per_minute // 6) or 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a call is allowed; returns the seconds spent waiting."""
+        if self.rate_per_minute <= 0:
+            return 0.0
+        per_second = self.rate_per_minute / 60.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                if self._refill() >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / per_second
+            time.sleep(delay)
+            waited += delay
+
+    def _refill(self) -> float:
+        # Tokens available now (call with the lock held)
+        now = time.monotonic()
+        per_second = self.rate_per_minute / 60.0
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * per_second)
+        self._updated = now
+        return self._tokens
+
+    def headroom(self) -> float:
+        """Share of the burst capacity available right now (1.0 when unlimited)."""
+        if self.rate_per_minute <= 0:
+            return 1.0
+        with self._lock:
+            return self._refill() / self.capacity
+
+    def wait_seconds(self) -> float:
+        """Seconds until a call would be allowed (0 if one is allowed now)."""
+        if self.rate_per_minute <= 0:
+            return 0.0
+        with self._lock:
+            tokens = self._refill()
+        return 0.0 if tokens >= 1 else (1 - tokens) / (self.rate_per_minute / 60.0)
+
+
+_limiters: Dict[Tuple, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(provider: str, run_config: Optional[RunConfig] = None) -> RateLimiter:
+    """
+    Process-wide limiter for `provider` under `run_config` (default: the
+    environment's, from `<PROVIDER>_RPM`). Runs using the same API key at the
+    same rate share one limiter; another tenant's key gets its own.
+    """
+    run_config = run_config or config.run_config()
+    rate = run_config.rate_limit(provider)
+    key = (provider, run_config.credential(provider), rate)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = RateLimiter(rate)
+        return limiter
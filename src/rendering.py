@@ -0,0 +1,166 @@
+"""
+Single-pass HTML renderers for the Streamlit result tabs.
+
+Each tab is built as one HTML string from the pydantic models (all model text
+is escaped) so the app issues a single `st.markdown` call per tab. Rendered
+tabs are cached by plan id, which makes reruns and tab switches cheap no
+matter how large the plan is; a plan replaced under the same id is evicted.
+"""
+import html
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from src.models import LearningMaterial, ProjectSuggestions, Quiz
+
+
+def _text(value) -> str:
+    # Escaped text that cannot end the surrounding HTML block with a blank line
+    return html.escape(str(value)).replace("\n", "<br>")
+
+
+def _href(url: str) -> str:
+    url = url.strip()
+    return html.escape(url, quote=True) if url.lower().startswith(("http://", "https://")) else "#"
+
+
+def _resources(heading: str, icon: str, link_label: str, resources) -> str:
+    if not resources:
+        return ""
+    cards = "".join(
+        f'<div class="resource-card"><h4>{icon} {_text(resource.title)}</h4>'
+        f'<p>{_text(resource.description)}</p>'
+        f'<a href="{_href(resource.url)}" target="_blank" rel="noopener noreferrer">'
+        f'🔗 {link_label}</a></div>'
+        for resource in resources
+    )
+    return f"<h3>{heading}</h3>{cards}"
+
+
+def render_learning_materials(materials: LearningMaterial) -> str:
+    """Render the learning materials tab."""
+    return "".join((
+        '<div class="rendered-tab">',
+        "<h2>📚 Learning Materials</h2>",
+        f"<details open><summary>📝 Learning Path Summary</summary>"
+        f"<p>{_text(materials.summary)}</p></details>",
+        _resources("🎥 Video Resources", "📹", "Watch Video", materials.videos),
+        _resources("📄 Article Resources", "📰", "Read Article", materials.articles),
+        _resources("💪 Practice Exercises", "✏️", "Try Exercise", materials.exercises),
+        "</div>",
+    ))
+
+
+def render_quiz(quiz: Quiz) -> str:
+    """Render the quiz tab, with each explanation folded into a `<details>` element."""
+    parts = [
+        '<div class="rendered-tab">',
+        "<h2>📝 Knowledge Assessment Quiz</h2>",
+        f'<div class="tab-info"><strong>Total Questions:</strong> {quiz.total_questions} | '
+        f"<strong>Estimated Time:</strong> {quiz.estimated_time_minutes} minutes</div>",
+    ]
+    for idx, question in enumerate(quiz.questions, 1):
+        parts.append(
+            f'<div class="quiz-question"><h4>Question {idx}</h4>'
+            f'<p class="quiz-text">{_text(question.question)}</p></div>'
+        )
+        for option in question.options:
+            correct = option.option == question.correct_answer
+            parts.append(
+                f'<div class="quiz-option {"correct" if correct else "wrong"}">'
+                f'{"✅" if correct else "❌"} <strong>{_text(option.option)})</strong> '
+                f"{_text(option.text)}</div>"
+            )
+        parts.append(
+            f"<details><summary>💡 Explanation (Difficulty: {_text(question.difficulty)})</summary>"
+            f"<p><strong>Correct Answer:</strong> {_text(question.correct_answer)}</p>"
+            f"<p>{_text(question.explanation)}</p></details><hr>"
+        )
+    parts.append("</div>")
+    return "".join(parts)
+
+
+def render_projects(projects: ProjectSuggestions) -> str:
+    """Render the projects tab, with each deliverable folded into a `<details>` element."""
+    parts = [
+        '<div class="rendered-tab">',
+        "<h2>🚀 Project Ideas</h2>",
+        f'<div class="tab-info"><strong>Total Projects:</strong> {projects.total_projects}</div>',
+    ]
+    for idx, project in enumerate(projects.projects, 1):
+        outcomes = "".join(f"<li>{_text(outcome)}</li>" for outcome in project.learning_outcomes)
+        concepts = "".join(f"<li>🔹 {_text(concept)}</li>" for concept in project.key_concepts)
+        deliverables = "".join(
+            f"<details><summary>📦 {_text(deliverable.name)}</summary>"
+            f"<p>{_text(deliverable.description)}</p></details>"
+            for deliverable in project.deliverables
+        )
+        parts.append(
+            f'<div class="project-card"><h3>Project {idx}: {_text(project.title)}</h3></div>'
+            '<div class="project-columns"><div class="project-main">'
+            f"<p><strong>Description:</strong></p><p>{_text(project.description)}</p>"
+            f"<p><strong>Learning Outcomes:</strong></p><ul>{outcomes}</ul></div>"
+            '<div class="project-side">'
+            f"<p><strong>Level:</strong> <code>{_text(project.expertise_level)}</code></p>"
+            f"<p><strong>Duration:</strong> <code>{_text(project.estimated_duration)}</code></p>"
+            f'<p><strong>Key Concepts:</strong></p><ul class="plain">{concepts}</ul></div></div>'
+            f"<p><strong>Deliverables:</strong></p>{deliverables}<hr>"
+        )
+    parts.append("</div>")
+    return "".join(parts)
+
+
+RENDERERS: Dict[str, Callable] = {
+    "learning_materials": render_learning_materials,
+    "quiz": render_quiz,
+    "projects": render_projects,
+}
+
+
+def _sizes(model) -> Tuple[int, ...]:
+    """Lengths of a model's list fields (resources per category, questions, projects)."""
+    values = (getattr(model, name) for name in type(model).model_fields)
+    return tuple(len(value) for value in values if isinstance(value, list))
+
+
+class RenderCache:
+    """
+    LRU of rendered tabs keyed by (plan id, tab, list sizes). The sizes keep a
+    trimmed copy of a plan from ever being shown the full plan's rendering.
+    """
+
+    def __init__(self, max_items: int = 256):
+        self.max_items = max_items
+        self._items: "OrderedDict[Tuple[str, str, Tuple[int, ...]], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, tab: str, model, plan_key: Optional[str] = None) -> str:
+        """
+        Render one tab, reusing an earlier rendering of the same plan.
+
+        Args:
+            tab: "learning_materials", "quiz" or "projects"
+            model: The pydantic model shown in that tab
+            plan_key: Plan id (or another id that changes whenever the plan does);
+                without one the tab is rendered and not cached
+        """
+        if plan_key is None:
+            return RENDERERS[tab](model)
+        key = (plan_key, tab, _sizes(model))
+        with self._lock:
+            cached = self._items.get(key)
+            if cached is not None:
+                self._items.move_to_end(key)
+                return cached
+        rendered = RENDERERS[tab](model)
+        with self._lock:
+            self._items[key] = rendered
+            if len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return rendered
+
+    def evict(self, plan_key: str):
+        """Drop every rendered tab of a plan, e.g. after it was replaced under the same id."""
+        with self._lock:
+            for key in [key for key in self._items if key[0] == plan_key]:
+                del self._items[key]
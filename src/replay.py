@@ -0,0 +1,113 @@
+"""
+Re-issue the plan requests recorded in a cassette against the current code,
+serving LLM and search calls from the cassette, and summarize throughput and
+latency.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+
+from src.cassette import Cassette
+from src.crew import EducationCrew
+from src.plan_store import PlanStore
+from src.resources import ResourceIndex
+from src.similarity import TopicIndex
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def replay_workload(
+    cassette: Cassette,
+    workers: int = 4,
+    arrival_scale: float = 1.0,
+    plan_store: Optional[PlanStore] = None,
+    topic_index: Optional[TopicIndex] = None,
+    resource_index: Optional[ResourceIndex] = None,
+    report: Callable[[str], None] = print
+) -> Dict[str, Any]:
+    """
+    Re-issue every recorded request, keeping the recorded arrival pattern.
+
+    The cassette must be the process-wide replaying cassette (CASSETTE_MODE=replay),
+    so that the crews' LLM and search calls are served from it.
+
+    Args:
+        cassette: Replaying cassette with recorded requests
+        workers: Maximum number of concurrent crew runs
+        arrival_scale: Multiplier for the recorded gaps between requests
+            (0 = submit everything at once)
+        plan_store: Optional store results are saved to
+        topic_index: Optional similarity index over `plan_store`
+        resource_index: Optional index of curated resources
+        report: Callback receiving one line per finished request
+
+    Returns:
+        Summary with request counts, wall time, throughput, latency
+        percentiles and the cassette's match statistics
+    """
+    requests = cassette.runs()
+    local = threading.local()
+
+    def issue(request: Dict[str, Any]) -> bool:
+        # Each worker thread keeps its own crew per provider
+        crews = local.__dict__.setdefault("crews", {})
+        provider = request.get("provider")
+        if provider not in crews:
+            crews[provider] = EducationCrew(provider, plan_store, topic_index,
+                                            resource_index=resource_index)
+        crew = crews[provider]
+        params = {key: request[key] for key in
+                  ("resources_per_category", "num_questions", "num_projects") if key in request}
+        if "levels" in request:
+            result = crew.run_levels(request["topic"], request["levels"],
+                                     max_workers=request.get("max_workers"), **params)
+        else:
+            result = crew.run(request["topic"], request["expertise_level"],
+                              use_cache=request.get("use_cache", True), **params)
+        return bool(result["success"])
+
+    latencies, failed = [], 0
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="replay") as pool:
+        futures = {}
+        for request in requests:
+            # Keep the recorded spacing between arrivals
+            delay = request["t"] * arrival_scale - (time.monotonic() - started)
+            if delay > 0:
+                time.sleep(delay)
+            submitted = time.monotonic()
+            futures[pool.submit(issue, request)] = (request, submitted)
+
+        for future in as_completed(futures):
+            request, submitted = futures[future]
+            seconds = time.monotonic() - submitted
+            try:
+                ok = future.result()
+            except Exception as e:
+                report(f"   {request['topic']} raised: {e}")
+                ok = False
+            failed += not ok
+            latencies.append(seconds)
+            report(f"[{len(latencies)}/{len(requests)}] {'✓' if ok else '✗'} {request['topic']} "
+                   f"in {seconds:.2f}s")
+
+    wall = time.monotonic() - started
+    return {
+        "requests": len(requests),
+        "failed": failed,
+        "wall_seconds": wall,
+        "throughput_per_minute": 60 * len(requests) / wall if wall else 0.0,
+        "latency_seconds": {
+            "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50": _percentile(latencies, 0.5),
+            "p95": _percentile(latencies, 0.95),
+            "max": max(latencies, default=0.0),
+        },
+        "cassette": dict(cassette.stats),
+    }
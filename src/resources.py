@@ -0,0 +1,282 @@
+"""
+URL canonicalization and a persistent index of curated resources, so the same
+page is recognized across lists and plans and known-good resources can be
+reused without searching.
+"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from src.config import config
+from src.metrics import record_cache_lookup
+from src.models import LearningMaterial, Resource
+from src.similarity import canonical_topic
+
+
+RESOURCE_CATEGORIES = ("videos", "articles", "exercises")
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "ref", "ref_src", "ref_url", "referrer", "source", "si", "feature", "_hsenc", "_hsmi",
+})
+YOUTUBE_HOSTS = frozenset({"youtube.com", "m.youtube.com", "music.youtube.com", "youtube-nocookie.com"})
+
+
+def canonical_url(url: str) -> str:
+    """
+    Normalize a URL so different spellings of the same page compare equal.
+
+    Lower-cases the scheme and host, treats http as https, drops "www.",
+    default ports, fragments, tracking parameters and trailing slashes, sorts
+    the remaining query parameters, and rewrites YouTube links (youtu.be,
+    /shorts/, /embed/, playlist positions) to `youtube.com/watch?v=<id>`.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https"):
+        return url.strip()
+
+    try:
+        port = parts.port
+    except ValueError:
+        return url.strip()
+    port = port if port not in (None, 80, 443) else None
+    host = (parts.hostname or "").lower().rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    path = parts.path or "/"
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    ]
+
+    video_id = None
+    if host == "youtu.be":
+        video_id = path.strip("/").split("/")[0]
+    elif host in YOUTUBE_HOSTS:
+        segments = path.strip("/").split("/")
+        if segments[0] == "watch":
+            video_id = dict(query).get("v")
+        elif segments[0] in ("shorts", "embed", "live", "v") and len(segments) > 1:
+            video_id = segments[1]
+    if video_id:
+        return f"https://youtube.com/watch?v={video_id}"
+
+    if len(path) > 1:
+        path = path.rstrip("/")
+    netloc = f"{host}:{port}" if port else host
+    return urlunsplit(("https", netloc, path, urlencode(sorted(query)), ""))
+
+
+def dedupe_materials(materials: LearningMaterial) -> LearningMaterial:
+    """
+    Drop resources whose canonical URL already appeared earlier in the
+    materials (videos first, then articles, then exercises).
+    """
+    seen = set()
+    update = {}
+    for category in RESOURCE_CATEGORIES:
+        kept = []
+        for resource in getattr(materials, category):
+            key = canonical_url(resource.url)
+            if key not in seen:
+                seen.add(key)
+                kept.append(resource)
+        update[category] = kept
+    if all(len(update[c]) == len(getattr(materials, c)) for c in RESOURCE_CATEGORIES):
+        return materials
+    return materials.model_copy(update=update)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    canonical_url TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    category TEXT NOT NULL,
+    ok INTEGER,
+    last_validated REAL,
+    last_seen REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS resource_topics (
+    topic TEXT NOT NULL,
+    expertise_level TEXT NOT NULL,
+    category TEXT NOT NULL,
+    canonical_url TEXT NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (topic, expertise_level, category, canonical_url)
+) WITHOUT ROWID;
+"""
+
+
+class ResourceIndex:
+    """
+    Persistent index of curated resources keyed by canonical URL, with the
+    topics and levels each was curated for and its last link-check result.
+
+    Lookups by URL hit the primary key (or an in-memory LRU front), so they
+    stay fast however many resources are indexed.
+    """
+
+    def __init__(self, path: str = "resources.db", memory_items: int = 10000):
+        """
+        Open (or create) the index.
+
+        Args:
+            path: SQLite database file, or ":memory:" for a throwaway index
+            memory_items: Size of the in-memory LRU front for URL lookups
+        """
+        self.path = path
+        self.memory_items = memory_items
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the indexed entry for any spelling of `url`, or None."""
+        key = canonical_url(url)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                record_cache_lookup("resources", True)
+                return entry
+            row = self._conn.execute(
+                "SELECT * FROM resources WHERE canonical_url = ?", (key,)
+            ).fetchone()
+            if row is None:
+                record_cache_lookup("resources", False)
+                return None
+            entry = self._remember(dict(row))
+        record_cache_lookup("resources", True)
+        return entry
+
+    def _remember(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        self._memory[entry["canonical_url"]] = entry
+        self._memory.move_to_end(entry["canonical_url"])
+        if len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+        return entry
+
+    def add_materials(
+        self,
+        materials: LearningMaterial,
+        statuses: Optional[Dict[str, bool]] = None
+    ) -> int:
+        """
+        Index every resource in `materials` under its topic and level.
+
+        Args:
+            materials: Curated learning materials
+            statuses: Optional link-check results by URL (True if reachable);
+                URLs in here that are not part of `materials` are updated too
+
+        Returns:
+            Number of resources indexed
+        """
+        now = time.time()
+        statuses = statuses or {}
+        topic = canonical_topic(materials.topic)
+        level = materials.expertise_level.lower()
+        rows, links = [], []
+        for category in RESOURCE_CATEGORIES:
+            for resource in getattr(materials, category):
+                key = canonical_url(resource.url)
+                ok = statuses.get(resource.url)
+                rows.append((key, resource.url, resource.title, resource.description, category,
+                             None if ok is None else int(ok), now if ok is not None else None, now))
+                links.append((topic, level, category, key, now))
+        checked = [(int(ok), now, canonical_url(url)) for url, ok in statuses.items()]
+
+        with self._lock, self._conn:
+            # Keep the previous link-check result when this run did not check the URL
+            self._conn.executemany(
+                "INSERT INTO resources "
+                "(canonical_url, url, title, description, category, ok, last_validated, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (canonical_url) DO UPDATE SET "
+                "url = excluded.url, title = excluded.title, description = excluded.description, "
+                "category = excluded.category, last_seen = excluded.last_seen, "
+                "ok = COALESCE(excluded.ok, ok), "
+                "last_validated = COALESCE(excluded.last_validated, last_validated)",
+                rows
+            )
+            self._conn.executemany(
+                "UPDATE resources SET ok = ?, last_validated = ? WHERE canonical_url = ?", checked
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO resource_topics "
+                "(topic, expertise_level, category, canonical_url, last_seen) VALUES (?, ?, ?, ?, ?)",
+                links
+            )
+            for key in {row[0] for row in rows} | {row[2] for row in checked}:
+                self._memory.pop(key, None)
+        return len(rows)
+
+    def candidates(
+        self,
+        topic: str,
+        expertise_level: str,
+        limit: int,
+        max_age: Optional[float] = None,
+        require_validated: bool = True
+    ) -> Dict[str, List[Resource]]:
+        """
+        Known-good resources previously curated for this topic and level.
+
+        Args:
+            topic: Topic in any phrasing (matched by its canonical form)
+            expertise_level: Expertise level
+            limit: Maximum resources per category
+            max_age: Only resources curated (and, if validated, checked) within this many seconds
+            require_validated: Only resources whose last link check succeeded;
+                otherwise unchecked resources qualify too
+
+        Returns:
+            Mapping of category (videos/articles/exercises) to resources, most recent first
+        """
+        since = time.time() - max_age if max_age is not None else 0.0
+        ok_clause = "r.ok = 1 AND r.last_validated >= ?" if require_validated else \
+            "(r.ok IS NULL OR (r.ok = 1 AND r.last_validated >= ?))"
+        found = {}
+        with self._lock:
+            for category in RESOURCE_CATEGORIES:
+                rows = self._conn.execute(
+                    "SELECT r.url, r.title, r.description FROM resource_topics t "
+                    "JOIN resources r ON r.canonical_url = t.canonical_url "
+                    f"WHERE t.topic = ? AND t.expertise_level = ? AND t.category = ? "
+                    f"AND t.last_seen >= ? AND {ok_clause} "
+                    "ORDER BY t.last_seen DESC LIMIT ?",
+                    (canonical_topic(topic), expertise_level.lower(), category, since, since, limit)
+                ).fetchall()
+                found[category] = [
+                    Resource(title=row["title"], url=row["url"], description=row["description"],
+                             resource_type=category[:-1])
+                    for row in rows
+                ]
+        return found
+
+    def count(self) -> int:
+        """Number of distinct resources indexed."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM resources").fetchone()[0]
+
+    def close(self):
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def open_default_resource_index() -> Optional[ResourceIndex]:
+    """Open the index at `RESOURCE_INDEX_PATH`, or return None if it is disabled."""
+    return ResourceIndex(config.resource_index_path) if config.resource_index_path else None
@@ -0,0 +1,241 @@
+"""
+Spaced-repetition review of generated quiz questions.
+
+Questions from stored plans become review cards per learner, scheduled with
+SM-2: each review's quality (0-5) updates the card's ease factor and
+interval, and the card comes due again after that interval. Cards live in
+SQLite with an index on (learner_id, due), so fetching a learner's next due
+cards is an index seek rather than a scan however many cards exist, and the
+daily backlog of overdue cards is rescheduled with set-based SQL.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from src.config import config
+from src.models import QuizQuestion
+from src.plan_store import normalize_topic
+from src.serialization import dumps
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    learner_id TEXT NOT NULL,
+    card_id TEXT NOT NULL,
+    plan_id TEXT,
+    topic TEXT NOT NULL,
+    question TEXT NOT NULL,
+    ease REAL NOT NULL DEFAULT 2.5,
+    interval_days REAL NOT NULL DEFAULT 0,
+    repetitions INTEGER NOT NULL DEFAULT 0,
+    lapses INTEGER NOT NULL DEFAULT 0,
+    due REAL NOT NULL,
+    last_reviewed REAL,
+    PRIMARY KEY (learner_id, card_id)
+);
+CREATE INDEX IF NOT EXISTS idx_cards_learner_due ON cards (learner_id, due);
+"""
+
+DAY = 86400.0
+MIN_EASE = 1.3
+
+# Review quality when a card is answered by picking an option
+CORRECT_QUALITY = 4
+WRONG_QUALITY = 1
+
+
+def card_id(question: QuizQuestion) -> str:
+    """Stable id of the card for a question (same wording, same card)."""
+    return hashlib.sha1(normalize_topic(question.question).encode("utf-8")).hexdigest()[:16]
+
+
+def sm2(ease: float, interval_days: float, repetitions: int, quality: int):
+    """
+    One SM-2 step.
+
+    Args:
+        ease: Current ease factor
+        interval_days: Current interval
+        repetitions: Successful reviews in a row so far
+        quality: Review quality from 0 (blackout) to 5 (perfect)
+
+    Returns:
+        Tuple of (ease, interval_days, repetitions, lapsed)
+    """
+    if not 0 <= quality <= 5:
+        raise ValueError("Review quality must be between 0 and 5")
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    if quality < 3:
+        return ease, 1.0, 0, True
+    repetitions += 1
+    if repetitions == 1:
+        interval_days = 1.0
+    elif repetitions == 2:
+        interval_days = 6.0
+    else:
+        interval_days = round(interval_days * ease)
+    return ease, interval_days, repetitions, False
+
+
+class ReviewScheduler:
+    """
+    Persistent per-learner review queue over quiz questions, scheduled with SM-2.
+    """
+
+    def __init__(self, path: str = "reviews.db"):
+        """
+        Open (or create) the scheduler's database.
+
+        Args:
+            path: SQLite database file, or ":memory:" for a throwaway queue
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def enroll(self, learner_id: str, plan: Dict[str, Any], now: Optional[float] = None) -> int:
+        """
+        Turn a plan's quiz questions into cards for a learner, due immediately.
+        Questions the learner already has cards for are left as they are.
+
+        Args:
+            learner_id: Learner to enroll
+            plan: A plan from `EducationCrew.run` or the plan store
+
+        Returns:
+            Number of new cards
+        """
+        now = time.time() if now is None else now
+        rows = [
+            (learner_id, card_id(question), plan.get("plan_id"), plan["topic"],
+             dumps(question).decode("utf-8"), now)
+            for question in plan["quiz"].questions
+        ]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO cards (learner_id, card_id, plan_id, topic, question, due) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            return self._conn.total_changes - before
+
+    def due(self, learner_id: str, limit: int = 20, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """The learner's next `limit` due cards, most overdue first, with their questions."""
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM cards WHERE learner_id = ? AND due <= ? ORDER BY due LIMIT ?",
+                (learner_id, now, limit)
+            ).fetchall()
+        return [{**dict(row), "question": QuizQuestion.model_validate_json(row["question"])}
+                for row in rows]
+
+    def review(self, learner_id: str, card: str, quality: int,
+               now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Record a review of one card and schedule its next one.
+
+        Args:
+            learner_id: Learner who reviewed
+            card: Card id
+            quality: 0 (blackout) to 5 (perfect); below 3 counts as a lapse
+
+        Returns:
+            The card's new ease, interval (days) and due time
+        """
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT ease, interval_days, repetitions FROM cards "
+                "WHERE learner_id = ? AND card_id = ?",
+                (learner_id, card)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"No card {card} for learner {learner_id}")
+            ease, interval_days, repetitions, lapsed = sm2(
+                row["ease"], row["interval_days"], row["repetitions"], quality
+            )
+            due = now + interval_days * DAY
+            self._conn.execute(
+                "UPDATE cards SET ease = ?, interval_days = ?, repetitions = ?, "
+                "lapses = lapses + ?, due = ?, last_reviewed = ? "
+                "WHERE learner_id = ? AND card_id = ?",
+                (ease, interval_days, repetitions, int(lapsed), due, now, learner_id, card)
+            )
+        return {"ease": ease, "interval_days": interval_days, "due": due, "lapsed": lapsed}
+
+    def answer(self, learner_id: str, card: Dict[str, Any], option: str,
+               now: Optional[float] = None) -> bool:
+        """Review a card from a multiple-choice answer; returns whether it was correct."""
+        correct = option.strip().upper()[:1] == card["question"].correct_answer.strip().upper()[:1]
+        self.review(learner_id, card["card_id"], CORRECT_QUALITY if correct else WRONG_QUALITY, now)
+        return correct
+
+    def reschedule_overdue(self, max_per_day: int = 50, now: Optional[float] = None,
+                           learner_id: Optional[str] = None) -> int:
+        """
+        Spread each learner's backlog of overdue cards over the coming days so
+        no day has more than `max_per_day` of them, most overdue first. Meant
+        to run daily; it is one set-based pass however many cards there are.
+
+        Args:
+            max_per_day: Overdue cards left due per learner per day
+            learner_id: Only this learner (default: everyone)
+
+        Returns:
+            Number of cards moved
+        """
+        now = time.time() if now is None else now
+        where, params = "due <= ?", [now]
+        if learner_id is not None:
+            where += " AND learner_id = ?"
+            params.append(learner_id)
+        with self._lock, self._conn:
+            self._conn.execute("DROP TABLE IF EXISTS temp.backlog")
+            self._conn.execute(
+                "CREATE TEMP TABLE backlog (card_rowid INTEGER PRIMARY KEY, new_due REAL NOT NULL)"
+            )
+            # Day k holds overdue cards ranked k * max_per_day .. (k + 1) * max_per_day - 1
+            self._conn.execute(
+                "INSERT INTO temp.backlog (card_rowid, new_due) "
+                "SELECT rowid, ? + ((rank - 1) / ?) * ? FROM ("
+                "  SELECT rowid, ROW_NUMBER() OVER (PARTITION BY learner_id ORDER BY due) AS rank "
+                f"  FROM cards WHERE {where}"
+                ") WHERE rank > ?",
+                [now, max_per_day, DAY] + params + [max_per_day]
+            )
+            moved = self._conn.execute(
+                "UPDATE cards SET due = (SELECT new_due FROM temp.backlog WHERE card_rowid = cards.rowid) "
+                "WHERE rowid IN (SELECT card_rowid FROM temp.backlog)"
+            ).rowcount
+            self._conn.execute("DROP TABLE temp.backlog")
+        return moved
+
+    def stats(self, learner_id: str, now: Optional[float] = None) -> Dict[str, int]:
+        """Card counts for a learner: total, due now, due within a day, and new (never reviewed)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*), SUM(due <= ?), SUM(due <= ?), SUM(last_reviewed IS NULL) "
+                "FROM cards WHERE learner_id = ?",
+                (now, now + DAY, learner_id)
+            ).fetchone()
+        return {"cards": row[0], "due": row[1] or 0, "due_today": row[2] or 0, "new": row[3] or 0}
+
+    def close(self):
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def open_default_scheduler() -> Optional[ReviewScheduler]:
+    """Open the scheduler at `REVIEW_DB_PATH`, or return None if it is disabled."""
+    return ReviewScheduler(config.review_db_path) if config.review_db_path else None
@@ -0,0 +1,298 @@
+"""
+Adaptive routing of LLM calls across the configured providers and models.
+
+Every (provider, model) endpoint keeps exponentially weighted moving averages
+of its call latency and error rate, and its provider's rate limiter reports
+the headroom left. Each call is routed on those numbers: structured stages
+that any of the models handles well (quiz and project JSON by default) go to
+the endpoint expected to answer soonest, while other stages stay on the
+primary provider as long as it is healthy. An endpoint that keeps failing is
+skipped until its error rate decays, and one that was rate limited until its
+cool-down ends, so traffic moves away from a degraded provider by itself and
+comes back once it recovers.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from src.config import RunConfig, config
+from src.metrics import ROUTED_CALLS
+from src.rate_limit import limiter_for
+
+
+# Task output models and the plan stage whose calls produce them
+STAGE_MODELS = {
+    "LearningMaterial": "materials",
+    "Quiz": "quiz",
+    "QuizExtension": "quiz",
+    "ProjectSuggestions": "projects",
+}
+
+# Error rates are capped here when estimating the time to a successful answer
+MAX_EXPECTED_ERROR = 0.9
+
+
+class Endpoint(NamedTuple):
+    """A model served by a provider."""
+    provider: str
+    model: str
+
+
+class EndpointStats:
+    """
+    EWMA error rate of one endpoint and its EWMA latency per stage (a quiz
+    takes longer to write than a short answer), shared by every router in the
+    process.
+    """
+
+    def __init__(self, alpha: float, half_life: float):
+        """
+        Args:
+            alpha: Weight of the newest call in the moving averages
+            half_life: Seconds for the error rate to halve while the endpoint is idle
+        """
+        self.alpha = alpha
+        self.half_life = half_life
+        self.latency: Dict[str, float] = {}
+        self.calls = 0
+        self.errors = 0
+        self.cooldown_until = 0.0
+        self._error_rate = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def error_rate(self, now: Optional[float] = None) -> float:
+        """Current error rate, decayed for the time since the last call."""
+        now = time.monotonic() if now is None else now
+        idle = max(0.0, now - self._updated)
+        return self._error_rate * 0.5 ** (idle / self.half_life) if self.half_life > 0 \
+            else self._error_rate
+
+    def record(self, stage: str, seconds: float, ok: bool, cooldown: float = 0.0):
+        """Fold one call into the averages; `cooldown` benches the endpoint for that long."""
+        now = time.monotonic()
+        with self._lock:
+            error = self.error_rate(now)
+            self._error_rate = error + self.alpha * ((0.0 if ok else 1.0) - error)
+            self._updated = now
+            self.calls += 1
+            if ok:
+                # Failed calls say little about how fast answers come back
+                latency = self.latency.get(stage)
+                self.latency[stage] = seconds if latency is None \
+                    else latency + self.alpha * (seconds - latency)
+            else:
+                self.errors += 1
+            if cooldown:
+                self.cooldown_until = max(self.cooldown_until, now + cooldown)
+
+
+_stats: Dict[Endpoint, EndpointStats] = {}
+_stats_lock = threading.Lock()
+
+
+def stats_for(endpoint: Endpoint) -> EndpointStats:
+    """Process-wide statistics of `endpoint`."""
+    with _stats_lock:
+        stats = _stats.get(endpoint)
+        if stats is None:
+            stats = _stats[endpoint] = EndpointStats(config.router_ewma_alpha,
+                                                     config.router_error_half_life_seconds)
+        return stats
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Whether a provider error is a rate-limit rejection (HTTP 429)."""
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    return status == 429 or "RateLimit" in type(error).__name__ or "429" in str(error)[:200]
+
+
+def stage_of(from_task: Any = None, response_model: Optional[type] = None) -> str:
+    """The plan stage a call belongs to, from its task's output model ("other" if unknown)."""
+    model = response_model or getattr(from_task, "output_pydantic", None)
+    return STAGE_MODELS.get(getattr(model, "__name__", ""), "other")
+
+
+class AdaptiveRouter:
+    """Chooses an endpoint for each LLM call from the endpoints' observed health."""
+
+    def __init__(
+        self,
+        endpoints: Iterable[Endpoint],
+        primary: Endpoint,
+        fast_stages: Iterable[str] = ("quiz", "projects"),
+        max_error_rate: float = 0.5,
+        cooldown_seconds: float = 30.0,
+        run_config: Optional[RunConfig] = None
+    ):
+        """
+        Args:
+            endpoints: Endpoints calls may go to
+            primary: Endpoint of the requested provider; stages not in
+                `fast_stages` stay on it while it is healthy
+            fast_stages: Stages sent to whichever healthy endpoint is expected to
+                answer soonest
+            max_error_rate: Error rate above which an endpoint counts as unhealthy
+            cooldown_seconds: Seconds an endpoint is skipped after a rate-limit error
+            run_config: Settings whose rate limiters report each provider's headroom
+        """
+        self.endpoints = list(dict.fromkeys([primary, *endpoints]))
+        self.primary = primary
+        self.fast_stages = frozenset(fast_stages)
+        self.max_error_rate = max_error_rate
+        self.cooldown_seconds = cooldown_seconds
+        self.run_config = run_config or config.run_config()
+
+    def expected_seconds(self, endpoint: Endpoint, stage: str,
+                         now: Optional[float] = None) -> float:
+        """
+        Expected seconds until `endpoint` returns a good answer for `stage`: its
+        average latency stretched by its error rate (failed calls are retried),
+        plus any wait for its rate limit. An endpoint not yet measured on the
+        stage counts as instant, so each gets tried.
+        """
+        stats = stats_for(endpoint)
+        latency = stats.latency.get(stage, 0.0)
+        error = min(stats.error_rate(now), MAX_EXPECTED_ERROR)
+        return latency / (1 - error) + limiter_for(endpoint.provider, self.run_config).wait_seconds()
+
+    def healthy(self, endpoint: Endpoint, now: Optional[float] = None) -> bool:
+        """Not cooling down after a rate limit, and failing less than `max_error_rate` of calls."""
+        now = time.monotonic() if now is None else now
+        stats = stats_for(endpoint)
+        return stats.cooldown_until <= now and stats.error_rate(now) < self.max_error_rate
+
+    def choose(self, stage: str,
+               exclude: Iterable[Endpoint] = ()) -> Tuple[Optional[Endpoint], str]:
+        """
+        Pick the endpoint for a call.
+
+        Args:
+            stage: Plan stage of the call (see `stage_of`)
+            exclude: Endpoints not to use (e.g. one that just failed this call)
+
+        Returns:
+            Tuple of (endpoint, reason); the endpoint is None if all are excluded
+        """
+        now = time.monotonic()
+        candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+        if not candidates:
+            return None, "exhausted"
+        healthy = [endpoint for endpoint in candidates if self.healthy(endpoint, now)]
+        if stage not in self.fast_stages and self.primary in healthy:
+            return self.primary, "primary"
+        if healthy:
+            best = min(healthy, key=lambda endpoint: self.expected_seconds(endpoint, stage, now))
+            return best, "fastest" if stage in self.fast_stages else "failover"
+        # Nothing is healthy: whichever comes off its cool-down first, then the least failing
+        best = min(candidates, key=lambda endpoint: (stats_for(endpoint).cooldown_until,
+                                                     stats_for(endpoint).error_rate(now)))
+        return best, "least_unhealthy"
+
+    def record(self, endpoint: Endpoint, stage: str, seconds: float,
+               error: Optional[BaseException] = None):
+        """Record the outcome of a call routed to `endpoint`."""
+        cooldown = self.cooldown_seconds if error is not None and is_rate_limited(error) else 0.0
+        stats_for(endpoint).record(stage, seconds, error is None, cooldown)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Current statistics of every endpoint, primary first."""
+        now = time.monotonic()
+        rows = []
+        for endpoint in self.endpoints:
+            stats = stats_for(endpoint)
+            rows.append({
+                "provider": endpoint.provider,
+                "model": endpoint.model,
+                "primary": endpoint == self.primary,
+                "healthy": self.healthy(endpoint, now),
+                "latency_seconds": {stage: round(seconds, 3)
+                                    for stage, seconds in stats.latency.items()},
+                "error_rate": round(stats.error_rate(now), 3),
+                "headroom": round(limiter_for(endpoint.provider, self.run_config).headroom(), 3),
+                "cooldown_seconds": round(max(0.0, stats.cooldown_until - now), 1),
+                "calls": stats.calls,
+                "errors": stats.errors,
+            })
+        return rows
+
+
+def configured_endpoints(primary_provider: str, run_config: RunConfig) -> List[Endpoint]:
+    """
+    Endpoints for the OpenRouter and Groq models of `run_config`. Providers
+    without an API key are left out unless they are the primary; the fake
+    provider is only ever routed to itself.
+    """
+    if primary_provider == "fake":
+        return [Endpoint("fake", run_config.get_llm_config("fake")["model"])]
+    endpoints = []
+    for provider in ("openrouter", "groq"):
+        if provider != primary_provider and not run_config.credential(provider):
+            continue
+        for model in run_config.models(provider):
+            endpoints.append(Endpoint(provider, run_config.get_llm_config(provider, model)["model"]))
+    return endpoints
+
+
+def build_router(primary_provider: str,
+                 run_config: Optional[RunConfig] = None) -> Optional[AdaptiveRouter]:
+    """Router over the endpoints of `run_config`, or None if routing is off."""
+    run_config = run_config or config.run_config()
+    if run_config.llm_routing != "adaptive":
+        return None
+    primary = Endpoint(primary_provider, run_config.get_llm_config(primary_provider)["model"])
+    return AdaptiveRouter(
+        configured_endpoints(primary_provider, run_config),
+        primary,
+        fast_stages=run_config.router_fast_stages,
+        max_error_rate=run_config.router_max_error_rate,
+        cooldown_seconds=run_config.router_cooldown_seconds,
+        run_config=run_config
+    )
+
+
+_decisions: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("routing_decisions",
+                                                                    default=None)
+
+
+@contextmanager
+def record_routing(decisions: Optional[List[Dict[str, Any]]] = None):
+    """
+    Collect the routing decisions of the LLM calls made inside the block (in
+    this thread) into a list, appending to `decisions` if given.
+    """
+    decisions = [] if decisions is None else decisions
+    token = _decisions.set(decisions)
+    try:
+        yield decisions
+    finally:
+        _decisions.reset(token)
+
+
+def log_decision(stage: str, endpoint: Endpoint, reason: str, seconds: float, outcome: str):
+    """Count a routed call and add it to the active decision list, if any."""
+    ROUTED_CALLS.labels(stage, endpoint.provider, reason).inc()
+    decisions = _decisions.get()
+    if decisions is not None:
+        decisions.append({
+            "stage": stage,
+            "provider": endpoint.provider,
+            "model": endpoint.model,
+            "reason": reason,
+            "seconds": round(seconds, 3),
+            "outcome": outcome,
+        })
+
+
+def routing_summary(decisions: List[Dict[str, Any]],
+                    router: Optional[AdaptiveRouter]) -> Optional[Dict[str, Any]]:
+    """The `routing` entry of a run result: decisions, calls per endpoint and endpoint health."""
+    if router is None:
+        return None
+    calls: Dict[str, int] = {}
+    for decision in decisions:
+        name = f"{decision['provider']}:{decision['model']}"
+        calls[name] = calls.get(name, 0) + 1
+    return {"calls": calls, "decisions": decisions, "endpoints": router.snapshot()}
@@ -0,0 +1,76 @@
+"""
+Serialization for plans and cached values.
+
+JSON is encoded with orjson when it is installed (the stdlib otherwise) and
+models with pydantic's `model_dump_json`. Models are still rebuilt with
+`model_validate`: pydantic's Rust validator is faster than `model_construct`,
+so skipping validation would not pay. msgpack is available as a compact
+binary format when the `msgpack` package is installed.
+"""
+import json
+from typing import Any
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional format
+    msgpack = None
+
+
+FORMATS = ("json", "msgpack")
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Encode a JSON-compatible value (pydantic models allowed) as compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False,
+                      default=_default).encode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    """Decode JSON from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_model(model: BaseModel) -> bytes:
+    """Encode one model as compact JSON via pydantic's Rust serializer."""
+    return model.model_dump_json().encode("utf-8")
+
+
+def pack(value: Any) -> bytes:
+    """Encode a value as msgpack (needs the optional `msgpack` package)."""
+    if msgpack is None:
+        raise ImportError("The msgpack format needs msgpack: pip install msgpack")
+    return msgpack.packb(value, default=_default, use_bin_type=True)
+
+
+def unpack(data: bytes) -> Any:
+    """Decode msgpack produced by `pack`."""
+    if msgpack is None:
+        raise ImportError("The msgpack format needs msgpack: pip install msgpack")
+    return msgpack.unpackb(data, raw=False)
+
+
+def encode(value: Any, fmt: str = "json") -> bytes:
+    """Encode with the named format ("json" or "msgpack")."""
+    return pack(value) if fmt == "msgpack" else dumps(value)
+
+
+def decode(data: bytes, fmt: str = "json") -> Any:
+    """Decode data written by `encode` with the same format."""
+    return unpack(data) if fmt == "msgpack" else loads(data)
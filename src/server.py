@@ -0,0 +1,583 @@
+"""
+Asynchronous HTTP API over `EducationCrew`, on the standard library alone.
+
+    POST /plans                submit a plan request; 202 with its job id
+    GET  /plans/<id>           job status
+    GET  /plans/<id>/result    the plan once the job has finished (?wait=SECONDS long-polls)
+    GET  /plans/<id>/events    server-sent events: queued, started, stages, finished
+    GET  /healthz              liveness, workers and queue depth
+    GET  /metrics              Prometheus metrics
+
+Jobs run on a bounded pool of worker threads. A request identical to one
+that is still queued or running (same topic, level, sizes, provider and
+settings) joins that job instead of starting another, and finished topics
+are served from the plan store through the crew's plan cache. Once
+`max_queue` jobs are waiting, submissions are turned away with 429 and a
+Retry-After estimate.
+"""
+import asyncio
+import math
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from http import HTTPStatus
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from src.config import RunConfig, config
+from src.crew import EXPERTISE_LEVELS, EducationCrew
+from src.metrics import API_JOBS, API_QUEUE_DEPTH, API_QUEUE_SECONDS, API_REQUESTS, metrics
+from src.plan_store import PlanStore
+from src.profiling import Profiler
+from src.question_bank import QuestionBank
+from src.resources import ResourceIndex
+from src.serialization import dumps, loads
+from src.similarity import TopicIndex, canonical_topic
+
+
+LLM_PROVIDERS = ("openrouter", "groq", "fake")
+
+# RunConfig settings a request may override, with their checks; API keys stay server-side
+REQUEST_OVERRIDES = {
+    "openrouter_model": lambda value: isinstance(value, str) and 0 < len(value) <= 200,
+    "groq_model": lambda value: isinstance(value, str) and 0 < len(value) <= 200,
+    "search_provider": lambda value: value in ("serper", "fake"),
+    "fake_llm_latency": lambda value: isinstance(value, (int, float)) and 0 <= value <= 60,
+    "fake_search_latency": lambda value: isinstance(value, (int, float)) and 0 <= value <= 60,
+}
+
+# Largest accepted request head and body
+MAX_HEAD_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+
+# Longest long-poll on a result, and the keep-alive interval of event streams
+MAX_WAIT_SECONDS = 300.0
+HEARTBEAT_SECONDS = 15.0
+
+TERMINAL_EVENTS = ("succeeded", "failed")
+
+
+class RequestError(ValueError):
+    """A request the API cannot accept; answered with `status`."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class QueueFull(Exception):
+    """Too many jobs are waiting; the client should retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Queue is full; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def parse_plan_request(body: Any, default_provider: str) -> Dict[str, Any]:
+    """
+    Validate a submitted plan request and fill in the defaults.
+
+    Args:
+        body: Decoded JSON body: `topic` plus optional `expertise_level`, `llm`,
+            `resources_per_category`, `num_questions`, `num_projects`,
+            `use_cache` and `config` (overrides of `REQUEST_OVERRIDES`)
+        default_provider: LLM provider used when `llm` is not given
+
+    Returns:
+        The normalized request
+    """
+    if not isinstance(body, dict):
+        raise RequestError("Body must be a JSON object")
+    topic = body.get("topic")
+    if not isinstance(topic, str) or not topic.strip() or len(topic) > 200:
+        raise RequestError("'topic' must be a non-empty string of at most 200 characters")
+    level = str(body.get("expertise_level", "beginner")).lower()
+    if level not in EXPERTISE_LEVELS:
+        raise RequestError(f"'expertise_level' must be one of: {', '.join(EXPERTISE_LEVELS)}")
+    provider = body.get("llm", default_provider)
+    if provider not in LLM_PROVIDERS:
+        raise RequestError(f"'llm' must be one of: {', '.join(LLM_PROVIDERS)}")
+
+    request = {"topic": topic.strip(), "expertise_level": level, "llm": provider}
+    for name, default in (("resources_per_category", config.default_resources_per_category),
+                          ("num_questions", config.default_quiz_questions),
+                          ("num_projects", config.default_project_count)):
+        value = body.get(name, default)
+        if not isinstance(value, int) or isinstance(value, bool) or not 1 <= value <= 20:
+            raise RequestError(f"'{name}' must be an integer from 1 to 20")
+        request[name] = value
+    request["use_cache"] = body.get("use_cache", True)
+    if not isinstance(request["use_cache"], bool):
+        raise RequestError("'use_cache' must be true or false")
+
+    overrides = body.get("config") or {}
+    if not isinstance(overrides, dict):
+        raise RequestError("'config' must be a JSON object")
+    for name, value in overrides.items():
+        check = REQUEST_OVERRIDES.get(name)
+        if check is None:
+            raise RequestError(f"'config' may only set: {', '.join(REQUEST_OVERRIDES)}")
+        if not check(value):
+            raise RequestError(f"Invalid value for config '{name}'")
+    request["config"] = dict(overrides)
+    return request
+
+
+def result_payload(result: Dict[str, Any]) -> Dict[str, Any]:
+    """A crew result as returned by the API (everything but the raw CrewAI output)."""
+    return {key: value for key, value in result.items() if key != "raw_output"}
+
+
+class StageEvents(Profiler):
+    """Profiler that reports each stage of a crew run as it starts and finishes."""
+
+    kind = "events"
+
+    def __init__(self, emit: Callable[[Dict[str, Any]], None]):
+        super().__init__()
+        self.emit = emit
+
+    def _enter(self, name: str):
+        self.emit({"event": "stage", "stage": name, "state": "started"})
+
+    def _exit(self, name: str):
+        self.emit({"event": "stage", "stage": name, "state": "finished",
+                   "seconds": round(self.timings[name], 3)})
+
+
+class Job:
+    """
+    One plan request and the events it has produced. Only touched from the
+    event loop's thread; workers hand it events with `call_soon_threadsafe`.
+    """
+
+    def __init__(self, request: Dict[str, Any], key: Tuple, run_config: RunConfig):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.key = key
+        self.run_config = run_config
+        self.status = "queued"
+        self.stage: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.coalesced = 0
+        self.events: List[Dict[str, Any]] = []
+        self.subscribers: List[asyncio.Queue] = []
+        self.done = asyncio.Event()
+
+    def publish(self, event: Dict[str, Any]):
+        """Apply an event to the job's status and pass it to every subscriber."""
+        event = {**event, "time": round(time.time(), 3)}
+        name = event["event"]
+        if name == "started":
+            self.status, self.started_at = "running", event["time"]
+        elif name == "stage":
+            self.stage = event["stage"]
+        elif name in TERMINAL_EVENTS:
+            self.status, self.finished_at = name, event["time"]
+            self.error = event.get("error")
+        self.events.append(event)
+        for queue in self.subscribers:
+            queue.put_nowait(event)
+        if name in TERMINAL_EVENTS:
+            self.done.set()
+
+    def view(self) -> Dict[str, Any]:
+        """Status of the job, as returned by the API."""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "topic": self.request["topic"],
+            "expertise_level": self.request["expertise_level"],
+            "llm": self.request["llm"],
+            "coalesced_requests": self.coalesced,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+
+class PlanService:
+    """Queue of plan jobs run by a bounded pool of crew workers."""
+
+    def __init__(
+        self,
+        plan_store: Optional[PlanStore] = None,
+        topic_index: Optional[TopicIndex] = None,
+        resource_index: Optional[ResourceIndex] = None,
+        question_bank: Optional[QuestionBank] = None,
+        llm_provider: str = "openrouter",
+        workers: int = 4,
+        max_queue: int = 32,
+        job_ttl: float = 3600.0,
+        run_config: Optional[RunConfig] = None
+    ):
+        """
+        Args:
+            plan_store: Store that plans are saved to and served from
+            topic_index: Similarity index over `plan_store` (the plan cache)
+            resource_index: Optional index that curated resources are recorded in
+            question_bank: Optional bank that quizzes are assembled from and added to
+            llm_provider: LLM provider of requests that do not name one
+            workers: Crew runs in flight at once
+            max_queue: Waiting jobs beyond which submissions are rejected
+            job_ttl: Seconds a finished job stays queryable
+            run_config: Settings that request overrides apply to (default: the environment's)
+        """
+        self.plan_store = plan_store
+        self.topic_index = topic_index
+        self.resource_index = resource_index
+        self.question_bank = question_bank
+        self.llm_provider = llm_provider
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.job_ttl = job_ttl
+        self.run_config = run_config or config.run_config()
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        # Finished jobs in the order they finished, for expiry
+        self._finished: Deque[Job] = deque()
+        self.active: Dict[Tuple, Job] = {}
+        self.running = 0
+        self.job_seconds: Optional[float] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def started(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        """Start the workers on the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix="plan-worker")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop taking jobs; runs in progress are abandoned."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, request: Dict[str, Any]) -> Tuple[Job, bool]:
+        """
+        Queue a request from `parse_plan_request`.
+
+        Returns:
+            Tuple of (job, coalesced); `coalesced` is True when the request joined
+            an identical job that was already queued or running
+
+        Raises:
+            QueueFull: If `max_queue` jobs are already waiting
+        """
+        run_config = self.run_config.replace(**request["config"]) if request["config"] \
+            else self.run_config
+        key = (canonical_topic(request["topic"]), request["expertise_level"], request["llm"],
+               request["resources_per_category"], request["num_questions"],
+               request["num_projects"], request["use_cache"], run_config.key)
+        job = self.active.get(key)
+        if job is not None:
+            job.coalesced += 1
+            API_JOBS.labels("coalesced").inc()
+            return job, True
+        if self.queue.qsize() >= self.max_queue:
+            API_JOBS.labels("rejected").inc()
+            raise QueueFull(self.retry_after())
+
+        self._expire()
+        job = Job(request, key, run_config)
+        self.jobs[job.id] = job
+        self.active[key] = job
+        job.publish({"event": "queued", "position": self.queue.qsize() + 1})
+        self.queue.put_nowait(job)
+        API_QUEUE_DEPTH.set(self.queue.qsize())
+        API_JOBS.labels("accepted").inc()
+        return job, False
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is expected to free up, from the average run time."""
+        seconds = self.job_seconds if self.job_seconds is not None else 10.0
+        excess = self.queue.qsize() - self.max_queue + 1
+        return max(1, math.ceil(seconds * excess / self.workers))
+
+    def health(self) -> Dict[str, Any]:
+        """Worker and queue figures for `/healthz`."""
+        return {
+            "status": "ok" if self.started else "stopped",
+            "workers": self.workers,
+            "running": self.running,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "max_queue": self.max_queue,
+            "jobs": len(self.jobs),
+            "average_job_seconds": round(self.job_seconds, 3) if self.job_seconds else None,
+        }
+
+    def _expire(self):
+        # Finished jobs leave once past their TTL, even if older jobs are still running
+        cutoff = time.time() - self.job_ttl
+        while self._finished and self._finished[0].finished_at <= cutoff:
+            self.jobs.pop(self._finished.popleft().id, None)
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            API_QUEUE_DEPTH.set(self.queue.qsize())
+            API_QUEUE_SECONDS.observe(time.time() - job.created_at)
+            self.running += 1
+            job.publish({"event": "started"})
+            start = time.monotonic()
+            try:
+                result = await self._loop.run_in_executor(self._executor, self._run, job)
+                error = None if result["success"] else result.get("error") or "unknown error"
+            except Exception as e:
+                result, error = None, f"{type(e).__name__}: {e}"
+            finally:
+                self.running -= 1
+                if self.active.get(job.key) is job:
+                    del self.active[job.key]
+            seconds = time.monotonic() - start
+            self.job_seconds = seconds if self.job_seconds is None \
+                else self.job_seconds + 0.2 * (seconds - self.job_seconds)
+            job.result = result
+            if error is None:
+                job.publish({"event": "succeeded", "seconds": round(seconds, 3)})
+            else:
+                job.publish({"event": "failed", "seconds": round(seconds, 3), "error": error})
+            self._finished.append(job)
+            API_JOBS.labels("failed" if error else "succeeded").inc()
+
+    def _run(self, job: Job) -> Dict[str, Any]:
+        # Runs on a worker thread; crews are cheap to build since their clients are pooled
+        def emit(event: Dict[str, Any]):
+            self._loop.call_soon_threadsafe(job.publish, event)
+
+        request = job.request
+        crew = EducationCrew(request["llm"], self.plan_store, self.topic_index,
+                             resource_index=self.resource_index,
+                             question_bank=self.question_bank,
+                             run_config=job.run_config)
+        return crew.run(
+            topic=request["topic"],
+            expertise_level=request["expertise_level"],
+            resources_per_category=request["resources_per_category"],
+            num_questions=request["num_questions"],
+            num_projects=request["num_projects"],
+            profiler=StageEvents(emit),
+            use_cache=request["use_cache"]
+        )
+
+
+class APIServer:
+    """HTTP/1.1 front end of a `PlanService`, on asyncio streams."""
+
+    def __init__(self, service: PlanService, host: str = "127.0.0.1", port: int = 8000):
+        """
+        Args:
+            service: Service running the jobs
+            host: Address to bind
+            port: Port to bind (0 picks a free one; see `port` once started)
+        """
+        self.service = service
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        """Start the service and listen for connections."""
+        await self.service.start()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port,
+                                                  limit=MAX_HEAD_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Stop listening and stop the service."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.service.stop()
+
+    async def serve_forever(self, report: Callable[[str], None] = print):
+        """Start, report the address, and serve until cancelled."""
+        await self.start()
+        report(f"🌐 Serving on http://{self.host}:{self.port} with {self.service.workers} "
+               f"worker(s), queue limit {self.service.max_queue}")
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # One connection: requests until the client closes it or an event stream ends it
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except RequestError as e:
+                    await self._respond(writer, e.status, {"error": str(e)}, "-", keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                if not await self._dispatch(writer, method, target, body, keep_alive):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            with suppress(Exception):
+                await writer.wait_closed()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            raise RequestError("Request head too large", 431)
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise RequestError("Malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise RequestError("Malformed Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise RequestError("Request body too large", 413)
+        body = await reader.readexactly(length) if length > 0 else b""
+        return method.upper(), target, headers, body
+
+    async def _dispatch(self, writer: asyncio.StreamWriter, method: str, target: str,
+                        body: bytes, keep_alive: bool) -> bool:
+        # Answer one request; returns whether the connection may serve another
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        parts = [part for part in url.path.split("/") if part]
+        service = self.service
+
+        if parts == ["healthz"] and method == "GET":
+            health = service.health()
+            return await self._respond(writer, 200 if service.started else 503, health,
+                                       "/healthz", keep_alive)
+        if parts == ["metrics"] and method == "GET":
+            return await self._respond(writer, 200, metrics.render().encode("utf-8"), "/metrics",
+                                       keep_alive,
+                                       content_type="text/plain; version=0.0.4; charset=utf-8")
+        if parts == ["plans"] and method == "POST":
+            return await self._submit(writer, body, keep_alive)
+
+        if len(parts) in (2, 3) and parts[0] == "plans" and method == "GET":
+            route = "/plans/{id}" + ("/" + parts[2] if len(parts) == 3 else "")
+            job = service.jobs.get(parts[1])
+            if job is None:
+                return await self._respond(writer, 404, {"error": "Unknown job"}, route, keep_alive)
+            if len(parts) == 2:
+                return await self._respond(writer, 200, job.view(), route, keep_alive)
+            if parts[2] == "result":
+                return await self._result(writer, job, query, route, keep_alive)
+            if parts[2] == "events":
+                await self._stream(writer, job, route)
+                return False
+
+        known = parts in (["healthz"], ["metrics"], ["plans"]) or \
+            (len(parts) in (2, 3) and parts[0] == "plans")
+        status = 405 if known else 404
+        return await self._respond(writer, status, {"error": HTTPStatus(status).phrase},
+                                   "other", keep_alive)
+
+    async def _submit(self, writer: asyncio.StreamWriter, body: bytes, keep_alive: bool) -> bool:
+        try:
+            request = parse_plan_request(loads(body) if body else None, self.service.llm_provider)
+            job, coalesced = self.service.submit(request)
+        except RequestError as e:
+            return await self._respond(writer, e.status, {"error": str(e)}, "/plans", keep_alive)
+        except QueueFull as e:
+            return await self._respond(writer, 429, {"error": str(e)}, "/plans", keep_alive,
+                                       headers={"Retry-After": str(e.retry_after)})
+        except ValueError:
+            return await self._respond(writer, 400, {"error": "Body must be valid JSON"}, "/plans",
+                                       keep_alive)
+        payload = {**job.view(), "coalesced": coalesced}
+        return await self._respond(writer, 202, payload, "/plans", keep_alive,
+                                   headers={"Location": f"/plans/{job.id}"})
+
+    async def _result(self, writer: asyncio.StreamWriter, job: Job, query: Dict[str, List[str]],
+                      route: str, keep_alive: bool) -> bool:
+        try:
+            wait = min(float(query.get("wait", ["0"])[0]), MAX_WAIT_SECONDS)
+        except ValueError:
+            return await self._respond(writer, 400, {"error": "'wait' must be a number"}, route,
+                                       keep_alive)
+        if wait > 0 and not job.done.is_set():
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(job.done.wait(), wait)
+        if not job.done.is_set():
+            return await self._respond(writer, 202, job.view(), route, keep_alive)
+        if job.status == "failed":
+            return await self._respond(writer, 500, job.view(), route, keep_alive)
+        return await self._respond(writer, 200, result_payload(job.result), route, keep_alive)
+
+    async def _stream(self, writer: asyncio.StreamWriter, job: Job, route: str):
+        # Past events first, then live ones until the job finishes
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        API_REQUESTS.labels(route, "200").inc()
+        queue: asyncio.Queue = asyncio.Queue()
+        backlog = list(job.events)
+        job.subscribers.append(queue)
+        try:
+            for event in backlog:
+                writer.write(_sse(event))
+            await writer.drain()
+            finished = job.done.is_set()
+            while not finished:
+                try:
+                    event = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    writer.write(b": keep-alive\n\n")
+                else:
+                    writer.write(_sse(event))
+                    finished = event["event"] in TERMINAL_EVENTS
+                await writer.drain()
+        finally:
+            job.subscribers.remove(queue)
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Any, route: str,
+                       keep_alive: bool, headers: Optional[Dict[str, str]] = None,
+                       content_type: str = "application/json") -> bool:
+        body = payload if isinstance(payload, bytes) else dumps(payload)
+        lines = [
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ] + [f"{name}: {value}" for name, value in (headers or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+        API_REQUESTS.labels(route, str(status)).inc()
+        return keep_alive
+
+
+def _sse(event: Dict[str, Any]) -> bytes:
+    """Encode an event in the server-sent events format."""
+    return b"event: " + event["event"].encode("utf-8") + b"\ndata: " + dumps(event) + b"\n\n"
@@ -0,0 +1,262 @@
+"""
+Near-duplicate topic matching so differently phrased requests can be served
+from previously generated plans.
+"""
+import hashlib
+import random
+import threading
+import time
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from src.config import config
+from src.plan_store import PlanStore, normalize_topic
+
+
+# Abbreviations expanded before comparison ("Intro to ML" -> "machine learning")
+ABBREVIATIONS = {
+    "ml": "machine learning",
+    "ai": "artificial intelligence",
+    "dl": "deep learning",
+    "nlp": "natural language processing",
+    "cv": "computer vision",
+    "rl": "reinforcement learning",
+    "llm": "large language model",
+    "llms": "large language models",
+    "js": "javascript",
+    "ts": "typescript",
+    "py": "python",
+    "oop": "object oriented programming",
+    "db": "database",
+    "dbs": "databases",
+    "dsa": "data structures and algorithms",
+    "k8s": "kubernetes",
+}
+
+# Words that change the phrasing of a request but not its subject
+FILLER_WORDS = frozenset({
+    "a", "an", "the", "to", "of", "for", "in", "on", "with", "and",
+    "intro", "introduction", "introductory", "basics", "basic", "fundamentals",
+    "fundamental", "beginner", "beginners", "101", "getting", "started",
+    "course", "tutorial", "tutorials", "guide", "essentials", "overview",
+    "learn", "learning", "understanding", "concepts", "principles",
+})
+
+
+def canonical_topic(topic: str) -> str:
+    """
+    Reduce a topic to its subject: normalized, abbreviations expanded and
+    filler words removed. Falls back to the normalized text if nothing remains.
+    """
+    normalized = normalize_topic(topic)
+    expanded = " ".join(ABBREVIATIONS.get(token, token) for token in normalized.split())
+    # "learning" is filler on its own but part of subjects like "machine learning"
+    tokens = expanded.split()
+    kept = [
+        token for i, token in enumerate(tokens)
+        if token not in FILLER_WORDS
+        or (token == "learning" and i > 0 and tokens[i - 1] in ("machine", "deep", "reinforcement"))
+    ]
+    return " ".join(kept) or expanded
+
+
+def shingles(text: str, size: int = 3) -> FrozenSet[str]:
+    """Character n-grams of `text` (padded so short words still produce shingles)."""
+    padded = f" {text} "
+    if len(padded) <= size:
+        return frozenset([padded])
+    return frozenset(padded[i:i + size] for i in range(len(padded) - size + 1))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard similarity of two sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """
+    MinHash signatures over string sets. Each item is hashed once and
+    permuted by XOR with per-slot random masks. The permuted values of each
+    item are memoized (shingle vocabularies are small), so a signature is an
+    element-wise min over cached rows, computed in C.
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 1, cache_size: int = 20000):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.masks = [rng.getrandbits(30) for _ in range(num_perm)]
+        self.cache_size = cache_size
+        self._rows: Dict[str, Tuple[int, ...]] = {}
+
+    def _row(self, item: str) -> Tuple[int, ...]:
+        row = self._rows.get(item)
+        if row is None:
+            digest = hashlib.blake2b(item.encode("utf-8"), digest_size=4).digest()
+            value = int.from_bytes(digest, "little") >> 2
+            row = tuple(map(value.__xor__, self.masks))
+            if len(self._rows) >= self.cache_size:
+                self._rows.clear()
+            self._rows[item] = row
+        return row
+
+    def signature(self, items: FrozenSet[str]) -> Tuple[int, ...]:
+        """Return the MinHash signature of `items`."""
+        return tuple(map(min, zip(*map(self._row, items))))
+
+
+class TopicMatch(NamedTuple):
+    """A previously generated plan that matches a requested topic."""
+    plan_id: str
+    topic: str
+    score: float
+
+
+class _Entry(NamedTuple):
+    plan_id: str
+    topic: str
+    expertise_level: str
+    shingles: FrozenSet[str]
+    summary_tokens: FrozenSet[str]
+    created_at: float
+
+
+class TopicIndex:
+    """
+    In-memory MinHash LSH index over stored plans' topics, partitioned by
+    expertise level. A plan matches on its topic alone; how well its summary
+    covers the query only decides between plans that match.
+
+    Exact canonical matches are answered from a dict; everything else goes
+    through LSH band buckets and is verified with exact Jaccard similarity.
+    """
+
+    def __init__(self, threshold: float = 0.6, num_perm: int = 64, bands: int = 16):
+        """
+        Args:
+            threshold: Minimum similarity for a lookup to count as a match
+            num_perm: MinHash signature length
+            bands: Number of LSH bands (num_perm must be divisible by bands)
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self._entries: List[_Entry] = []
+        self._exact: Dict[Tuple[str, str], int] = {}
+        self._buckets: Dict[Tuple, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _band_keys(self, level: str, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield (level, band) + signature[start:start + self.rows]
+
+    def add(self, plan_id: str, topic: str, expertise_level: str,
+            summary: str = "", created_at: Optional[float] = None):
+        """Index a stored plan."""
+        canonical = canonical_topic(topic)
+        level = expertise_level.lower()
+        entry = _Entry(
+            plan_id=plan_id,
+            topic=topic,
+            expertise_level=level,
+            shingles=shingles(canonical),
+            summary_tokens=frozenset(canonical_topic(summary).split()),
+            created_at=created_at if created_at is not None else time.time()
+        )
+        signature = self.hasher.signature(entry.shingles)
+        with self._lock:
+            index = len(self._entries)
+            self._entries.append(entry)
+            # Newer plans replace older ones for the same canonical topic
+            self._exact[(level, canonical)] = index
+            for key in self._band_keys(level, signature):
+                self._buckets.setdefault(key, []).append(index)
+
+    def lookup(self, topic: str, expertise_level: str, threshold: Optional[float] = None,
+               max_age: Optional[float] = None) -> Optional[TopicMatch]:
+        """
+        Find the best previously generated plan for `topic` at `expertise_level`.
+
+        Args:
+            topic: Requested topic, in any phrasing
+            expertise_level: Requested expertise level
+            threshold: Override the index's similarity threshold
+            max_age: Ignore plans older than this many seconds
+
+        Returns:
+            The best match at or above the threshold, or None
+        """
+        threshold = self.threshold if threshold is None else threshold
+        level = expertise_level.lower()
+        canonical = canonical_topic(topic)
+        oldest = time.time() - max_age if max_age is not None else None
+
+        def fresh(entry: _Entry) -> bool:
+            return oldest is None or entry.created_at >= oldest
+
+        index = self._exact.get((level, canonical))
+        if index is not None and fresh(self._entries[index]):
+            entry = self._entries[index]
+            return TopicMatch(entry.plan_id, entry.topic, 1.0)
+
+        query_shingles = shingles(canonical)
+        query_tokens = frozenset(canonical.split())
+        candidates = set()
+        for key in self._band_keys(level, self.hasher.signature(query_shingles)):
+            candidates.update(self._buckets.get(key, ()))
+
+        best = None
+        for index in candidates:
+            entry = self._entries[index]
+            if not fresh(entry):
+                continue
+            score = jaccard(query_shingles, entry.shingles)
+            # The topic alone has to clear the threshold; summary coverage only ranks matches
+            if score < threshold:
+                continue
+            rank = score
+            if entry.summary_tokens and query_tokens:
+                # Among qualifying plans, one whose summary covers the query terms ranks higher
+                coverage = len(query_tokens & entry.summary_tokens) / len(query_tokens)
+                rank = max(score, (score + coverage) / 2)
+            if best is None or (rank, entry.created_at) > (best[1], best[2].created_at):
+                best = (score, rank, entry)
+
+        if best is None:
+            return None
+        return TopicMatch(best[2].plan_id, best[2].topic, round(best[0], 3))
+
+    @classmethod
+    def from_store(cls, store: PlanStore, max_age: Optional[float] = None, **kwargs) -> "TopicIndex":
+        """Build an index over every plan in `store` (optionally only recent ones)."""
+        index = cls(**kwargs)
+        since = time.time() - max_age if max_age is not None else None
+        records = sorted(store.iter_records(batch_size=1000, since=since),
+                         key=lambda record: record["created_at"])
+        for record in records:
+            index.add(
+                record["plan_id"],
+                record["topic"],
+                record["expertise_level"],
+                record["learning_materials"].get("summary", ""),
+                record["created_at"]
+            )
+        return index
+
+
+def build_default_index(store: Optional[PlanStore]) -> Optional[TopicIndex]:
+    """Index the fresh plans in `store` using the configured threshold and TTL."""
+    if store is None:
+        return None
+    return TopicIndex.from_store(
+        store,
+        max_age=config.plan_cache_ttl_hours * 3600,
+        threshold=config.similarity_threshold
+    )
@@ -1,19 +1,34 @@
 """
 Task definitions for the Personalized Education Assistant.
 """
+from typing import Optional
 from crewai import Task
-from src.models import LearningMaterial, Quiz, ProjectSuggestions
+from src.models import LearningMaterial, Quiz, QuizExtension, ProjectSuggestions
 
 
 class EducationTasks:
     """Factory class for creating education assistant tasks."""
     
+    @staticmethod
+    def _learning_materials_context(learning_materials_task, learning_materials):
+        """
+        Context for tasks that build on the learning materials: the curation task,
+        or (when regenerating from a stored plan) the stored materials in the prompt.
+        """
+        if learning_materials is None:
+            return [learning_materials_task], ""
+        return [], f"""
+            Learning materials (from a stored plan):
+            {learning_materials.model_dump_json()}
+            """
+    
     @staticmethod
     def curate_learning_materials_task(
         agent,
         topic: str,
         expertise_level: str,
-        resources_per_category: int = 3
+        resources_per_category: int = 3,
+        callback=None
     ):
         """
         Task 1: Curate learning materials from the web.
@@ -23,6 +38,7 @@ class EducationTasks:
             topic: The topic to search for
             expertise_level: User's expertise level
             resources_per_category: Number of resources per category
+            callback: Optional callback run on the task output (e.g. link checking)
         """
         return Task(
             description=f"""
@@ -56,14 +72,74 @@ class EducationTasks:
             for each resource, plus an overall learning path summary.
             """,
             agent=agent,
-            output_pydantic=LearningMaterial
+            output_pydantic=LearningMaterial,
+            callback=callback
+        )
+    
+    @staticmethod
+    def select_learning_materials_task(
+        agent,
+        topic: str,
+        expertise_level: str,
+        search_results: str,
+        resources_per_category: int = 3,
+        callback=None
+    ):
+        """
+        Task 1 (multi-level runs): Select learning materials from shared search results.
+        
+        Args:
+            agent: The Learning Material Agent (without the search tool)
+            topic: The topic the results were gathered for
+            expertise_level: User's expertise level
+            search_results: Candidate resources from the shared search pass
+            resources_per_category: Number of resources per category
+            callback: Optional callback run on the task output (e.g. link checking)
+        """
+        return Task(
+            description=f"""
+            Select high-quality learning materials for the topic: "{topic}"
+            Target audience expertise level: {expertise_level}
+            
+            The web has already been searched for this topic. Choose ONLY from the 
+            candidate resources below; do not invent URLs.
+            
+            {search_results}
+            
+            Your task:
+            1. Choose {resources_per_category} high-quality videos from the candidates
+            2. Choose {resources_per_category} comprehensive articles from the candidates
+            3. Choose {resources_per_category} practical exercises from the candidates
+            
+            Selection criteria:
+            - Prefer resources whose level matches {expertise_level} learners
+            - Prioritize authoritative sources (official docs, reputable platforms, known experts)
+            - Ensure good mix of different learning styles (visual, reading, practical)
+            
+            For each resource provide:
+            - Exact title
+            - Direct URL (copied from the candidate)
+            - Clear description of what it covers for a {expertise_level} learner
+            - Resource type (video/article/exercise)
+            
+            Also provide a brief summary of the recommended learning path.
+            """,
+            expected_output=f"""
+            A structured collection of {resources_per_category} videos, {resources_per_category} articles, 
+            and {resources_per_category} exercises chosen from the candidates, with complete details 
+            (title, URL, description) for each resource, plus an overall learning path summary.
+            """,
+            agent=agent,
+            output_pydantic=LearningMaterial,
+            callback=callback
         )
     
     @staticmethod
     def create_quiz_task(
         agent,
-        learning_materials_task,
-        num_questions: int = 5
+        learning_materials_task=None,
+        num_questions: int = 5,
+        learning_materials: Optional[LearningMaterial] = None
     ):
         """
         Task 2: Create quiz based on learning materials.
@@ -72,7 +148,11 @@ class EducationTasks:
             agent: The Quiz Creator Agent
             learning_materials_task: The previous task to get context from
             num_questions: Number of quiz questions to generate
+            learning_materials: Stored materials to use instead of a previous task
         """
+        context, materials = EducationTasks._learning_materials_context(
+            learning_materials_task, learning_materials
+        )
         return Task(
             description=f"""
             Based on the learning materials curated in the previous task, create a comprehensive 
@@ -99,23 +179,84 @@ class EducationTasks:
             - Difficulty level (easy, medium, or hard)
             
             Also estimate the total time needed to complete the quiz.
-            """,
+            {materials}""",
             expected_output=f"""
             A complete quiz with {num_questions} multiple-choice questions, each with 4 options, 
             correct answer, explanation, and difficulty level. Include estimated completion time.
             """,
             agent=agent,
-            context=[learning_materials_task],
+            context=context,
             output_pydantic=Quiz
         )
     
+    @staticmethod
+    def extend_quiz_task(
+        agent,
+        learning_materials: LearningMaterial,
+        quiz: Quiz,
+        num_questions: int = 5
+    ):
+        """
+        Create additional questions for an existing quiz.
+        
+        Args:
+            agent: The Quiz Creator Agent
+            learning_materials: The materials the quiz is based on
+            quiz: The existing quiz, whose questions must not be repeated
+            num_questions: Number of additional questions to generate
+        """
+        resources = "\n".join(
+            f"- {resource.title}: {resource.description}"
+            for resource in learning_materials.videos + learning_materials.articles
+            + learning_materials.exercises
+        )
+        existing = "\n".join(f"- {question.question}" for question in quiz.questions)
+        return Task(
+            description=f"""
+            Extend the quiz for the topic: "{quiz.topic}"
+            Target audience expertise level: {learning_materials.expertise_level}
+            
+            Learning path summary: {learning_materials.summary}
+            
+            Learning materials:
+            {resources}
+            
+            The quiz already has {len(quiz.questions)} questions:
+            {existing}
+            
+            Your task: create {num_questions} additional multiple-choice questions based on 
+            the learning materials.
+            
+            Question guidelines:
+            - Do NOT repeat or rephrase any of the existing questions
+            - Cover concepts the existing questions do not test
+            - Each question should have exactly 4 options (A, B, C, D)
+            - Ensure only ONE option is clearly correct
+            - Avoid trick questions or ambiguous wording
+            
+            For each question provide:
+            - Clear, well-formulated question text
+            - 4 distinct options labeled A, B, C, D
+            - The correct answer (A, B, C, or D)
+            - A helpful explanation of why that answer is correct
+            - Difficulty level (easy, medium, or hard)
+            """,
+            expected_output=f"""
+            {num_questions} new multiple-choice questions, each with 4 options, correct answer, 
+            explanation, and difficulty level.
+            """,
+            agent=agent,
+            output_pydantic=QuizExtension
+        )
+    
     @staticmethod
     def suggest_projects_task(
         agent,
         learning_materials_task,
         topic: str,
         expertise_level: str,
-        num_projects: int = 2
+        num_projects: int = 2,
+        learning_materials: Optional[LearningMaterial] = None
     ):
         """
         Task 3: Suggest project ideas based on learning materials.
@@ -126,7 +267,11 @@ class EducationTasks:
             topic: The main topic
             expertise_level: User's expertise level
             num_projects: Number of project ideas to suggest
+            learning_materials: Stored materials to use instead of a previous task
         """
+        context, materials = EducationTasks._learning_materials_context(
+            learning_materials_task, learning_materials
+        )
         return Task(
             description=f"""
             Based on the learning materials and quiz from previous tasks, suggest {num_projects} 
@@ -158,12 +303,12 @@ class EducationTasks:
             - Beginner: Simple, focused on fundamentals, completable in 1-3 days
             - Intermediate: Multi-faceted, require integration of concepts, 3-7 days
             - Advanced: Complex, real-world scenarios, optimization focused, 1-2 weeks
-            """,
+            {materials}""",
             expected_output=f"""
             {num_projects} well-structured project ideas, each with title, description, 
             key concepts, detailed deliverables, learning outcomes, and time estimate.
             """,
             agent=agent,
-            context=[learning_materials_task],
+            context=context,
             output_pydantic=ProjectSuggestions
         )
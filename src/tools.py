@@ -1,21 +1,144 @@
 """
 Custom tools for the CrewAI agents.
 """
+import time
 from crewai_tools import SerperDevTool
 from crewai.tools import tool
-from typing import List
-from src.config import config
+from typing import Any, Dict, List, Optional
+from pydantic import Field
+from src.cache import OfflineCacheMiss, make_key, search_cache
+from src.cassette import active_cassette
+from src.clients import client_pool
+from src.config import RunConfig, config
+from src.fakes import FakeSearchTool
+from src.metrics import SEARCH_CALLS, SEARCH_SECONDS
+from src.rate_limit import limiter_for
+
+
+class MeteredSerperDevTool(SerperDevTool):
+    """
+    SerperDev search tool that serves repeated queries from the search cache
+    and records call counts and latency for real searches. An active cassette
+    records the searches or replays them in place of Serper.
+    """
+
+    run_config: Any = Field(default=None, exclude=True,
+                            description="RunConfig whose Serper rate limit applies")
+
+    def _run(self, **kwargs):
+        query = kwargs.get("search_query") or kwargs.get("query")
+        key = make_key("serper", query, kwargs.get("search_type", self.search_type), self.n_results)
+        cache = search_cache(self.run_config)
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+        
+        # A replayed cassette stands in for Serper; a recording one captures it
+        cassette = active_cassette()
+        replaying = cassette is not None and cassette.replaying
+        if config.offline and not replaying:
+            raise OfflineCacheMiss("Offline: no cached results for this search")
+        
+        if not replaying:
+            limiter_for("serper", self.run_config).acquire()
+        start = time.perf_counter()
+        outcome = "success"
+        try:
+            results = cassette.replay("search", key) if replaying else super()._run(**kwargs)
+        except Exception as e:
+            outcome = "error"
+            if cassette is not None and cassette.recording:
+                cassette.record("search", key, time.perf_counter() - start, error=e)
+            raise
+        finally:
+            SEARCH_CALLS.labels("serper", outcome).inc()
+            SEARCH_SECONDS.labels("serper").observe(time.perf_counter() - start)
+        
+        if cassette is not None and cassette.recording:
+            cassette.record("search", key, time.perf_counter() - start, response=results)
+        if cache is not None:
+            cache.set(key, results)
+        return results
+
+
+# Level-neutral queries for the shared search pass of multi-level runs
+SEARCH_QUERIES = {
+    "video": "{topic} video tutorial",
+    "article": "{topic} guide documentation",
+    "exercise": "{topic} practice exercises",
+}
+
+
+def search_queries_for(topic: str) -> Dict[str, str]:
+    """Return the shared search query for each resource category."""
+    return {category: query.format(topic=topic) for category, query in SEARCH_QUERIES.items()}
+
+
+def run_shared_search(topic: str, search_tool) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Run each category query once and collect the organic hits.
+    
+    Args:
+        topic: The topic to search for
+        search_tool: Search tool to query (cached and metered like agent searches)
+    
+    Returns:
+        Mapping of resource category to a list of {title, link, snippet} hits
+    """
+    hits = {}
+    for category, query in search_queries_for(topic).items():
+        results: Any = search_tool.run(search_query=query)
+        organic = results.get("organic", []) if isinstance(results, dict) else []
+        hits[category] = [
+            {
+                "title": item.get("title", ""),
+                "link": item["link"],
+                "snippet": item.get("snippet", "")
+            }
+            for item in organic if item.get("link")
+        ]
+    return hits
+
+
+def format_search_results(hits: Dict[str, List[Dict[str, str]]]) -> str:
+    """Render shared search hits as a compact prompt section."""
+    lines = []
+    for category, items in hits.items():
+        lines.append(f"{category.upper()} CANDIDATES:")
+        for item in items:
+            lines.append(f"- {item['title']} | {item['link']} | {item['snippet']}")
+        lines.append("")
+    return "\n".join(lines).strip()
 
 
 class EducationTools:
     """Collection of custom tools for the education assistant."""
     
+    def __init__(self, run_config: Optional[RunConfig] = None):
+        """
+        Args:
+            run_config: Settings of the run (default: the environment's)
+        """
+        self.run_config = run_config or config.run_config()
+        self.project_tool = EducationTools.project_suggestion_tool
+    
+    def search_tool(self, provider: str = None):
+        """The run's search tool, shared with other runs of the same configuration."""
+        provider = provider or self.run_config.search_provider
+        return client_pool.get(self.run_config, ("search", provider),
+                               lambda: EducationTools.get_search_tool(provider, self.run_config))
+    
     @staticmethod
-    def get_search_tool():
-        """Get configured SerperDev search tool."""
-        return SerperDevTool(
-            api_key=config.serper_api_key,
-            n_results=10
+    def get_search_tool(provider: str = None, run_config: Optional[RunConfig] = None):
+        """Build a search tool ("serper" by default, or the local "fake")."""
+        run_config = run_config or config.run_config()
+        if (provider or run_config.search_provider) == "fake":
+            return FakeSearchTool(latency=run_config.fake_search_latency)
+        return MeteredSerperDevTool(
+            api_key=run_config.serper_api_key,
+            n_results=10,
+            run_config=run_config
         )
     
     @staticmethod
@@ -73,8 +196,3 @@ class EducationTools:
         """
         
         return guidelines
-
-
-# Create tool instances
-search_tool = EducationTools.get_search_tool()
-project_tool = EducationTools.project_suggestion_tool
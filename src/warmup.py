@@ -0,0 +1,159 @@
+"""
+Cache warm-up: precompute plans for a list of popular topics.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.config import config
+from src.crew import EXPERTISE_LEVELS, EducationCrew
+from src.plan_store import PlanStore
+from src.question_bank import QuestionBank
+from src.resources import ResourceIndex
+from src.similarity import TopicIndex
+
+
+def read_topics(path: str) -> List[str]:
+    """Read one topic per line, ignoring blank lines and `#` comments."""
+    topics = []
+    with open(path) as f:
+        for line in f:
+            topic = line.split("#", 1)[0].strip()
+            if topic and topic not in topics:
+                topics.append(topic)
+    return topics
+
+
+def parse_levels(levels: str) -> List[str]:
+    """Parse `all` or a comma-separated list of expertise levels."""
+    if levels.strip().lower() == "all":
+        return list(EXPERTISE_LEVELS)
+    parsed = [level.strip().lower() for level in levels.split(",") if level.strip()]
+    invalid = [level for level in parsed if level not in EXPERTISE_LEVELS]
+    if invalid:
+        raise ValueError(f"Unknown expertise level(s): {', '.join(invalid)}")
+    return parsed
+
+
+def _format_seconds(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+class WarmupProgress:
+    """Thread-safe progress counter that reports completion and ETA."""
+
+    def __init__(self, total: int, workers: int, report: Callable[[str], None] = print):
+        self.total = total
+        self.workers = workers
+        self.report = report
+        self.counts = {"generated": 0, "fresh": 0, "failed": 0}
+        self.generated_seconds = 0.0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> int:
+        return sum(self.counts.values())
+
+    def record(self, topic: str, level: str, status: str, seconds: float = 0.0):
+        with self._lock:
+            self.counts[status] += 1
+            if status == "generated":
+                self.generated_seconds += seconds
+            elapsed = time.monotonic() - self.started
+            remaining = self.total - self.done
+            eta = "?"
+            if self.counts["generated"]:
+                per_job = self.generated_seconds / self.counts["generated"]
+                eta = _format_seconds(per_job * remaining / self.workers)
+            icon = {"generated": "✓", "fresh": "↷", "failed": "✗"}[status]
+            self.report(
+                f"[{self.done}/{self.total}] {icon} {topic} ({level}) {status}"
+                f"{f' in {seconds:.1f}s' if seconds else ''} | "
+                f"elapsed {_format_seconds(elapsed)}, ETA {eta if remaining else '0m00s'}"
+            )
+
+
+def warm_cache(
+    topics: List[str],
+    levels: List[str],
+    plan_store: PlanStore,
+    topic_index: TopicIndex,
+    resource_index: Optional[ResourceIndex] = None,
+    question_bank: Optional[QuestionBank] = None,
+    llm_provider: Optional[str] = None,
+    workers: int = 2,
+    resources_per_category: int = 3,
+    num_questions: int = 5,
+    num_projects: int = 2,
+    report: Callable[[str], None] = print
+) -> Dict[str, int]:
+    """
+    Generate plans for every topic/level pair that has no fresh stored plan.
+
+    Runs go through the normal crew pipeline, so they also fill the search and
+    LLM caches; provider rate limits are enforced per call by `LLMProxy` and
+    the search tool, and `workers` bounds how many runs are in flight.
+
+    Args:
+        topics: Topics to warm
+        levels: Expertise levels to warm for each topic
+        plan_store: Store the generated plans are saved to
+        topic_index: Similarity index used to detect fresh plans
+        resource_index: Optional index that curated resources are recorded in
+        question_bank: Optional bank that generated quiz questions are added to
+        llm_provider: LLM provider to use
+        workers: Maximum number of concurrent crew runs
+        resources_per_category: Number of resources per category
+        num_questions: Number of quiz questions
+        num_projects: Number of project ideas
+        report: Callback receiving one progress line per finished job
+
+    Returns:
+        Counts of generated, fresh (skipped) and failed jobs
+    """
+    jobs: List[Tuple[str, str]] = [(topic, level) for topic in topics for level in levels]
+    progress = WarmupProgress(len(jobs), workers, report)
+    max_age = config.plan_cache_ttl_hours * 3600
+
+    pending = []
+    for topic, level in jobs:
+        if topic_index.lookup(topic, level, max_age=max_age) is not None:
+            progress.record(topic, level, "fresh")
+        else:
+            pending.append((topic, level))
+
+    local = threading.local()
+
+    def generate(topic: str, level: str) -> Tuple[str, float]:
+        # Each worker thread keeps its own crew (agents and LLM clients)
+        if not hasattr(local, "crew"):
+            local.crew = EducationCrew(llm_provider, plan_store, topic_index,
+                                       resource_index=resource_index,
+                                       question_bank=question_bank)
+        start = time.monotonic()
+        result = local.crew.run(
+            topic=topic,
+            expertise_level=level,
+            resources_per_category=resources_per_category,
+            num_questions=num_questions,
+            num_projects=num_projects,
+            use_cache=False
+        )
+        return ("generated" if result["success"] else "failed"), time.monotonic() - start
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="warmup") as pool:
+        futures = {pool.submit(generate, topic, level): (topic, level) for topic, level in pending}
+        for future in as_completed(futures):
+            topic, level = futures[future]
+            try:
+                status, seconds = future.result()
+            except Exception as e:
+                report(f"   {topic} ({level}) raised: {e}")
+                status, seconds = "failed", 0.0
+            progress.record(topic, level, status, seconds)
+
+    return dict(progress.counts)
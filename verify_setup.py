@@ -147,7 +147,7 @@ def test_imports():
         return False
     
     try:
-        from src.tools import search_tool, project_tool
+        from src.tools import EducationTools
         print("   ✓ tools module")
     except Exception as e:
         print(f"   ✗ tools module: {e}")